@@ -3,6 +3,10 @@ ASGI config for Moazer project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the project through this entry point (e.g. ``uvicorn Moazer.asgi:application``)
+to enable the consultation chat push channel (``consultations:stream``). Under WSGI
+the stream answers 204 and the chat page falls back to polling.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -14,3 +18,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Moazer.settings')
 
 application = get_asgi_application()
+
+# Load the lookup tables (main.lookups) before the first request arrives.
+from main.lookups import warm_lookups  # noqa: E402
+
+warm_lookups()
@@ -55,6 +55,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.RoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -71,6 +72,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'consultations.context_processors.unread_badge',
             ],
         },
     },
@@ -86,10 +88,67 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock at BEGIN so concurrent writers queue for up
+            # to `timeout` seconds instead of failing on a lock upgrade.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # A file rather than the shared-cache in-memory database, whose
+        # table locks fail immediately instead of waiting like the real one.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
 
+# Cache
+# Rendered chat fragments, version counters (role, lookups, chat threads) and
+# job locks. Every worker process must see the same counters, so the default
+# is a file-based cache shared by the processes of one host; set REDIS_URL when
+# running on several hosts (needs the redis package). Redis makes incr() and
+# add() atomic. The file backend does not (incr() is get + set, add() is
+# has_key + set): a concurrent bump can be lost, but the counter still moves,
+# which is all invalidation needs, and two callers may both win an add().
+# `manage.py test` swaps in a private in-memory cache (main.test_runner).
+
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv("DJANGO_CACHE_DIR", BASE_DIR / "cache"),
+            'OPTIONS': {
+                'MAX_ENTRIES': 5000,
+                'CULL_FREQUENCY': 4,
+            },
+        }
+    }
+
+
+TEST_RUNNER = "main.test_runner.TestRunner"
+
+
+# Background jobs (main.tasks): in-process thread pool, no broker needed.
+BACKGROUND_TASKS_WORKERS = 2
+
+
+# LLM gateway (main.llm)
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+LLM_TIMEOUT = 30            # seconds per call, retries included
+LLM_MAX_RETRIES = 2
+LLM_MAX_CONCURRENCY = 4     # in-flight requests per process
+LLM_BREAKER_THRESHOLD = 5   # consecutive failures before failing fast
+LLM_BREAKER_COOLDOWN = 30   # seconds before a probe call is let through
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Moazer.settings')
 
 application = get_wsgi_application()
+
+# Load the lookup tables (main.lookups) before the first request arrives.
+from main.lookups import warm_lookups  # noqa: E402
+
+warm_lookups()
@@ -1,7 +1,26 @@
 from django.contrib import admin
 from .models import StudentProfile, ExpertProfile, Specialization, ConsultationType
+from .moderation import set_experts_approval
+
+
+@admin.register(ExpertProfile)
+class ExpertProfileAdmin(admin.ModelAdmin):
+    list_display = ("user", "city", "is_approved", "rating_avg", "created_at")
+    list_filter = ("is_approved",)
+    list_select_related = ("user",)
+    actions = ("approve_experts", "deactivate_experts")
+
+    @admin.action(description="تفعيل الخبراء المحددين")
+    def approve_experts(self, request, queryset):
+        changed = set_experts_approval(queryset.values_list("pk", flat=True), approved=True)
+        self.message_user(request, f"تم تفعيل {changed} خبير.")
+
+    @admin.action(description="إلغاء تفعيل الخبراء المحددين")
+    def deactivate_experts(self, request, queryset):
+        changed = set_experts_approval(queryset.values_list("pk", flat=True), approved=False)
+        self.message_user(request, f"تم إلغاء تفعيل {changed} خبير.")
+
 
 admin.site.register(StudentProfile)
-admin.site.register(ExpertProfile)
 admin.site.register(Specialization)
 admin.site.register(ConsultationType)
@@ -0,0 +1,89 @@
+"""
+Expert directory queries.
+
+The directory page renders a card per expert (user, specializations and
+consultation types) plus two filter dropdowns. Cards are loaded with a fixed
+number of queries (experts + one prefetch per M2M), and the dropdown options
+come with per-facet expert counts from a cached aggregate that signals drop
+whenever expert ↔ facet links, approval or facet names change. Pages are
+keyset-paginated on an indexed ordering per sort mode, so any page of a large
+directory costs the same.
+"""
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from main.pagination import paginate_keyset
+
+from .models import ConsultationType, ExpertProfile, Specialization
+
+FACETS_KEY = "accounts:directory-facets"
+FACETS_TIMEOUT = 60 * 60
+
+
+def expert_cards(qs=None):
+    """
+    Everything expert_card.html touches, loaded up front.
+    """
+    if qs is None:
+        qs = ExpertProfile.objects.all()
+    return qs.select_related("user").prefetch_related("specializations", "consultation_types")
+
+
+def facet_counts() -> dict:
+    """
+    Filter options with the number of approved experts in each:
+        {"specializations": [(id, name, count), ...],
+         "consultation_types": [(id, name, count), ...]}
+    Two GROUP BY queries on a miss, none on a hit.
+    """
+    facets = cache.get(FACETS_KEY)
+    if facets is None:
+        approved = Q(expertprofile__is_approved=True)
+        facets = {
+            "specializations": list(
+                Specialization.objects.annotate(n=Count("expertprofile", filter=approved))
+                .order_by("id").values_list("id", "name", "n")
+            ),
+            "consultation_types": list(
+                ConsultationType.objects.annotate(n=Count("expertprofile", filter=approved))
+                .order_by("id").values_list("id", "name", "n")
+            ),
+        }
+        cache.set(FACETS_KEY, facets, timeout=FACETS_TIMEOUT)
+    return facets
+
+
+def invalidate_facets() -> None:
+    cache.delete(FACETS_KEY)
+
+
+# Directory sort modes → keyset ordering. Each is served by one of the partial
+# (approved experts) indexes on ExpertProfile; the trailing id makes it unique.
+SORT_MODES = {
+    "rating": ["-ranking_score", "-id"],
+    "reviews": ["-rating_count", "-id"],
+    "price": ["consultation_price", "id"],
+    "newest": ["-created_at", "-id"],
+}
+SORT_LABELS = [
+    ("rating", "الأعلى تقييمًا"),
+    ("reviews", "الأكثر تقييمات"),
+    ("price", "الأقل سعرًا"),
+    ("newest", "الأحدث"),
+]
+DEFAULT_SORT = "rating"
+
+# Expert cards per directory page.
+DIRECTORY_PAGE_SIZE = 12
+
+
+def directory_page(qs, sort: str | None = None, cursor: str | None = None, limit: int = DIRECTORY_PAGE_SIZE):
+    """
+    Return (experts, next_cursor, sort) for one page of the directory.
+    Unknown sort modes fall back to DEFAULT_SORT.
+    """
+    if sort not in SORT_MODES:
+        sort = DEFAULT_SORT
+    experts, next_cursor = paginate_keyset(expert_cards(qs), SORT_MODES[sort], cursor=cursor, limit=limit)
+    return experts, next_cursor, sort
@@ -0,0 +1,222 @@
+import csv
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from accounts.directory import invalidate_facets
+from accounts.models import ExpertProfile, StudentProfile
+from accounts.search import reindex_experts
+from consultations.recommendations import mark_experts_dirty
+from main.counters import EXPERTS_GROUP, STUDENTS_GROUP, invalidate_platform_counts
+from main.lookups import consultation_types, specializations
+from subscriptions.models import Wallet
+
+USER_TYPES = {"student", "expert"}
+TRUE_VALUES = {"1", "true", "yes", "y", "نعم"}
+GENDERS = {value for value, _ in StudentProfile._meta.get_field("gender").choices}
+STUDY_STAGES = {value for value, _ in StudentProfile.STAGES}
+
+
+def _split(value: str) -> list[str]:
+    return [part.strip() for part in (value or "").split(";") if part.strip()]
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a CSV of students/experts into User, profile, group, specialization and "
+        "Wallet rows with bulk inserts, one transaction per batch. Columns: username, "
+        "user_type (student|expert), email, first_name, last_name, password or "
+        "password_hash (an already-encoded Django hash), birth_date (YYYY-MM-DD), gender "
+        "(male|female), phone, city, bio, study_stage (students: middle|high|diploma|bachelor), "
+        "specializations / consultation_types (experts, "
+        "';'-separated names), is_approved (experts). Rows without a password get an "
+        "unusable one. Existing usernames are skipped, so an interrupted import can "
+        "simply be re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Password hashing processes (default: one per CPU).")
+        parser.add_argument("--delimiter", default=",")
+
+    def handle(self, *args, **options):
+        self.specializations = {s.name: s.pk for s in specializations()}
+        self.consultation_types = {t.name: t.pk for t in consultation_types()}
+        groups = dict(Group.objects.filter(name__in=[STUDENTS_GROUP, EXPERTS_GROUP]).values_list("name", "pk"))
+        if len(groups) != 2:
+            raise CommandError("The Students / Experts groups are missing; run migrate first.")
+        self.group_ids = {"student": groups[STUDENTS_GROUP], "expert": groups[EXPERTS_GROUP]}
+        self.stats = {"created": 0, "skipped": 0, "invalid": 0}
+        self.unknown_names = set()
+
+        started = time.monotonic()
+        try:
+            csv_file = open(options["csv_path"], newline="", encoding="utf-8-sig")
+        except OSError as exc:
+            raise CommandError(exc)
+        with csv_file, ProcessPoolExecutor(options["workers"], initializer=django.setup) as pool:
+            rows = enumerate(csv.DictReader(csv_file, delimiter=options["delimiter"]), start=2)
+            seen = set()
+            while batch := list(islice(rows, options["batch_size"])):
+                self._import_batch(batch, seen, pool)
+                self.stdout.write(f"{self.stats['created']} users created...")
+
+        # bulk_create sends no signals: refresh what they would have.
+        invalidate_facets()
+        invalidate_platform_counts()
+
+        if self.unknown_names:
+            self.stdout.write(self.style.WARNING(
+                "Unknown specializations / consultation types ignored: " + ", ".join(sorted(self.unknown_names))
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {self.stats['created']} users, skipped {self.stats['skipped']} existing, "
+            f"{self.stats['invalid']} invalid rows, in {time.monotonic() - started:.1f}s."
+        ))
+
+    def _valid(self, line: int, row: dict) -> bool:
+        """
+        Check a row and normalize the fields the profiles store (bulk_create
+        runs no field validation).
+        """
+        for field in ("username", "user_type", "birth_date", "gender", "study_stage"):
+            row[field] = (row.get(field) or "").strip()
+        problem = None
+        if not row["username"]:
+            problem = "missing username"
+        elif row["user_type"] not in USER_TYPES:
+            problem = f"user_type must be student or expert, got {row['user_type']!r}"
+        elif row["gender"] not in GENDERS:
+            problem = f"gender must be one of {sorted(GENDERS)}, got {row['gender']!r}"
+        elif row["user_type"] == "student" and row["study_stage"] not in STUDY_STAGES:
+            problem = f"study_stage must be one of {sorted(STUDY_STAGES)}, got {row['study_stage']!r}"
+        elif row.get("password_hash"):
+            try:
+                identify_hasher(row["password_hash"])
+            except ValueError:
+                problem = "password_hash is not a Django password hash"
+        if not problem and row["birth_date"]:
+            try:
+                row["birth_date"] = parse_date(row["birth_date"])
+            except ValueError:
+                row["birth_date"] = None
+            if row["birth_date"] is None:
+                problem = "birth_date must be a valid YYYY-MM-DD date"
+        if problem:
+            self.stderr.write(f"line {line}: {problem}")
+            self.stats["invalid"] += 1
+        return problem is None
+
+    def _ids(self, names: list[str], known: dict) -> list[int]:
+        self.unknown_names.update(name for name in names if name not in known)
+        return [known[name] for name in names if name in known]
+
+    def _import_batch(self, batch, seen: set, pool) -> None:
+        rows = []
+        for line, row in batch:
+            if not self._valid(line, row):
+                continue
+            if row["username"] in seen:
+                self.stats["skipped"] += 1
+                continue
+            seen.add(row["username"])
+            rows.append(row)
+        existing = set(
+            User.objects.filter(username__in=[r["username"] for r in rows]).values_list("username", flat=True)
+        )
+        self.stats["skipped"] += len(existing)
+        rows = [r for r in rows if r["username"] not in existing]
+        if not rows:
+            return
+
+        # Hashing dominates the import (hundreds of ms per password with the
+        # default PBKDF2 work factor), so plain-text passwords go to the pool.
+        plain = [i for i, r in enumerate(rows) if not r.get("password_hash") and r.get("password")]
+        hashes = dict(zip(plain, pool.map(make_password, [rows[i]["password"] for i in plain], chunksize=32)))
+
+        users = []
+        for i, r in enumerate(rows):
+            user = User(
+                username=r["username"],
+                email=r.get("email") or "",
+                first_name=r.get("first_name") or "",
+                last_name=r.get("last_name") or "",
+            )
+            if r.get("password_hash"):
+                user.password = r["password_hash"]
+            elif i in hashes:
+                user.password = hashes[i]
+            else:
+                user.set_unusable_password()
+            users.append(user)
+
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            if any(u.pk is None for u in users):
+                # Backends without INSERT ... RETURNING.
+                pks = dict(User.objects.filter(username__in=[u.username for u in users]).values_list("username", "pk"))
+                for u in users:
+                    u.pk = pks[u.username]
+
+            students, experts, expert_rows = [], [], []
+            for user, r in zip(users, rows):
+                common = dict(
+                    user_id=user.pk,
+                    birth_date=r.get("birth_date") or None,
+                    gender=r["gender"],
+                    phone=r.get("phone") or "",
+                    city=r.get("city") or "",
+                    bio=r.get("bio") or None,
+                )
+                if r["user_type"] == "student":
+                    students.append(StudentProfile(study_stage=r["study_stage"], **common))
+                else:
+                    experts.append(ExpertProfile(
+                        is_approved=(r.get("is_approved") or "").strip().lower() in TRUE_VALUES,
+                        # save() is bypassed, so set the no-ratings score explicitly.
+                        ranking_score=ExpertProfile.ranking_score_for(0, 0),
+                        **common,
+                    ))
+                    expert_rows.append(r)
+            StudentProfile.objects.bulk_create(students)
+            ExpertProfile.objects.bulk_create(experts)
+            if any(e.pk is None for e in experts):
+                pks = dict(
+                    ExpertProfile.objects.filter(user_id__in=[e.user_id for e in experts]).values_list("user_id", "pk")
+                )
+                for e in experts:
+                    e.pk = pks[e.user_id]
+
+            Membership = User.groups.through
+            Membership.objects.bulk_create(
+                Membership(user_id=user.pk, group_id=self.group_ids[r["user_type"]]) for user, r in zip(users, rows)
+            )
+            SpecializationLink = ExpertProfile.specializations.through
+            TypeLink = ExpertProfile.consultation_types.through
+            SpecializationLink.objects.bulk_create(
+                SpecializationLink(expertprofile_id=e.pk, specialization_id=pk)
+                for e, r in zip(experts, expert_rows)
+                for pk in self._ids(_split(r.get("specializations")), self.specializations)
+            )
+            TypeLink.objects.bulk_create(
+                TypeLink(expertprofile_id=e.pk, consultationtype_id=pk)
+                for e, r in zip(experts, expert_rows)
+                for pk in self._ids(_split(r.get("consultation_types")), self.consultation_types)
+            )
+            Wallet.objects.bulk_create(Wallet(user_id=user.pk) for user in users)
+
+            expert_ids = [e.pk for e in experts]
+            approved_ids = [e.pk for e in experts if e.is_approved]
+            transaction.on_commit(lambda: reindex_experts(expert_ids))
+            transaction.on_commit(lambda: mark_experts_dirty(approved_ids))
+
+        self.stats["created"] += len(users)
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import ExpertProfile
+from accounts.search import fts_available, reindex_experts
+
+
+class Command(BaseCommand):
+    help = "Rebuild the expert full-text search index from ExpertProfile rows (SQLite FTS5)."
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            self.stdout.write("Full-text index is SQLite-only; the LIKE fallback needs no rebuild.")
+            return
+        reindex_experts()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {ExpertProfile.objects.count()} experts."))
@@ -0,0 +1,22 @@
+from django.utils.functional import SimpleLazyObject
+
+from .roles import get_request_role, load_profile
+
+
+class RoleMiddleware:
+    """
+    Attach lazy `request.role` (accounts.roles.Role) and `request.profile`
+    (StudentProfile / ExpertProfile or None) to every request.
+
+    Both are resolved at most once per request and only when accessed; the role
+    itself is normally read from the session. Must come after
+    AuthenticationMiddleware. Test `request.profile` by truthiness, not `is None`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.role = SimpleLazyObject(lambda: get_request_role(request))
+        request.profile = SimpleLazyObject(lambda: load_profile(request, request.role))
+        return self.get_response(request)
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:28
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F, FloatField
+from django.db.models.functions import Cast
+
+
+def fill_ranking_score(apps, schema_editor):
+    # Historical models lack ranking_score_for(); same formula, prior 3.0 × 5.
+    ExpertProfile = apps.get_model("accounts", "ExpertProfile")
+    ExpertProfile.objects.update(
+        ranking_score=ExpressionWrapper(
+            (Cast(F("rating_total"), FloatField()) + 15.0) / (F("rating_count") + 5),
+            output_field=FloatField(),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_expertprofile_rating_total'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expertprofile',
+            name='ranking_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(fill_ranking_score, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='expertprofile',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['-ranking_score', '-id'], name='expert_dir_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expertprofile',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['-rating_count', '-id'], name='expert_dir_reviews_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expertprofile',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['consultation_price', 'id'], name='expert_dir_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expertprofile',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['-created_at', '-id'], name='expert_dir_newest_idx'),
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:29
+
+import re
+import unicodedata
+
+from django.db import migrations
+
+# Snapshot of main.text and accounts.search.document_terms at the time of this
+# migration, so later changes to the live normalization can't alter it.
+_DIACRITICS = re.compile("[\u064B-\u0652\u0670\u0640]")
+_LETTER_MAP = str.maketrans({
+    "أ": "ا",
+    "إ": "ا",
+    "آ": "ا",
+    "ٱ": "ا",
+    "ة": "ه",
+    "ى": "ي",
+    "ؤ": "و",
+    "ئ": "ي",
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+})
+_WORD = re.compile(r"\w+")
+_ARTICLE_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال")
+
+
+def _normalize(text):
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", text)
+    text = _DIACRITICS.sub("", text)
+    return text.translate(_LETTER_MAP).casefold()
+
+
+def _strip_article(word):
+    for prefix in _ARTICLE_PREFIXES:
+        if word.startswith(prefix) and len(word) - len(prefix) >= 3:
+            return word[len(prefix):]
+    return word
+
+
+def _terms(*texts):
+    terms = []
+    for text in texts:
+        for word in dict.fromkeys(_WORD.findall(_normalize(text))):
+            terms.append(word)
+            if _strip_article(word) != word:
+                terms.append(_strip_article(word))
+    return " ".join(terms)
+
+
+def create_fts(apps, schema_editor):
+    """
+    FTS5 index of experts (SQLite only; other vendors use the LIKE fallback).
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE accounts_expert_fts USING fts5("
+        "name, bio, city, specializations, tokenize = 'unicode61 remove_diacritics 0')"
+    )
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE accounts_expert_fts_vocab USING fts5vocab(accounts_expert_fts, 'row')"
+    )
+
+    ExpertProfile = apps.get_model("accounts", "ExpertProfile")
+    rows = [
+        (
+            p.pk,
+            _terms(p.user.first_name, p.user.last_name, p.user.username),
+            _terms(p.bio),
+            _terms(p.city),
+            _terms(*(s.name for s in p.specializations.all())),
+        )
+        for p in ExpertProfile.objects.select_related("user").prefetch_related("specializations")
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO accounts_expert_fts (rowid, name, bio, city, specializations) VALUES (%s, %s, %s, %s, %s)",
+            rows,
+        )
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS accounts_expert_fts_vocab")
+    schema_editor.execute("DROP TABLE IF EXISTS accounts_expert_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_expertprofile_ranking'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
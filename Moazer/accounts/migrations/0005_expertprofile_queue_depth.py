@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:32
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_queue_depth(apps, schema_editor):
+    ExpertProfile = apps.get_model("accounts", "ExpertProfile")
+    Consultation = apps.get_model("consultations", "Consultation")
+    open_count = (
+        Consultation.objects
+        .filter(expert_id=OuterRef("user_id"), status__in=["NEW", "PENDING", "ACTIVE"])
+        .values("expert_id")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    ExpertProfile.objects.update(
+        queue_depth=Coalesce(Subquery(open_count, output_field=IntegerField()), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_expert_fts'),
+        ('consultations', '0006_consultation_inbox_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expertprofile',
+            name='queue_depth',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_queue_depth, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='expertprofile',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['queue_depth', '-ranking_score', 'id'], name='expert_queue_idx'),
+        ),
+    ]
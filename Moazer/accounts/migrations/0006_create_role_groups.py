@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:36
+
+from django.db import migrations
+
+ROLE_GROUPS = ["Students", "Experts"]
+
+
+def create_groups(apps, schema_editor):
+    # Registration and role checks expect these to exist.
+    Group = apps.get_model("auth", "Group")
+    for name in ROLE_GROUPS:
+        Group.objects.get_or_create(name=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_expertprofile_queue_depth'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_groups, migrations.RunPython.noop),
+    ]
@@ -52,5 +52,44 @@ class ExpertProfile(models.Model):
     
     consultation_price = models.DecimalField(max_digits=8, decimal_places=2, default=0)  # SAR
     rating_count = models.PositiveIntegerField(default=0)
+    rating_total = models.PositiveIntegerField(default=0)  # sum of stars; rating_avg = total / count
     rating_avg = models.DecimalField(max_digits=3, decimal_places=1, default=0)  # e.g. 4.5
+    # Bayesian average used by the directory "rating" sort; see ranking_score_for().
+    ranking_score = models.FloatField(default=0)
+    # Open (NEW / PENDING / ACTIVE) consultations assigned to this expert,
+    # maintained by consultations.services; used for auto-assignment.
+    queue_depth = models.PositiveIntegerField(default=0)
+
+    # Prior: every expert starts as if rated RANKING_PRIOR_WEIGHT times at
+    # RANKING_PRIOR_MEAN, so one 5-star rating doesn't outrank fifty 4.8s.
+    RANKING_PRIOR_MEAN = 3.0
+    RANKING_PRIOR_WEIGHT = 5
+
+    class Meta:
+        # One partial index per directory sort mode (accounts.directory.SORT_MODES),
+        # covering approved experts only.
+        indexes = [
+            models.Index(fields=["-ranking_score", "-id"], condition=models.Q(is_approved=True), name="expert_dir_rating_idx"),
+            models.Index(fields=["-rating_count", "-id"], condition=models.Q(is_approved=True), name="expert_dir_reviews_idx"),
+            models.Index(fields=["consultation_price", "id"], condition=models.Q(is_approved=True), name="expert_dir_price_idx"),
+            models.Index(fields=["-created_at", "-id"], condition=models.Q(is_approved=True), name="expert_dir_newest_idx"),
+            # Auto-assignment: shortest queue first.
+            models.Index(fields=["queue_depth", "-ranking_score", "id"], condition=models.Q(is_approved=True), name="expert_queue_idx"),
+        ]
+
+    @classmethod
+    def ranking_score_for(cls, rating_total, rating_count):
+        """
+        Works on numbers and on F() expressions alike (for UPDATE statements).
+        """
+        prior = cls.RANKING_PRIOR_MEAN * cls.RANKING_PRIOR_WEIGHT
+        return (rating_total + prior) / (rating_count + cls.RANKING_PRIOR_WEIGHT)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"rating_total", "rating_count"} & set(update_fields):
+            self.ranking_score = self.ranking_score_for(self.rating_total, self.rating_count)
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "ranking_score"}
+        super().save(*args, **kwargs)
 
@@ -0,0 +1,76 @@
+"""
+Expert approval / deactivation.
+
+A moderation decision is one UPDATE over all the selected experts, whatever
+their number. QuerySet.update() sends no post_save, so the work the per-row
+signals would do (directory facets, recommendation rows) is done here once per
+batch, and the affected experts are told by email over a single SMTP
+connection in a background job (main.tasks) after the transaction commits, so
+a slow or failing mail server never holds up the admin page.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.mail import send_mass_mail
+from django.db import transaction
+
+from consultations.recommendations import mark_experts_dirty
+from main.tasks import enqueue
+
+from .directory import invalidate_facets
+from .models import ExpertProfile
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATIONS = {
+    True: (
+        "تم تفعيل حسابك في مؤازر",
+        "مرحباً {name}،\n\nتمت مراجعة حسابك كخبير وتفعيله، يمكنك الآن تسجيل الدخول واستقبال الاستشارات.",
+    ),
+    False: (
+        "تم إيقاف حسابك في مؤازر",
+        "مرحباً {name}،\n\nتم إلغاء تفعيل حسابك كخبير. للاستفسار تواصل معنا عبر صفحة التواصل.",
+    ),
+}
+
+
+def set_experts_approval(profile_ids, approved: bool) -> int:
+    """
+    Approve (or deactivate) the given ExpertProfiles. Experts already in that
+    state are left alone and not notified. Returns the number changed.
+    """
+    with transaction.atomic():
+        changed = list(
+            ExpertProfile.objects.select_for_update()
+            .filter(pk__in=list(profile_ids))
+            .exclude(is_approved=approved)
+            .values_list("pk", "user__email", "user__first_name", "user__username")
+        )
+        if not changed:
+            return 0
+        changed_ids = [row[0] for row in changed]
+        ExpertProfile.objects.filter(pk__in=changed_ids).update(is_approved=approved)
+
+        subject, body = NOTIFICATIONS[approved]
+        emails = [
+            (subject, body.format(name=first_name or username), settings.DEFAULT_FROM_EMAIL, [email])
+            for _, email, first_name, username in changed
+            if email
+        ]
+        transaction.on_commit(invalidate_facets)
+        transaction.on_commit(lambda: mark_experts_dirty(changed_ids))
+        if emails:
+            enqueue(_notify, emails)
+    return len(changed_ids)
+
+
+def _notify(emails) -> None:
+    """
+    Background job: send the moderation emails.
+    """
+    try:
+        send_mass_mail(emails)
+    except OSError:
+        # smtplib errors are OSErrors; the decision itself is already committed.
+        logger.exception("Could not send %d moderation emails.", len(emails))
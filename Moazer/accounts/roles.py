@@ -0,0 +1,126 @@
+"""
+Request-scoped role and profile resolution.
+
+A user is an expert if they are in Group('Experts') or own an ExpertProfile,
+a student likewise with Group('Students') / StudentProfile; both flags are
+kept, as the old is_student()/is_expert() checks were independent. The profile
+is the StudentProfile if there is one, else the ExpertProfile (profile_view's
+order). Resolving that used to cost two queries per check; now it is one query
+per session, cached in the session and invalidated through a per-user version
+counter, kept in the shared default cache, that signals bump when group
+membership or profile rows change.
+"""
+
+import time
+from dataclasses import dataclass
+
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+
+from .models import ExpertProfile, StudentProfile
+
+ROLE_STUDENT = "student"
+ROLE_EXPERT = "expert"
+
+SESSION_KEY = "_moazer_role"
+VERSION_KEY = "accounts:role-version:{user_id}"
+
+
+@dataclass(frozen=True)
+class Role:
+    name: str | None = None          # kind of the profile (ROLE_STUDENT / ROLE_EXPERT)
+    profile_id: int | None = None
+    is_student: bool = False
+    is_expert: bool = False
+
+
+ANONYMOUS = Role()
+
+
+def get_role_version(user_id: int) -> int:
+    """
+    Current role version of a user. An evicted counter restarts from a
+    time-based value, which invalidates every session copy.
+    """
+    key = VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_role_version(user_id: int) -> None:
+    key = VERSION_KEY.format(user_id=user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def resolve_role(user) -> Role:
+    """
+    Compute the role of a user with a single query (group flags + profile ids).
+    """
+    memberships = User.groups.through.objects.filter(user_id=OuterRef("pk"))
+    row = (
+        User.objects.filter(pk=user.pk)
+        .annotate(
+            in_experts=Exists(memberships.filter(group__name="Experts")),
+            in_students=Exists(memberships.filter(group__name="Students")),
+        )
+        .values("in_experts", "in_students", "expertprofile__id", "studentprofile__id")
+        .first()
+    )
+    if row is None:
+        return ANONYMOUS
+    student_id, expert_id = row["studentprofile__id"], row["expertprofile__id"]
+    is_student = bool(student_id or row["in_students"])
+    is_expert = bool(expert_id or row["in_experts"])
+    if student_id or (is_student and not expert_id):
+        return Role(ROLE_STUDENT, student_id, is_student, is_expert)
+    if is_expert:
+        return Role(ROLE_EXPERT, expert_id, is_student, is_expert)
+    return ANONYMOUS
+
+
+def get_request_role(request) -> Role:
+    """
+    Role of request.user: from the session when its version is current,
+    otherwise resolved and stored back.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return ANONYMOUS
+
+    version = get_role_version(user.pk)
+    cached = request.session.get(SESSION_KEY)
+    if cached and cached.get("user_id") == user.pk and cached.get("version") == version:
+        return Role(cached["name"], cached["profile_id"], cached["is_student"], cached["is_expert"])
+
+    role = resolve_role(user)
+    request.session[SESSION_KEY] = {
+        "user_id": user.pk,
+        "version": version,
+        "name": role.name,
+        "profile_id": role.profile_id,
+        "is_student": role.is_student,
+        "is_expert": role.is_expert,
+    }
+    return role
+
+
+def load_profile(request, role: Role):
+    """
+    Load the StudentProfile / ExpertProfile of the current user (user joined in),
+    or None.
+    """
+    if not role.profile_id:
+        return None
+    model = StudentProfile if role.name == ROLE_STUDENT else ExpertProfile
+    profile = model.objects.select_related("user").filter(pk=role.profile_id).first()
+    if profile is None:
+        # Profile vanished behind our back: force a fresh resolution next time.
+        bump_role_version(request.user.pk)
+    return profile
@@ -0,0 +1,165 @@
+"""
+Free-text expert search.
+
+On SQLite the searchable text of every expert (name, bio, city and
+specialization names) lives in an FTS5 table keyed by ExpertProfile id, stored
+already normalized by main.text.normalize_arabic (tashkeel stripped, alef/hamza
+and taa marbuta unified), so a query is one index lookup instead of LIKE scans.
+Typos are tolerated by expanding query words that aren't in the index to close
+vocabulary terms (difflib over the fts5vocab table). Signals keep the table in
+sync with ExpertProfile, User, Specialization and the M2M links.
+
+Other database vendors fall back to icontains filters.
+"""
+
+import difflib
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from main.text import search_terms, strip_article
+
+from .models import ExpertProfile
+
+FTS_TABLE = "accounts_expert_fts"
+VOCAB_TABLE = "accounts_expert_fts_vocab"
+
+# difflib ratio a vocabulary term needs to stand in for a misspelt word, and
+# how many substitutes one word may expand to.
+TYPO_CUTOFF = 0.75
+TYPO_CANDIDATES = 3
+
+# Words shorter than this are matched as prefixes only (no typo expansion).
+MIN_FUZZY_LENGTH = 3
+
+
+def fts_available() -> bool:
+    return connection.vendor == "sqlite"
+
+
+def document_terms(*texts) -> str:
+    """
+    Normalized, space-joined terms for the index. Words carrying the Arabic
+    article are indexed with and without it, so "محاسبة" finds "المحاسبة".
+    """
+    terms = []
+    for text in texts:
+        for word in search_terms(text):
+            terms.append(word)
+            stem = strip_article(word)
+            if stem != word:
+                terms.append(stem)
+    return " ".join(terms)
+
+
+def _documents(profile_ids=None):
+    """
+    Yield (profile_id, name, bio, city, specializations) rows, two queries in total.
+    """
+    qs = ExpertProfile.objects.select_related("user").prefetch_related("specializations")
+    if profile_ids is not None:
+        qs = qs.filter(pk__in=profile_ids)
+    for p in qs.iterator(chunk_size=500):
+        yield (
+            p.pk,
+            document_terms(p.user.first_name, p.user.last_name, p.user.username),
+            document_terms(p.bio),
+            document_terms(p.city),
+            document_terms(*(s.name for s in p.specializations.all())),
+        )
+
+
+def reindex_experts(profile_ids=None) -> None:
+    """
+    (Re)write the index rows of the given experts, or of every expert.
+    """
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        if profile_ids is None:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        else:
+            profile_ids = list(profile_ids)
+            if not profile_ids:
+                return
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in profile_ids])
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, bio, city, specializations) VALUES (%s, %s, %s, %s, %s)",
+            list(_documents(profile_ids)),
+        )
+
+
+def remove_experts(profile_ids) -> None:
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in profile_ids])
+
+
+def _close_terms(cursor, word: str) -> list[str]:
+    """
+    Vocabulary terms close to a word missing from the index. Candidates share
+    its first letter, which keeps the scan to one slice of the vocabulary.
+    """
+    cursor.execute(
+        f"SELECT term FROM {VOCAB_TABLE} WHERE term >= %s AND term < %s",
+        [word[0], word[0] + "\U0010ffff"],
+    )
+    vocabulary = [row[0] for row in cursor.fetchall()]
+    return difflib.get_close_matches(word, vocabulary, n=TYPO_CANDIDATES, cutoff=TYPO_CUTOFF)
+
+
+def _quote(term: str) -> str:
+    """
+    FTS5 string literal: operators and punctuation inside are matched as text.
+    """
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _match_expression(query: str) -> str | None:
+    """
+    FTS5 MATCH expression: every query word must match, as a prefix or via
+    one of its typo substitutes.
+    """
+    words = [strip_article(w) for w in search_terms(query)]
+    if not words:
+        return None
+    clauses = []
+    with connection.cursor() as cursor:
+        for word in words:
+            options = [_quote(word) + "*"]
+            if len(word) >= MIN_FUZZY_LENGTH:
+                cursor.execute(
+                    f"SELECT 1 FROM {VOCAB_TABLE} WHERE term >= %s AND term < %s LIMIT 1",
+                    [word, word + "\U0010ffff"],
+                )
+                if cursor.fetchone() is None:
+                    options += [_quote(term) for term in _close_terms(cursor, word)]
+            clauses.append("(" + " OR ".join(options) + ")")
+    return " AND ".join(clauses)
+
+
+def search_experts(qs, query: str):
+    """
+    Narrow an ExpertProfile queryset to experts matching `query`. The match
+    runs as an indexed subquery, so ordering and keyset pagination still apply.
+    """
+    if not query or not query.strip():
+        return qs
+    if not fts_available():
+        condition = Q()
+        for word in query.split():
+            condition &= (
+                Q(user__first_name__icontains=word)
+                | Q(user__last_name__icontains=word)
+                | Q(bio__icontains=word)
+                | Q(city__icontains=word)
+                | Q(specializations__name__icontains=word)
+            )
+        return qs.filter(condition).distinct()
+
+    expression = _match_expression(query)
+    if expression is None:
+        return qs
+    return qs.filter(pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [expression]))
@@ -0,0 +1,114 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .directory import invalidate_facets
+from .models import ConsultationType, ExpertProfile, Specialization, StudentProfile
+from .roles import bump_role_version
+from .search import reindex_experts, remove_experts
+
+
+def _bump_roles_on_commit(user_ids):
+    """
+    Bump once the membership change is visible, so a concurrent request
+    can't cache the old role under the new version.
+    """
+    user_ids = list(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: [bump_role_version(user_id) for user_id in user_ids])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_role_on_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    user.groups.add(...) (forward) or group.user_set.add(...) (reverse).
+    """
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            _bump_roles_on_commit([instance.pk])
+    elif action in ("post_add", "post_remove"):
+        _bump_roles_on_commit(pk_set or ())
+    elif action == "pre_clear":
+        # The members are unknown by post_clear: collect them now.
+        _bump_roles_on_commit(instance.user_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=StudentProfile)
+@receiver(post_delete, sender=StudentProfile)
+@receiver(post_save, sender=ExpertProfile)
+@receiver(post_delete, sender=ExpertProfile)
+def invalidate_role_on_profile(sender, instance, created=False, **kwargs):
+    # Plain edits don't change the role; creation and deletion do.
+    if created or kwargs.get("signal") is post_delete:
+        bump_role_version(instance.user_id)
+
+
+@receiver(m2m_changed, sender=ExpertProfile.specializations.through)
+@receiver(m2m_changed, sender=ExpertProfile.consultation_types.through)
+def invalidate_facets_on_links(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        transaction.on_commit(invalidate_facets)
+
+
+@receiver(post_save, sender=ExpertProfile)
+@receiver(post_delete, sender=ExpertProfile)
+@receiver(post_save, sender=Specialization)
+@receiver(post_delete, sender=Specialization)
+@receiver(post_save, sender=ConsultationType)
+@receiver(post_delete, sender=ConsultationType)
+def invalidate_facets_on_rows(sender, **kwargs):
+    """
+    Approval changes, experts joining/leaving and facet renames all move counts.
+    """
+    transaction.on_commit(invalidate_facets)
+
+
+# -------------------------------------------------------------------
+# Expert search index (accounts.search)
+# -------------------------------------------------------------------
+
+SEARCHABLE_USER_FIELDS = {"first_name", "last_name", "username"}
+
+
+def _reindex_on_commit(profile_ids):
+    profile_ids = list(profile_ids)
+    if profile_ids:
+        transaction.on_commit(lambda: reindex_experts(profile_ids))
+
+
+@receiver(post_save, sender=ExpertProfile)
+def index_expert(sender, instance, **kwargs):
+    _reindex_on_commit([instance.pk])
+
+
+@receiver(post_delete, sender=ExpertProfile)
+def unindex_expert(sender, instance, **kwargs):
+    profile_id = instance.pk
+    transaction.on_commit(lambda: remove_experts([profile_id]))
+
+
+@receiver(post_save, sender=User)
+def index_expert_user(sender, instance, created, update_fields=None, **kwargs):
+    # Logins save last_login only; nothing searchable changed.
+    if created or (update_fields is not None and not SEARCHABLE_USER_FIELDS & set(update_fields)):
+        return
+    _reindex_on_commit(ExpertProfile.objects.filter(user=instance).values_list("pk", flat=True))
+
+
+@receiver(m2m_changed, sender=ExpertProfile.specializations.through)
+def index_expert_specializations(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            _reindex_on_commit([instance.pk])
+    elif action in ("post_add", "post_remove"):
+        _reindex_on_commit(pk_set or ())
+    elif action == "pre_clear":
+        _reindex_on_commit(instance.expertprofile_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Specialization)
+@receiver(pre_delete, sender=Specialization)
+def index_specialization_experts(sender, instance, **kwargs):
+    # Renamed, or about to vanish from its experts (the link rows cascade silently).
+    _reindex_on_commit(instance.expertprofile_set.values_list("pk", flat=True))
@@ -1,3 +1,268 @@
-from django.test import TestCase
+import csv
+import datetime
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core import mail
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from subscriptions.models import Wallet
+
+from .directory import directory_page, facet_counts
+from .models import ExpertProfile, Specialization, StudentProfile
+from .moderation import set_experts_approval
+from .roles import ROLE_EXPERT, ROLE_STUDENT, get_request_role, resolve_role
+from .search import _quote, search_experts
+
+
+class RoleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("user")
+
+    def _request(self, session):
+        request = RequestFactory().get("/")
+        request.user = self.user
+        request.session = session
+        return request
+
+    def test_student_and_expert_keep_both_flags(self):
+        student = StudentProfile.objects.create(user=self.user, gender="male", study_stage="high")
+        ExpertProfile.objects.create(user=self.user, gender="male")
+
+        role = resolve_role(self.user)
+        self.assertTrue(role.is_student)
+        self.assertTrue(role.is_expert)
+        self.assertEqual((role.name, role.profile_id), (ROLE_STUDENT, student.pk))
+
+    def test_group_student_with_expert_profile_loads_expert_profile(self):
+        self.user.groups.add(Group.objects.get_or_create(name="Students")[0])
+        expert = ExpertProfile.objects.create(user=self.user, gender="female")
+
+        role = resolve_role(self.user)
+        self.assertTrue(role.is_student)
+        self.assertEqual((role.name, role.profile_id), (ROLE_EXPERT, expert.pk))
+
+    def test_session_copy_invalidated_by_membership_change(self):
+        session = {}
+        experts = Group.objects.get_or_create(name="Experts")[0]
+        self.assertFalse(get_request_role(self._request(session)).is_expert)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.add(experts)
+        self.assertTrue(get_request_role(self._request(session)).is_expert)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            experts.user_set.clear()
+        self.assertFalse(get_request_role(self._request(session)).is_expert)
+
+    def test_membership_bump_waits_for_commit(self):
+        session = {}
+        experts = Group.objects.get_or_create(name="Experts")[0]
+        self.user.groups.add(experts)
+        get_request_role(self._request(session))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.clear()
+            # Not committed yet: the session copy stays valid.
+            self.assertTrue(get_request_role(self._request(session)).is_expert)
+        self.assertFalse(get_request_role(self._request(session)).is_expert)
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class ModerationTests(TestCase):
+    def setUp(self):
+        self.profiles = [
+            ExpertProfile.objects.create(
+                user=User.objects.create_user(f"expert{i}", email=f"expert{i}@example.com" if i else ""),
+                gender="male",
+            )
+            for i in range(3)
+        ]
+
+    def test_approval_emails_sent_after_commit(self):
+        ids = [p.pk for p in self.profiles]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(set_experts_approval(ids, approved=True), 3)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ["expert1@example.com", "expert2@example.com"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(set_experts_approval(ids, approved=True), 0)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_mail_failure_does_not_reach_the_caller(self):
+        with mock.patch("accounts.moderation.send_mass_mail", side_effect=OSError("SMTP down")), \
+                self.assertLogs("accounts.moderation", "ERROR"), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(set_experts_approval([self.profiles[1].pk], approved=True), 1)
+        self.assertTrue(ExpertProfile.objects.get(pk=self.profiles[1].pk).is_approved)
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class DirectoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.law = Specialization.objects.create(name="القانون")
+        self.experts = [
+            ExpertProfile.objects.create(user=User.objects.create_user(f"expert{i}"), gender="male", is_approved=bool(i))
+            for i in range(3)
+        ]
+        for expert in self.experts:
+            expert.specializations.add(self.law)
+
+    def _law_count(self):
+        return dict((pk, n) for pk, _, n in facet_counts()["specializations"])[self.law.pk]
+
+    def test_facet_counts_cached_until_a_change_commits(self):
+        self.assertEqual(self._law_count(), 2)
+        with self.assertNumQueries(0):
+            facet_counts()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.experts[1].specializations.remove(self.law)
+        self.assertEqual(self._law_count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            set_experts_approval([self.experts[0].pk], approved=True)
+        self.assertEqual(self._law_count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Specialization.objects.filter(pk=self.law.pk).update(name="الحقوق")  # no signal: stays cached
+        self.assertEqual(facet_counts()["specializations"][0][1], "القانون")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.law.name = "الحقوق"
+            self.law.save()
+        self.assertEqual(facet_counts()["specializations"][0][1], "الحقوق")
+
+
+    def test_sort_modes_page_through_approved_experts(self):
+        cheap, popular = self.experts[1], self.experts[2]
+        cheap.consultation_price, cheap.rating_total, cheap.rating_count = Decimal("50"), 5, 1
+        popular.consultation_price, popular.rating_total, popular.rating_count = Decimal("100"), 45, 10
+        cheap.save()
+        popular.save()
+
+        approved = ExpertProfile.objects.filter(is_approved=True)
+        for sort, expected in [
+            ("rating", [popular, cheap]),
+            ("reviews", [popular, cheap]),
+            ("price", [cheap, popular]),
+            ("newest", [popular, cheap]),
+            ("unknown", [popular, cheap]),
+        ]:
+            first, cursor, _ = directory_page(approved, sort=sort, limit=1)
+            second, end, _ = directory_page(approved, sort=sort, cursor=cursor, limit=1)
+            self.assertEqual((first + second, end), (expected, None), sort)
+
+    def test_profile_edit_saves_the_price(self):
+        expert = self.experts[1]
+        ExpertProfile.objects.filter(pk=expert.pk).update(rating_count=3, rating_total=12)
+        self.client.force_login(expert.user)
+        response = self.client.post(reverse("accounts:profile"), {
+            "first_name": "Huda", "last_name": "", "email": "", "birth_date": "1990-01-01", "gender": "female",
+            "phone": "", "city": "", "bio": "", "specializations": [self.law.pk],
+            "consultation_fee": "250.50", "iban_number": "SA00",
+        })
+        self.assertRedirects(response, reverse("accounts:profile"))
+        expert.refresh_from_db()
+        self.assertEqual((expert.consultation_price, expert.rating_count), (Decimal("250.50"), 3))
+
+
+class ExpertSearchTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            accounting = Specialization.objects.create(name="المحاسبة المالية")
+            self.accountant = ExpertProfile.objects.create(
+                user=User.objects.create_user("huda", first_name="هدى"), gender="female", city="جدة",
+            )
+            self.accountant.specializations.add(accounting)
+            ExpertProfile.objects.create(
+                user=User.objects.create_user("omar", first_name="عمر"), gender="male", bio="مستشار تسويق",
+            )
+
+    def _search(self, query):
+        return list(search_experts(ExpertProfile.objects.all(), query))
+
+    def test_round_trip(self):
+        self.assertEqual(self._search("محاسبه"), [self.accountant])  # article and taa marbuta folded
+        self.assertEqual(self._search("المُحاسَبة جده"), [self.accountant])
+        self.assertEqual(self._search("هدي"), [self.accountant])
+        self.assertEqual(self._search("محاسبيه"), [self.accountant])  # typo expanded from the vocabulary
+        self.assertEqual(self._search("محاسبة تسويق"), [])
+        self.assertEqual(len(self._search("  ")), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.accountant.specializations.clear()
+        self.assertEqual(self._search("محاسبة"), [])
+
+    def test_query_syntax_is_escaped(self):
+        for query in ['"محاسبة', "محاسبة OR عمر", "NEAR(محاسبة)", "*:^-", 'a"b']:
+            self._search(query)  # no OperationalError from FTS5
+        self.assertEqual(self._search('"محاسبة"*'), [self.accountant])
+        self.assertEqual(_quote('a"b'), '"a""b"')
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class ImportUsersTests(TestCase):
+    FIELDS = ["username", "user_type", "password", "password_hash", "birth_date", "gender",
+              "study_stage", "specializations", "is_approved"]
+
+    def setUp(self):
+        cache.clear()
+        Specialization.objects.create(name="القانون")
+
+    def _import(self, rows):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, self.FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+            f.flush()
+            out, err = StringIO(), StringIO()
+            call_command("import_users", f.name, "--workers", "1", "--batch-size", "2", stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_imports_students_and_experts(self):
+        out, err = self._import([
+            {"username": "sara", "user_type": "student", "password": "secret", "birth_date": "2005-03-01",
+             "gender": "female", "study_stage": "high"},
+            {"username": "huda", "user_type": "expert", "password_hash": make_password("secret"),
+             "gender": "female", "specializations": "القانون;غير موجود", "is_approved": "نعم"},
+            {"username": "omar", "user_type": "student", "gender": "male", "study_stage": "bachelor"},
+        ])
+        self.assertEqual(err, "")
+        self.assertIn("Created 3 users", out)
+        self.assertIn("غير موجود", out)
+
+        sara = User.objects.get(username="sara")
+        self.assertTrue(sara.check_password("secret"))
+        self.assertEqual(sara.studentprofile.birth_date, datetime.date(2005, 3, 1))
+        self.assertTrue(sara.groups.filter(name="Students").exists())
+        huda = ExpertProfile.objects.get(user__username="huda")
+        self.assertTrue(huda.user.check_password("secret"))
+        self.assertTrue(huda.is_approved)
+        self.assertEqual([s.name for s in huda.specializations.all()], ["القانون"])
+        self.assertFalse(User.objects.get(username="omar").has_usable_password())
+        self.assertEqual(Wallet.objects.count(), 3)
+
+        out, _ = self._import([{"username": "sara", "user_type": "student", "gender": "female", "study_stage": "high"}])
+        self.assertIn("Created 0 users, skipped 1 existing", out)
+
+    def test_rejects_invalid_rows(self):
+        valid = {"user_type": "student", "gender": "male", "study_stage": "high"}
+        out, err = self._import([
+            {**valid, "username": "bad_date", "birth_date": "2005-02-30"},
+            {**valid, "username": "bad_format", "birth_date": "01/03/2005"},
+            {**valid, "username": "bad_gender", "gender": "m"},
+            {**valid, "username": "bad_stage", "study_stage": "phd"},
+            {**valid, "username": "bad_hash", "password_hash": "not-a-hash"},
+            {**valid, "username": "expert_without_stage", "user_type": "expert", "study_stage": ""},
+        ])
+        self.assertIn("Created 1 users, skipped 0 existing, 5 invalid rows", out)
+        for line in range(2, 7):
+            self.assertIn(f"line {line}:", err)
+        self.assertEqual(list(User.objects.values_list("username", flat=True)), ["expert_without_stage"])
@@ -10,6 +10,7 @@ urlpatterns = [
     path('experts/', views.experts_view, name='experts_view'),
     path('experts/approve/<int:expert_id>', views.approve_expert, name='approve_expert'),
     path('experts/deactivate/<int:expert_id>', views.deactivate_expert, name='deactivate_expert'),
+    path('experts/moderate/', views.moderate_experts_view, name='moderate_experts_view'),
     path('expert/<int:expert_id>', views.expert_detail_view, name='expert_detail_view'),
     path('logout/', views.logout_view, name='logout_view'),
 
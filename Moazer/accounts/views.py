@@ -4,7 +4,12 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth.models import User, Group
 from django.contrib.admin.views.decorators import staff_member_required
-from .models import StudentProfile, ExpertProfile, Specialization, ConsultationType
+from django.views.decorators.http import require_POST
+from main.lookups import consultation_types, specializations
+from .models import StudentProfile, ExpertProfile
+from .directory import SORT_LABELS, directory_page, expert_cards, facet_counts
+from .moderation import set_experts_approval
+from .search import search_experts
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 
@@ -44,8 +49,8 @@ def registration_view(request):
         if password1 != password2:
             return render(request, "accounts/registration.html", {
                 "error": "كلمة المرور غير متطابقة",
-                "specializations": Specialization.objects.all(),
-                "consultation_types": ConsultationType.objects.all(),
+                "specializations": specializations(),
+                "consultation_types": consultation_types(),
             })
 
         # Create user 
@@ -97,8 +102,8 @@ def registration_view(request):
         return redirect("accounts:login_view")
 
     return render(request, "accounts/registration.html", {
-        "specializations": Specialization.objects.all(),
-        "consultation_types": ConsultationType.objects.all(),
+        "specializations": specializations(),
+        "consultation_types": consultation_types(),
     })
 
 def logout_view(request):
@@ -113,16 +118,12 @@ def logout_view(request):
 def profile_view(request):
     user = request.user
 
-    try:
-        profile = StudentProfile.objects.get(user=user)
-        profile_type = "student"
-    except StudentProfile.DoesNotExist:
-        try:
-            profile = ExpertProfile.objects.get(user=user)
-            profile_type = "expert"
-        except ExpertProfile.DoesNotExist:
-            messages.error(request, "لا يوجد بروفايل لهذا المستخدم.")
-            return redirect("main:home_view")
+    # Resolved once per request by accounts.middleware.RoleMiddleware.
+    profile = request.profile
+    if not profile:
+        messages.error(request, "لا يوجد بروفايل لهذا المستخدم.")
+        return redirect("main:home_view")
+    profile_type = request.role.name
 
     
     if request.method == "POST":
@@ -136,28 +137,33 @@ def profile_view(request):
         profile.phone = request.POST.get("phone")
         profile.city = request.POST.get("city")
         profile.bio = request.POST.get("bio")
+        # Only the edited columns: rating aggregates are maintained concurrently.
+        fields = ["birth_date", "gender", "phone", "city", "bio"]
 
         avatar_file = request.FILES.get("avatar")
         if avatar_file:
             profile.avatar = avatar_file
+            fields.append("avatar")
 
         if profile_type == "student":
             profile.study_stage = request.POST.get("study_stage")
+            fields.append("study_stage")
         elif profile_type == "expert":
             profile.specializations.set(request.POST.getlist("specializations"))
             profile.consultation_types.set(request.POST.getlist("consultation_types"))
-            profile.consultation_fee = request.POST.get("consultation_fee")
+            profile.consultation_price = request.POST.get("consultation_fee") or 0
             profile.iban_number = request.POST.get("iban_number")
+            fields += ["consultation_price", "iban_number"]
 
-        profile.save()
+        profile.save(update_fields=fields)
         messages.success(request, "تم حفظ التغييرات بنجاح")
         return redirect("accounts:profile")
 
     context = {
         "profile": profile,
         "profile_type": profile_type,
-        "all_specializations": Specialization.objects.all() if profile_type == "expert" else [],
-        "all_consultation_types": ConsultationType.objects.all() if profile_type == "expert" else [],
+        "all_specializations": specializations() if profile_type == "expert" else [],
+        "all_consultation_types": consultation_types() if profile_type == "expert" else [],
     }
     return render(request, "accounts/profile.html", context)
 
@@ -180,31 +186,55 @@ def experts_view(request):
     
     # If admin, bring all inactive experts 
     if request.user.is_staff or request.user.is_superuser:
-        pending_experts = ExpertProfile.objects.filter(is_approved=False)
+        pending_experts = expert_cards(ExpertProfile.objects.filter(is_approved=False))
 
     # Filter
     specialization_id = request.GET.get("specialization")
     consultation_id = request.GET.get("consultation")
+    query = request.GET.get("q", "").strip()
 
     if specialization_id:
         approved_experts = approved_experts.filter(specializations__id=specialization_id)
     if consultation_id:
         approved_experts = approved_experts.filter(consultation_types__id=consultation_id)
-        
-    return render(request, "accounts/experts.html", {"approved_experts": approved_experts,"pending_experts": pending_experts,"specializations": Specialization.objects.all(), "consultation_types": ConsultationType.objects.all(), "selected_spec": specialization_id, "selected_consult": consultation_id,})
+    if query:
+        approved_experts = search_experts(approved_experts, query)
+
+    approved_experts, next_cursor, sort = directory_page(
+        approved_experts, sort=request.GET.get("sort"), cursor=request.GET.get("cursor")
+    )
+
+    facets = facet_counts()
+    return render(request, "accounts/experts.html", {"approved_experts": approved_experts, "next_cursor": next_cursor, "pending_experts": pending_experts,"specializations": facets["specializations"], "consultation_types": facets["consultation_types"], "selected_spec": specialization_id, "selected_consult": consultation_id, "query": query, "sort_choices": SORT_LABELS, "selected_sort": sort,})
 
 @staff_member_required
 def approve_expert(request, expert_id):
     expert = get_object_or_404(ExpertProfile, id=expert_id)
-    expert.is_approved = True
-    expert.save()
+    set_experts_approval([expert.id], approved=True)
     return redirect("accounts:experts_view")
 
 @staff_member_required
 def deactivate_expert(request, expert_id):
     expert = get_object_or_404(ExpertProfile, id=expert_id)
-    expert.is_approved = False
-    expert.save()
+    set_experts_approval([expert.id], approved=False)
+    return redirect("accounts:experts_view")
+
+@staff_member_required
+@require_POST
+def moderate_experts_view(request):
+    # Bulk approve / deactivate of the experts ticked on the directory page.
+    action = request.POST.get("action")
+    if action not in ("approve", "deactivate"):
+        messages.error(request, "إجراء غير معروف.")
+        return redirect("accounts:experts_view")
+    expert_ids = [pk for pk in request.POST.getlist("expert_ids") if pk.isdigit()]
+    if not expert_ids:
+        messages.error(request, "اختر خبيراً واحداً على الأقل.")
+        return redirect("accounts:experts_view")
+
+    changed = set_experts_approval(expert_ids, approved=(action == "approve"))
+    verb = "تفعيل" if action == "approve" else "إلغاء تفعيل"
+    messages.success(request, f"تم {verb} {changed} خبير.")
     return redirect("accounts:experts_view")
 
 def expert_detail_view(request, expert_id):
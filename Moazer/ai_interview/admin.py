@@ -1,3 +1,10 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import QuestionBankEntry
+
+
+@admin.register(QuestionBankEntry)
+class QuestionBankEntryAdmin(admin.ModelAdmin):
+    list_display = ("job_title", "title_key", "hits", "misses", "generated_at", "last_used_at")
+    search_fields = ("job_title", "title_key")
+    ordering = ("-last_used_at",)
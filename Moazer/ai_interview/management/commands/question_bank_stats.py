@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from ai_interview.models import QuestionBankEntry
+from ai_interview.question_bank import bank_stats
+
+
+class Command(BaseCommand):
+    help = "Print question-bank hit/miss statistics and the most requested job titles."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=20)
+
+    def handle(self, *args, **options):
+        stats = bank_stats()
+        self.stdout.write(
+            f"titles={stats['titles']} hits={stats['hits']} misses={stats['misses']} "
+            f"hit_rate={stats['hit_rate']:.1%}"
+        )
+        top = QuestionBankEntry.objects.order_by("-hits", "-misses")[: options["top"]]
+        for entry in top:
+            self.stdout.write(
+                f"{entry.hits:>6} {entry.misses:>4}  {len(entry.questions):>2}q  {entry.job_title}"
+            )
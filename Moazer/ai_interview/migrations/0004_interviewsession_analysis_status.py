@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_interview', '0003_interviewanswer_score_interviewanswer_strengths_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='interviewsession',
+            name='status',
+            field=models.CharField(choices=[('NEW', 'جديدة'), ('RUNNING', 'جارية'), ('ANALYZING', 'قيد التحليل'), ('FINISHED', 'منتهية'), ('FAILED', 'تعذّر التحليل')], default='NEW', max_length=10),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_interview', '0004_interviewsession_analysis_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionBankEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title_key', models.CharField(max_length=200, unique=True)),
+                ('job_title', models.CharField(max_length=200)),
+                ('questions', models.JSONField(default=list)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('misses', models.PositiveIntegerField(default=0)),
+                ('generated_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_used_at'], name='ai_intervie_last_us_b16bfb_idx')],
+            },
+        ),
+    ]
@@ -7,7 +7,9 @@ User = settings.AUTH_USER_MODEL
 class InterviewStatus(models.TextChoices):
     NEW = "NEW", "جديدة"
     RUNNING = "RUNNING", "جارية"
+    ANALYZING = "ANALYZING", "قيد التحليل"  # answers submitted, analysis job queued
     FINISHED = "FINISHED", "منتهية"
+    FAILED = "FAILED", "تعذّر التحليل"
 
 
 class InterviewSession(models.Model):
@@ -69,4 +71,26 @@ class InterviewAnswer(models.Model):
     score = models.PositiveSmallIntegerField(null=True, blank=True)  # 1..5
 
     class Meta:
-        unique_together = ("session", "question")             # One answer per question in a session
\ No newline at end of file
+        unique_together = ("session", "question")             # One answer per question in a session
+
+class QuestionBankEntry(models.Model):
+    """
+    Generated interview questions for one normalized job title, reused across
+    sessions (see ai_interview.question_bank). `questions` is a pool larger
+    than one session's draw so repeat users see a different mix.
+    """
+    title_key = models.CharField(max_length=200, unique=True)  # question_bank.title_key()
+    job_title = models.CharField(max_length=200)               # as first typed, for display
+    questions = models.JSONField(default=list)
+
+    hits = models.PositiveIntegerField(default=0)    # sessions served from the pool
+    misses = models.PositiveIntegerField(default=0)  # sessions that had to wait for the model
+
+    generated_at = models.DateTimeField(auto_now_add=True)  # last refill (TTL)
+    last_used_at = models.DateTimeField(auto_now_add=True)  # LRU eviction
+
+    class Meta:
+        indexes = [models.Index(fields=["last_used_at"])]
+
+    def __str__(self):
+        return f"{self.job_title} ({len(self.questions)})"
@@ -0,0 +1,118 @@
+"""
+Question bank for AI interview sessions.
+
+Most users type one of a few dozen job titles, so generated questions are
+kept per normalized title (main.text: tashkeel/alef/taa marbuta unified,
+article stripped, so "المحاسب" and "مُحاسِب" share a pool) and a session
+draws a random sample from the pool instead of waiting for the model.
+
+  - hit:  the pool has enough questions; no LLM call. If the pool is older
+          than BANK_TTL or smaller than BANK_SIZE, a background refill
+          (main.tasks) tops it up with fresh questions.
+  - miss: the session's questions are generated synchronously, stored as a
+          new pool, and a refill grows it to BANK_SIZE in the background.
+
+At most BANK_MAX_ENTRIES titles are kept; the least recently used go first.
+Per-title hits/misses are stored on the entries (admin, bank_stats()).
+"""
+
+import random
+from datetime import timedelta
+
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from main import pools
+from main.text import search_terms, strip_article
+
+from .ai_service import generate_questions
+from .models import QuestionBankEntry
+
+BANK_SIZE = 15            # questions kept per title
+BANK_TTL = timedelta(days=30)
+BANK_MAX_ENTRIES = 500
+
+REFILL_LOCK_KEY = "ai_interview:bank-refill:{digest}"
+
+
+def title_key(job_title: str) -> str:
+    return " ".join(strip_article(word) for word in search_terms(job_title))[:200]
+
+
+def _refill_lock(key: str) -> str:
+    return pools.lock_key(REFILL_LOCK_KEY, key)
+
+
+def draw_questions(job_title: str, n: int = 5) -> list[str]:
+    """
+    n interview questions for the title, from the bank when possible.
+    """
+    key = title_key(job_title)
+    if not key:
+        return generate_questions(job_title=job_title, n=n)
+
+    entry = QuestionBankEntry.objects.filter(title_key=key).first()
+    if entry is not None and len(entry.questions) >= n:
+        QuestionBankEntry.objects.filter(pk=entry.pk).update(hits=F("hits") + 1, last_used_at=timezone.now())
+        if len(entry.questions) < BANK_SIZE or entry.generated_at < timezone.now() - BANK_TTL:
+            _queue_refill(key, job_title)
+        return random.sample(entry.questions, n)
+
+    questions = generate_questions(job_title=job_title, n=n)
+    _store_miss(key, job_title, questions)
+    _queue_refill(key, job_title)
+    return questions
+
+
+def _store_miss(key: str, job_title: str, questions: list[str]) -> None:
+    pools.record_miss(
+        QuestionBankEntry, {"title_key": key}, {"job_title": job_title, "questions": questions},
+        last_used_at=timezone.now(),
+    )
+
+
+def _queue_refill(key: str, job_title: str) -> None:
+    pools.queue_refill(_refill_lock(key), refill, key, job_title)
+
+
+def refill(key: str, job_title: str) -> None:
+    """
+    Background job: put BANK_SIZE fresh questions in front of the pool, then
+    evict least recently used titles beyond BANK_MAX_ENTRIES. Backs off while
+    another refill of the title holds the lock (main.pools).
+    """
+    with pools.refill_lock(_refill_lock(key)) as acquired:
+        if not acquired:
+            return
+        fresh = generate_questions(job_title=job_title, n=BANK_SIZE)
+        entry = QuestionBankEntry.objects.filter(title_key=key).first()
+        if entry is None:
+            return
+        QuestionBankEntry.objects.filter(pk=entry.pk).update(
+            questions=pools.dedupe(fresh + entry.questions)[:BANK_SIZE],
+            generated_at=timezone.now(),
+        )
+        evict()
+
+
+def evict(max_entries: int = BANK_MAX_ENTRIES) -> int:
+    stale = list(
+        QuestionBankEntry.objects.order_by("-last_used_at").values_list("pk", flat=True)[max_entries:]
+    )
+    if stale:
+        QuestionBankEntry.objects.filter(pk__in=stale).delete()
+    return len(stale)
+
+
+def bank_stats() -> dict:
+    """
+    {"titles": n, "hits": n, "misses": n, "hit_rate": 0..1}
+    """
+    totals = QuestionBankEntry.objects.aggregate(hits=Sum("hits"), misses=Sum("misses"))
+    hits, misses = totals["hits"] or 0, totals["misses"] or 0
+    return {
+        "titles": QuestionBankEntry.objects.count(),
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+    }
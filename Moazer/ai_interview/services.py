@@ -0,0 +1,124 @@
+"""
+Interview analysis job.
+
+The last answer of a session moves it to ANALYZING and queues
+run_analysis(session_id) on main.tasks; the model round trip then happens in a
+worker thread with no transaction open, and only the final write (answers
+feedback + session summary) is a short transaction. Failures leave the session
+FAILED so the user can retry, and an ANALYZING session whose job was lost (the
+process restarted) is queued again once it is older than ANALYSIS_STALE_AFTER.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from main.tasks import enqueue
+
+from .ai_service import analyze_session
+from .models import InterviewAnswer, InterviewSession, InterviewStatus
+
+logger = logging.getLogger(__name__)
+
+# A job normally finishes in seconds; past this it is presumed lost.
+ANALYSIS_STALE_AFTER = timedelta(minutes=5)
+
+
+# Statuses from which a session may (re)enter analysis.
+ANALYZABLE_STATUSES = (InterviewStatus.RUNNING, InterviewStatus.FAILED)
+
+
+def queue_analysis(session_id: int) -> bool:
+    """
+    Move a RUNNING or FAILED session to ANALYZING and queue its analysis
+    after commit. The conditional UPDATE lets only one caller claim it (a
+    double submit, or a retry while a job runs, queues nothing); returns
+    whether this call did.
+    """
+    claimed = InterviewSession.objects.filter(pk=session_id, status__in=ANALYZABLE_STATUSES).update(
+        status=InterviewStatus.ANALYZING, updated_at=timezone.now()
+    )
+    if claimed:
+        enqueue(run_analysis, session_id)
+    return bool(claimed)
+
+
+def requeue_if_stale(session: InterviewSession) -> bool:
+    """
+    Queue the analysis again if it has been ANALYZING for too long. The
+    conditional UPDATE lets only one of several concurrent page loads do it.
+    """
+    if session.status != InterviewStatus.ANALYZING:
+        return False
+    claimed = InterviewSession.objects.filter(
+        pk=session.pk,
+        status=InterviewStatus.ANALYZING,
+        updated_at__lt=timezone.now() - ANALYSIS_STALE_AFTER,
+    ).update(updated_at=timezone.now())
+    if claimed:
+        enqueue(run_analysis, session.pk)
+    return bool(claimed)
+
+
+def run_analysis(session_id: int) -> None:
+    """
+    Background job: analyze the answers and persist the feedback.
+    """
+    session = InterviewSession.objects.filter(pk=session_id, status=InterviewStatus.ANALYZING).first()
+    if session is None:
+        return
+    answers = {
+        a.question_id: a for a in InterviewAnswer.objects.filter(session=session)
+    }
+    questions = list(session.questions.all())
+    qa_pairs = [
+        {
+            "order": q.order,
+            "question": q.text,
+            "answer": (answers[q.id].answer if q.id in answers else "") or "",
+        }
+        for q in questions
+    ]
+
+    try:
+        analysis = analyze_session(job_title=session.job_title, qa_pairs=qa_pairs)
+    except Exception:
+        logger.exception("Interview analysis failed for session %s.", session_id)
+        InterviewSession.objects.filter(pk=session_id, status=InterviewStatus.ANALYZING).update(
+            status=InterviewStatus.FAILED, updated_at=timezone.now()
+        )
+        return
+
+    per_answers = {a["order"]: a for a in analysis.get("answers", [])}
+    updated = []
+    for q in questions:
+        a = answers.get(q.id)
+        if a is None:
+            continue
+        fb = per_answers.get(q.order, {})
+        a.strengths = fb.get("strengths", "") or ""
+        a.weaknesses = fb.get("weaknesses", "") or ""
+        a.score = fb.get("score")
+        updated.append(a)
+
+    sess = analysis.get("session", {})
+    overall = sess.get("overall_score")
+    if overall is None:
+        # If model forgot overall_score, compute from answers
+        scores = [a.score for a in updated if a.score is not None]
+        overall = round(sum(scores) / len(scores), 1) if scores else None
+
+    with transaction.atomic():
+        # Only the job that still sees ANALYZING writes (a stale re-queue may race it).
+        finished = InterviewSession.objects.filter(pk=session_id, status=InterviewStatus.ANALYZING).update(
+            strengths=sess.get("strengths", "") or "",
+            weaknesses=sess.get("weaknesses", "") or "",
+            recommendation=sess.get("recommendation", "") or "",
+            overall_score=overall,
+            status=InterviewStatus.FINISHED,
+            updated_at=timezone.now(),
+        )
+        if finished:
+            InterviewAnswer.objects.bulk_update(updated, ["strengths", "weaknesses", "score"])
@@ -1,3 +1,153 @@
-from django.test import TestCase
+import itertools
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import question_bank, services
+from .models import InterviewAnswer, InterviewSession, InterviewStatus, QuestionBankEntry, SessionQuestion
+
+
+def _analysis(label: str, score: int = 4) -> dict:
+    return {
+        "answers": [{"order": 1, "strengths": f"{label} strengths", "weaknesses": "", "score": score}],
+        "session": {"strengths": label, "weaknesses": "", "recommendation": "", "overall_score": score},
+    }
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class AnalysisJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("user")
+        self.client.force_login(self.user)
+        self.session = InterviewSession.objects.create(
+            user=self.user, job_title="محاسب", status=InterviewStatus.RUNNING
+        )
+        self.question = SessionQuestion.objects.create(session=self.session, order=1, text="عرّف بنفسك")
+        InterviewAnswer.objects.create(session=self.session, question=self.question, answer="...")
+
+    def _status(self):
+        self.session.refresh_from_db()
+        return self.session.status
+
+    def _submit_last_answer(self):
+        url = reverse("ai_interview:question", kwargs={"session_id": self.session.id, "step": 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {"answer": "خبرة خمس سنوات"})
+        self.assertRedirects(response, reverse("ai_interview:result", kwargs={"session_id": self.session.id}))
+
+    @mock.patch.object(services, "analyze_session", return_value=_analysis("first"))
+    def test_last_answer_analyzed_in_background(self, analyze):
+        self._submit_last_answer()
+        self.assertEqual(self._status(), InterviewStatus.FINISHED)
+        self.assertEqual(self.session.strengths, "first")
+        self.assertEqual(InterviewAnswer.objects.get().strengths, "first strengths")
+
+        # A finished session is neither edited nor analyzed again.
+        self._submit_last_answer()
+        self.assertEqual(analyze.call_count, 1)
+        self.assertEqual(InterviewAnswer.objects.get().answer, "خبرة خمس سنوات")
+
+    @mock.patch.object(services, "analyze_session", side_effect=[RuntimeError("provider down"), _analysis("retry")])
+    def test_failure_then_retry(self, analyze):
+        with self.assertLogs("ai_interview.services", "ERROR"):
+            self._submit_last_answer()
+        self.assertEqual(self._status(), InterviewStatus.FAILED)
+
+        url = reverse("ai_interview:retry_analysis", kwargs={"session_id": self.session.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url)
+        self.assertEqual(self._status(), InterviewStatus.FINISHED)
+        self.assertEqual(self.session.strengths, "retry")
+
+    @mock.patch.object(services, "analyze_session", return_value=_analysis("first"))
+    def test_only_one_caller_claims_the_analysis(self, analyze):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.assertTrue(services.queue_analysis(self.session.id))
+            self.assertFalse(services.queue_analysis(self.session.id))
+        self.assertEqual(len(callbacks), 1)
+
+    def test_stale_requeue_racing_a_running_job(self):
+        def slow_first_job(**kwargs):
+            # While the first job waits on the model, the session looks stale:
+            # a page load queues a second job, which finishes first.
+            InterviewSession.objects.filter(pk=self.session.pk).update(
+                updated_at=timezone.now() - services.ANALYSIS_STALE_AFTER - timedelta(seconds=1)
+            )
+            self.assertTrue(services.requeue_if_stale(InterviewSession.objects.get(pk=self.session.pk)))
+            with mock.patch.object(services, "analyze_session", return_value=_analysis("second", 5)):
+                services.run_analysis(self.session.pk)
+            return _analysis("first", 3)
+
+        with mock.patch.object(services, "analyze_session", side_effect=slow_first_job), \
+                self.captureOnCommitCallbacks(execute=True):
+            services.queue_analysis(self.session.id)
+
+        # Only the job that still saw ANALYZING wrote; the queued duplicate found FINISHED.
+        self.assertEqual(self._status(), InterviewStatus.FINISHED)
+        self.assertEqual((self.session.strengths, self.session.overall_score), ("second", 5))
+        self.assertEqual(InterviewAnswer.objects.get().score, 5)
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class QuestionBankTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        counter = itertools.count()
+        patcher = mock.patch.object(
+            question_bank, "generate_questions",
+            side_effect=lambda job_title, n: [f"{job_title} {next(counter)}" for _ in range(n)],
+        )
+        self.generate = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _draw(self, title):
+        with self.captureOnCommitCallbacks(execute=True):
+            return question_bank.draw_questions(title, n=5)
+
+    def test_miss_then_refill_then_hit(self):
+        self.assertEqual(len(self._draw("المحاسب")), 5)
+        entry = QuestionBankEntry.objects.get()
+        self.assertEqual((entry.title_key, entry.misses, entry.hits), ("محاسب", 1, 0))
+        self.assertEqual(len(entry.questions), question_bank.BANK_SIZE)
+        self.assertEqual(self.generate.call_count, 2)  # the session's questions, then the refill
+
+        questions = self._draw("مُحاسِب")
+        self.assertTrue(set(questions) <= set(entry.questions))
+        self.assertEqual(self.generate.call_count, 2)
+        self.assertEqual(QuestionBankEntry.objects.get().hits, 1)
+
+    def test_stale_pool_refilled_once_at_a_time(self):
+        QuestionBankEntry.objects.create(title_key="محاسب", job_title="محاسب", questions=[f"q{i}" for i in range(5)])
+        lock = question_bank._refill_lock("محاسب")
+        cache.add(lock, 1)
+        self._draw("محاسب")  # refill already running elsewhere: nothing queued
+        self.assertEqual(self.generate.call_count, 0)
+        question_bank.refill("محاسب", "محاسب")  # a job that was queued anyway backs off
+        self.assertEqual(self.generate.call_count, 0)
+
+        cache.delete(lock)
+        self._draw("محاسب")
+        self.assertEqual(self.generate.call_count, 1)
+        self.assertEqual(len(QuestionBankEntry.objects.get().questions), question_bank.BANK_SIZE)
+        self.assertIsNone(cache.get(lock))
+
+    def test_rolled_back_request_leaves_no_lock(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            question_bank.draw_questions("محاسب", n=5)
+            raise RuntimeError("request failed")
+        self.assertIsNone(cache.get(question_bank._refill_lock("محاسب")))
+
+    def test_evicts_least_recently_used(self):
+        for i, title in enumerate(["محاسب", "مهندس", "طبيب"]):
+            QuestionBankEntry.objects.create(title_key=title, job_title=title)
+            QuestionBankEntry.objects.filter(title_key=title).update(
+                last_used_at=timezone.now() - timedelta(days=3 - i)
+            )
+        self.assertEqual(question_bank.evict(max_entries=2), 1)
+        self.assertEqual(sorted(QuestionBankEntry.objects.values_list("title_key", flat=True)), ["طبيب", "مهندس"])
@@ -8,4 +8,5 @@ urlpatterns = [
     path("start/", views.start_view, name="start"),
     path("<int:session_id>/q/<int:step>/", views.question_view, name="question"),
     path("<int:session_id>/result/", views.result_view, name="result"),
+    path("<int:session_id>/analyze/", views.retry_analysis_view, name="retry_analysis"),
 ]
\ No newline at end of file
@@ -2,6 +2,7 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
 from django.shortcuts import render, redirect, get_object_or_404
+from django.views.decorators.http import require_POST
 
 from .models import (
     InterviewSession,
@@ -9,7 +10,8 @@ from .models import (
     InterviewAnswer,
     InterviewStatus,
 )
-from .ai_service import generate_questions, analyze_session
+from .question_bank import draw_questions
+from .services import queue_analysis, requeue_if_stale
 
 from subscriptions.services import (
     get_remaining_attempts,
@@ -55,8 +57,8 @@ def start_view(request):
             status=InterviewStatus.RUNNING,
         )
 
-        # Generate 5 questions (AI if available; fallback otherwise)
-        qs = generate_questions(job_title=job, n=5)
+        # Draw 5 questions from the question bank (the model is called on a miss)
+        qs = draw_questions(job, n=5)
         bulk = [SessionQuestion(session=s, order=i + 1, text=txt) for i, txt in enumerate(qs)]
         SessionQuestion.objects.bulk_create(bulk)
 
@@ -67,19 +69,24 @@ def start_view(request):
 
 
 @login_required
-@transaction.atomic
 def question_view(request, session_id: int, step: int):
     """
     Single-question screen:
       - Shows question #step in the session.
       - Saves user's answer on POST and navigates to next step.
-      - On last step, aggregates answers, runs AI analysis, marks session FINISHED, and redirects to result.
+      - On last step, marks the session ANALYZING, queues the AI analysis
+        (ai_interview.services) and redirects to the result page, which shows
+        a pending state until the job finishes.
     """
     s = get_object_or_404(InterviewSession, pk=session_id, user=request.user)
 
+    # Answers are frozen while they are being analyzed, and once they have been.
+    if s.status == InterviewStatus.ANALYZING or (s.status == InterviewStatus.FINISHED and request.method == "POST"):
+        return redirect("ai_interview:result", session_id=s.id)
+
     # Defensive: ensure questions exist (normally created in start_view)
     if s.questions.count() == 0:
-        qs = generate_questions(job_title=s.job_title, n=5)
+        qs = draw_questions(s.job_title, n=5)
         bulk = [SessionQuestion(session=s, order=i + 1, text=txt) for i, txt in enumerate(qs)]
         SessionQuestion.objects.bulk_create(bulk)
 
@@ -93,53 +100,17 @@ def question_view(request, session_id: int, step: int):
     if request.method == "POST":
         # Save or update this answer
         txt = (request.POST.get("answer") or "").strip()
-        ans, _ = InterviewAnswer.objects.get_or_create(session=s, question=q)
-        ans.answer = txt
-        ans.save()
-
-        # Move forward until last question
-        if step < total:
-            return redirect("ai_interview:question", session_id=s.id, step=step + 1)
-
-        # Last step → aggregate answers and analyze
-        qa_pairs = []
-        for qq in questions:
-            ans = InterviewAnswer.objects.filter(session=s, question=qq).first()
-            qa_pairs.append({
-                "order": qq.order,
-                "question": qq.text,
-                "answer": (ans.answer if ans else "") or "",
-            })
-
-        analysis = analyze_session(job_title=s.job_title, qa_pairs=qa_pairs)
-
-        # Persist per-answer feedback
-        per_answers = {a["order"]: a for a in analysis.get("answers", [])}
-        for qq in questions:
-            a = InterviewAnswer.objects.get(session=s, question=qq)
-            fb = per_answers.get(qq.order, {})
-            a.strengths = fb.get("strengths", "") or ""
-            a.weaknesses = fb.get("weaknesses", "") or ""
-            a.score = fb.get("score")
-            a.save(update_fields=["strengths", "weaknesses", "score"])
-
-        # Session-level summary
-        sess = analysis.get("session", {})
-        s.strengths = sess.get("strengths", "") or ""
-        s.weaknesses = sess.get("weaknesses", "") or ""
-        s.recommendation = sess.get("recommendation", "") or ""
-
-        # If model forgot overall_score, compute from answers
-        if sess.get("overall_score") is not None:
-            s.overall_score = sess["overall_score"]
-        else:
-            # compute mean of existing scores
-            vals = InterviewAnswer.objects.filter(session=s, score__isnull=False).values_list("score", flat=True)
-            vals = list(vals)
-            s.overall_score = round(sum(vals) / len(vals), 1) if vals else None
-
-        s.status = InterviewStatus.FINISHED
-        s.save(update_fields=["strengths", "weaknesses", "recommendation", "overall_score", "status"])
+        with transaction.atomic():
+            ans, _ = InterviewAnswer.objects.get_or_create(session=s, question=q)
+            ans.answer = txt
+            ans.save()
+
+            # Move forward until last question
+            if step < total:
+                return redirect("ai_interview:question", session_id=s.id, step=step + 1)
+
+            # Last step → analysis runs in the background after commit
+            queue_analysis(s.id)
 
         return redirect("ai_interview:result", session_id=s.id)
 
@@ -163,9 +134,23 @@ def result_view(request, session_id: int):
       - and Q/A log.
     """
     s = get_object_or_404(InterviewSession, pk=session_id, user=request.user)
+    # An analysis lost to a restart is queued again.
+    requeue_if_stale(s)
     answers = (
         InterviewAnswer.objects.filter(session=s)
         .select_related("question")
         .order_by("question__order")
     )
     return render(request, "ai_interview/result.html", {"s": s, "answers": answers})
+
+
+@login_required
+@require_POST
+def retry_analysis_view(request, session_id: int):
+    """
+    Queue the analysis again after it FAILED.
+    """
+    s = get_object_or_404(InterviewSession, pk=session_id, user=request.user)
+    if s.status == InterviewStatus.FAILED:
+        queue_analysis(s.id)  # claims FAILED → ANALYZING only once
+    return redirect("ai_interview:result", session_id=s.id)
@@ -1,3 +1,13 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import QuestionPool
+
+
+@admin.register(QuestionPool)
+class QuestionPoolAdmin(admin.ModelAdmin):
+    list_display = ("phase", "label", "size", "hits", "misses", "generated_at")
+    ordering = ("phase", "label")
+
+    @admin.display(description="الأسئلة")
+    def size(self, obj):
+        return len(obj.questions)
@@ -8,28 +8,16 @@ This module talks to OpenAI to:
 - Produce a final concise analysis (strengths, weaknesses, recommendation).
 
 Design goals:
+- All calls go through main.llm (shared client, deadlines, retries, circuit breaker).
 - Fail fast if OPENAI_API_KEY is missing.
 - Keep outputs as plain strings; normalize arrays/objects defensively.
 - Keep prompts short, deterministic, and Arabic-native.
 """
 
-import os
 import json
 import re
-from django.core.exceptions import ImproperlyConfigured
 
-# --- Configuration / Initialization -------------------------------------------------
-
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
-
-try:
-    # Requires: pip install --upgrade openai
-    from openai import OpenAI
-except Exception as e:
-    raise ImproperlyConfigured("OpenAI SDK is not installed. Run: pip install --upgrade openai") from e
-
-# Lazily create the client. We validate presence of the key at call time via _require_client().
-_client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+from main.llm import complete
 
 # Canonical, user-facing Arabic labels for School mode classification.
 PATH_LABELS = [
@@ -42,15 +30,6 @@ PATH_LABELS = [
 ]
 
 
-def _require_client():
-    """
-    Ensure the OpenAI client is configured before any request.
-    Raises an explicit configuration error if the API key is missing.
-    """
-    if not _client:
-        raise ImproperlyConfigured("OPENAI_API_KEY is missing. Set it and restart the server.")
-
-
 def _split_lines(text: str) -> list[str]:
     """
     Turn a model response into a clean list of items:
@@ -73,14 +52,12 @@ def generate_phase1_questions_school(n: int = 10) -> list[str]:
     Generate 'n' broad discovery questions spanning PATH_LABELS for school/uni students.
     Returns a list of Arabic strings (one question per item).
     """
-    _require_client()
     prompt = (
         f"اكتب {n} أسئلة عربية قصيرة لاكتشاف ميول الطالب المهنية تغطي عدة مسارات: "
         f"{', '.join(PATH_LABELS)}. اجعلها واضحة ومفتوحة النهاية. "
         "أعد كل سؤال في سطر مستقل، دون أرقام أو شروح."
     )
-    r = _client.responses.create(model="gpt-4o-mini", input=prompt)
-    lines = _split_lines(r.output_text)
+    lines = _split_lines(complete(prompt))
     if len(lines) < n:
         raise RuntimeError("OpenAI returned fewer questions than requested (school p1).")
     return lines[:n]
@@ -91,7 +68,6 @@ def pick_suggested_path_from_phase1(answers_text: str) -> str:
     Classify phase-1 answers into exactly one path from PATH_LABELS.
     Returns an Arabic label verbatim from PATH_LABELS.
     """
-    _require_client()
     labels = ", ".join(PATH_LABELS)
     prompt = (
         "من خلال إجابات طالب على أسئلة عامة، اختر مسارًا واحدًا فقط "
@@ -99,8 +75,7 @@ def pick_suggested_path_from_phase1(answers_text: str) -> str:
         "أعد JSON فقط بهذا الشكل: {\"path\": \"<أحد المسارات حرفيًا>\"}.\n\n"
         f"الإجابات:\n{answers_text}\n"
     )
-    r = _client.responses.create(model="gpt-4o-mini", input=prompt)
-    txt = r.output_text.strip()
+    txt = complete(prompt).strip()
     m = re.search(r"\{.*\}", txt, flags=re.S)
     if not m:
         raise RuntimeError("No JSON for suggested path.")
@@ -116,13 +91,11 @@ def generate_phase2_questions_school(suggested_path: str, n: int = 10) -> list[s
     """
     Generate 'n' specialized questions for the chosen high-level path (School mode).
     """
-    _require_client()
     prompt = (
         f"اكتب {n} أسئلة عربية قصيرة متخصصة لمسار: {suggested_path}. "
         "كل سؤال في سطر مستقل، بدون أرقام."
     )
-    r = _client.responses.create(model="gpt-4o-mini", input=prompt)
-    lines = _split_lines(r.output_text)
+    lines = _split_lines(complete(prompt))
     if len(lines) < n:
         raise RuntimeError("OpenAI returned fewer questions than requested (school p2).")
     return lines[:n]
@@ -135,14 +108,12 @@ def generate_phase1_questions_grad(major: str, n: int = 10) -> list[str]:
     Generate 'n' general-but-within-major questions for graduates/candidates.
     Example major: 'علوم حاسب'.
     """
-    _require_client()
     prompt = (
         f"اكتب {n} أسئلة عربية قصيرة لاستكشاف ميول مرشح داخل تخصصه الجامعي: {major}. "
         "الأسئلة عامة ولكن ضمن هذا التخصص، لإبراز التوجهات الدقيقة (مثال: أمن، ذكاء اصطناعي، تطوير...). "
         "أعد كل سؤال في سطر مستقل وبدون أرقام."
     )
-    r = _client.responses.create(model="gpt-4o-mini", input=prompt)
-    lines = _split_lines(r.output_text)
+    lines = _split_lines(complete(prompt))
     if len(lines) < n:
         raise RuntimeError("OpenAI returned fewer questions than requested (grad p1).")
     return lines[:n]
@@ -153,7 +124,6 @@ def pick_subpath_within_major(major: str, answers_text: str) -> str:
     Pick a single precise subpath INSIDE the supplied major (Arabic label).
     The subpath is model-generated, not restricted to a predefined list.
     """
-    _require_client()
     prompt = (
         "استنادًا إلى إجابات مرشح داخل تخصص جامعي محدد، اختر مسارًا دقيقًا واحدًا (مثال في الحاسب: "
         "أمن سيبراني، تعلم الآلة/ذكاء اصطناعي، تطوير واجهات، تطوير خلفيات، علم البيانات، شبكات...). "
@@ -161,8 +131,7 @@ def pick_subpath_within_major(major: str, answers_text: str) -> str:
         f"التخصص: {major}\n"
         f"الإجابات:\n{answers_text}\n"
     )
-    r = _client.responses.create(model="gpt-4o-mini", input=prompt)
-    txt = r.output_text.strip()
+    txt = complete(prompt).strip()
     m = re.search(r"\{.*\}", txt, flags=re.S)
     if not m:
         raise RuntimeError("No JSON for subpath.")
@@ -177,13 +146,11 @@ def generate_phase2_questions_grad(subpath: str, n: int = 10) -> list[str]:
     """
     Generate 'n' specialized questions for the chosen precise subpath (Grad mode).
     """
-    _require_client()
     prompt = (
         f"اكتب {n} أسئلة عربية قصيرة متخصصة لمسار دقيق: {subpath}. "
         "كل سؤال في سطر مستقل، بدون أرقام."
     )
-    r = _client.responses.create(model="gpt-4o-mini", input=prompt)
-    lines = _split_lines(r.output_text)
+    lines = _split_lines(complete(prompt))
     if len(lines) < n:
         raise RuntimeError("OpenAI returned fewer questions than requested (grad p2).")
     return lines[:n]
@@ -215,15 +182,13 @@ def analyze_final_result(suggested_path: str, answers_text: str) -> dict:
     Produce a concise final report in Arabic.
     Returns a dict with the keys: strengths, weaknesses, recommendation (all strings).
     """
-    _require_client()
     prompt = (
         "حلّل إجابات مختصرة وأعد JSON فقط بالمفاتيح: strengths, weaknesses, recommendation. "
         "اجعل القيم نصًا عربيًا موجزًا، وإذا تعددت النقاط افصلها بفواصل.\n\n"
         f"المسار المقترح: {suggested_path}\n"
         f"الإجابات:\n{answers_text}\n"
     )
-    r = _client.responses.create(model="gpt-4o-mini", input=prompt)
-    txt = r.output_text.strip()
+    txt = complete(prompt).strip()
     m = re.search(r"\{.*\}", txt, flags=re.S)
     obj = json.loads(m.group(0) if m else txt)
     return {
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from career_path.models import QuestionPool
+from career_path.question_pools import POOL_SIZE, all_pools, refill
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the School-mode question pools (phase 1 and phase 2 per path label) "
+        "so sessions never wait for the model, then print their hit/miss counts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--only-missing", action="store_true",
+                            help=f"Skip pools that already hold {POOL_SIZE} questions.")
+        parser.add_argument("--stats", action="store_true", help="Only print the statistics.")
+
+    def handle(self, *args, **options):
+        if not options["stats"]:
+            sizes = {
+                (p.phase, p.label): len(p.questions) for p in QuestionPool.objects.all()
+            }
+            for phase, label in all_pools():
+                if options["only_missing"] and sizes.get((phase, label), 0) >= POOL_SIZE:
+                    continue
+                try:
+                    size = refill(phase, label)
+                except Exception as exc:
+                    self.stderr.write(f"phase {phase} {label or '-'}: {exc}")
+                    continue
+                if size is None:
+                    self.stdout.write(f"phase {phase} {label or '-'}: refill already running, skipped")
+                else:
+                    self.stdout.write(f"phase {phase} {label or '-'}: {size} questions")
+
+        for pool in QuestionPool.objects.order_by("phase", "label"):
+            draws = pool.hits + pool.misses
+            rate = pool.hits / draws if draws else 0.0
+            self.stdout.write(
+                f"P{pool.phase} {pool.label or '-':<14} {len(pool.questions):>3}q "
+                f"hits={pool.hits} misses={pool.misses} hit_rate={rate:.0%}"
+            )
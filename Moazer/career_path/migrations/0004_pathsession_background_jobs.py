@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('career_path', '0003_pathsession_major_pathsession_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pathsession',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='pathsession',
+            name='status',
+            field=models.CharField(choices=[('RUNNING', 'جارية'), ('PHASE2_PENDING', 'تجهيز المرحلة الثانية'), ('ANALYZING', 'قيد التحليل'), ('FINISHED', 'منتهية'), ('FAILED', 'تعذّر التحليل')], default='RUNNING', max_length=20),
+        ),
+    ]
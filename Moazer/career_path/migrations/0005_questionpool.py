@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('career_path', '0004_pathsession_background_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionPool',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phase', models.PositiveSmallIntegerField()),
+                ('label', models.CharField(blank=True, max_length=100)),
+                ('questions', models.JSONField(default=list)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('misses', models.PositiveIntegerField(default=0)),
+                ('generated_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('phase', 'label')},
+            },
+        ),
+    ]
@@ -5,7 +5,10 @@ User = settings.AUTH_USER_MODEL
 
 class PathStatus(models.TextChoices):
     RUNNING = "RUNNING", "جارية"
+    PHASE2_PENDING = "PHASE2_PENDING", "تجهيز المرحلة الثانية"
+    ANALYZING = "ANALYZING", "قيد التحليل"
     FINISHED = "FINISHED", "منتهية"
+    FAILED = "FAILED", "تعذّر التحليل"
 
 class PathMode(models.TextChoices):
     SCHOOL = "SCHOOL", "طلاب المدارس/المقبلون على الجامعة"
@@ -24,7 +27,10 @@ class PathSession(models.Model):
 
     Status:
         - 'RUNNING' while asking questions
+        - 'PHASE2_PENDING' / 'ANALYZING' while a background job (career_path.services)
+          builds phase 2 / the final analysis
         - 'FINISHED' once final analysis is stored
+        - 'FAILED' if a job failed (the user can retry)
     """
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, null=True, blank=True,
@@ -49,6 +55,7 @@ class PathSession(models.Model):
     recommendation = models.TextField(blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def owned_by_request(self, request) -> bool:
         """
@@ -94,4 +101,25 @@ class PathAnswer(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = ("session", "question")
\ No newline at end of file
+        unique_together = ("session", "question")
+
+class QuestionPool(models.Model):
+    """
+    Pre-generated School-mode questions (see career_path.question_pools):
+    one phase-1 pool (label empty) and one phase-2 pool per PATH_LABELS entry.
+    Sessions draw random samples, so the pools hold more than one session needs.
+    """
+    phase = models.PositiveSmallIntegerField()            # 1 or 2
+    label = models.CharField(max_length=100, blank=True)  # PATH_LABELS entry for phase 2
+    questions = models.JSONField(default=list)
+
+    hits = models.PositiveIntegerField(default=0)    # draws served from the pool
+    misses = models.PositiveIntegerField(default=0)  # draws that had to call the model
+
+    generated_at = models.DateTimeField(auto_now_add=True)  # last refill (TTL)
+
+    class Meta:
+        unique_together = ("phase", "label")
+
+    def __str__(self):
+        return f"P{self.phase} {self.label or '—'} ({len(self.questions)})"
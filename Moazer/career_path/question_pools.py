@@ -0,0 +1,103 @@
+"""
+Pre-generated question pools for School mode.
+
+School-mode questions don't depend on the student: phase 1 is always a broad
+survey across PATH_LABELS, and phase 2 only depends on which of the six labels
+was picked. Instead of calling the model per session, QuestionPool keeps
+POOL_SIZE questions per pool and sessions draw random samples:
+
+  - hit:  the pool has enough questions; no LLM call. A pool older than
+          POOL_TTL or smaller than POOL_SIZE is topped up in the background
+          (main.tasks).
+  - miss: (first use, before warm_question_pools ran) the questions are
+          generated synchronously, stored, and a refill grows the pool.
+
+Grad mode depends on free-text majors and keeps calling the model.
+"""
+
+import random
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
+from main import pools
+
+from .ai_service import PATH_LABELS, generate_phase1_questions_school, generate_phase2_questions_school
+from .models import QuestionPool
+
+POOL_SIZE = 40
+POOL_TTL = timedelta(days=30)
+# Generation calls per refill; each returns one session's worth of questions.
+MAX_REFILL_ROUNDS = 6
+ROUND_SIZE = 10
+
+REFILL_LOCK_KEY = "career_path:pool-refill:{digest}"
+
+
+def _generate(phase: int, label: str, n: int) -> list[str]:
+    if phase == 1:
+        return generate_phase1_questions_school(n)
+    return generate_phase2_questions_school(label, n)
+
+
+def _refill_lock(phase: int, label: str) -> str:
+    return pools.lock_key(REFILL_LOCK_KEY, phase, label)
+
+
+def draw(phase: int, label: str, n: int) -> list[str]:
+    """
+    n questions for a School-mode phase (label: the PATH_LABELS entry for phase 2).
+    """
+    label = label if phase == 2 else ""
+    pool = QuestionPool.objects.filter(phase=phase, label=label).first()
+    if pool is not None and len(pool.questions) >= n:
+        QuestionPool.objects.filter(pk=pool.pk).update(hits=F("hits") + 1)
+        if len(pool.questions) < POOL_SIZE or pool.generated_at < timezone.now() - POOL_TTL:
+            queue_refill(phase, label)
+        return random.sample(pool.questions, n)
+
+    questions = _generate(phase, label, n)
+    _store_miss(phase, label, questions)
+    queue_refill(phase, label)
+    return questions
+
+
+def draw_phase1(n: int) -> list[str]:
+    return draw(1, "", n)
+
+
+def draw_phase2(label: str, n: int) -> list[str]:
+    return draw(2, label, n)
+
+
+def _store_miss(phase: int, label: str, questions: list[str]) -> None:
+    pools.record_miss(QuestionPool, {"phase": phase, "label": label}, {"questions": questions})
+
+
+def queue_refill(phase: int, label: str) -> None:
+    pools.queue_refill(_refill_lock(phase, label), refill, phase, label)
+
+
+def refill(phase: int, label: str) -> int | None:
+    """
+    Generate up to POOL_SIZE fresh questions and put them in front of the
+    pool (older ones fall off the end). Returns the pool size, or None when
+    another refill of the pool holds the lock (main.pools).
+    """
+    with pools.refill_lock(_refill_lock(phase, label)) as acquired:
+        if not acquired:
+            return None
+        fresh = []
+        for _ in range(MAX_REFILL_ROUNDS):
+            fresh = pools.dedupe(fresh + _generate(phase, label, ROUND_SIZE))
+            if len(fresh) >= POOL_SIZE:
+                break
+        pool, _ = QuestionPool.objects.get_or_create(phase=phase, label=label)
+        questions = pools.dedupe(fresh + pool.questions)[:POOL_SIZE]
+        QuestionPool.objects.filter(pk=pool.pk).update(questions=questions, generated_at=timezone.now())
+        return len(questions)
+
+
+def all_pools() -> list[tuple[int, str]]:
+    return [(1, "")] + [(2, label) for label in PATH_LABELS]
@@ -0,0 +1,171 @@
+"""
+Background jobs for the career-path phase transitions.
+
+Two points of a session need slow LLM round trips: the end of phase 1
+(classify the answers, then generate the phase-2 questions, which School mode
+draws from career_path.question_pools) and the last answer (final analysis).
+Instead of running them inside the request, the view moves the session to
+PHASE2_PENDING / ANALYZING and queues build_phase2 / run_final_analysis on
+main.tasks; the question page then polls views.status_view until the job
+moves the session on.
+
+Each job re-checks the status it was queued for and claims the transition with
+a conditional UPDATE, so a job queued twice (stale re-queue, retry) writes
+once. Failures move the session to FAILED, from which the user can retry.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from main.tasks import enqueue
+
+from .ai_service import (
+    analyze_final_result,
+    generate_phase2_questions_grad,
+    pick_subpath_within_major,
+    pick_suggested_path_from_phase1,
+)
+from .models import PathAnswer, PathMode, PathQuestion, PathSession, PathStatus
+from .question_pools import draw_phase2
+
+logger = logging.getLogger(__name__)
+
+PHASE1_COUNT = 10
+PHASE2_COUNT = 10
+TOTAL = PHASE1_COUNT + PHASE2_COUNT
+
+# A job normally finishes in seconds; past this it is presumed lost.
+JOB_STALE_AFTER = timedelta(minutes=5)
+
+
+def _joined_answers(session: PathSession, last_order: int) -> str:
+    """
+    "س1: ...\\nس2: ..." for questions 1..last_order, two queries.
+    """
+    answers = dict(PathAnswer.objects.filter(session=session).values_list("question_id", "answer"))
+    return "\n".join(
+        f"س{q.order}: {answers.get(q.id) or ''}"
+        for q in session.questions.filter(order__lte=last_order)
+    )
+
+
+def _fail(session_id: int, status: str) -> None:
+    PathSession.objects.filter(pk=session_id, status=status).update(
+        status=PathStatus.FAILED, updated_at=timezone.now()
+    )
+
+
+# -------------------------------------------------------------------
+# Jobs
+# -------------------------------------------------------------------
+
+def build_phase2(session_id: int) -> None:
+    """
+    Pick the (sub)path from the phase-1 answers and append the phase-2 questions.
+    """
+    session = PathSession.objects.filter(pk=session_id, status=PathStatus.PHASE2_PENDING).first()
+    if session is None:
+        return
+    joined = _joined_answers(session, PHASE1_COUNT)
+    try:
+        if session.mode == PathMode.SCHOOL:
+            suggested = pick_suggested_path_from_phase1(joined)
+            questions = draw_phase2(suggested, PHASE2_COUNT)
+        else:
+            suggested = pick_subpath_within_major(session.major or "غير محدد", joined)
+            questions = generate_phase2_questions_grad(suggested, PHASE2_COUNT)
+    except Exception:
+        logger.exception("Phase-2 generation failed for path session %s.", session_id)
+        _fail(session_id, PathStatus.PHASE2_PENDING)
+        return
+
+    with transaction.atomic():
+        claimed = PathSession.objects.filter(pk=session_id, status=PathStatus.PHASE2_PENDING).update(
+            status=PathStatus.RUNNING, updated_at=timezone.now()
+        )
+        if not claimed:
+            return
+        PathQuestion.objects.bulk_create(
+            [PathQuestion(session=session, order=PHASE1_COUNT + 1 + i, phase=2, text=t) for i, t in enumerate(questions)]
+        )
+        # save() rather than update(): post_save refreshes the student's recommendations.
+        session.suggested_path = suggested
+        session.save(update_fields=["suggested_path"])
+
+
+def run_final_analysis(session_id: int) -> None:
+    """
+    Summarize all answers and close the session.
+    """
+    session = PathSession.objects.filter(pk=session_id, status=PathStatus.ANALYZING).first()
+    if session is None:
+        return
+    try:
+        result = analyze_final_result(session.suggested_path or "غير محدد", _joined_answers(session, TOTAL))
+    except Exception:
+        logger.exception("Final analysis failed for path session %s.", session_id)
+        _fail(session_id, PathStatus.ANALYZING)
+        return
+
+    PathSession.objects.filter(pk=session_id, status=PathStatus.ANALYZING).update(
+        strengths=result.get("strengths", ""),
+        weaknesses=result.get("weaknesses", ""),
+        recommendation=result.get("recommendation", ""),
+        status=PathStatus.FINISHED,
+        updated_at=timezone.now(),
+    )
+
+
+JOBS = {
+    PathStatus.PHASE2_PENDING: build_phase2,
+    PathStatus.ANALYZING: run_final_analysis,
+}
+
+# Statuses from which a session may be queued for either job.
+QUEUEABLE_STATUSES = (PathStatus.RUNNING, PathStatus.FAILED)
+
+
+# -------------------------------------------------------------------
+# Queueing (called from views)
+# -------------------------------------------------------------------
+
+def queue_job(session_id: int, status: str) -> bool:
+    """
+    Move a RUNNING or FAILED session to a pending status and queue its job
+    after commit. The conditional UPDATE lets only one caller claim it (a
+    double submit or retry queues nothing); returns whether this call did.
+    """
+    claimed = PathSession.objects.filter(pk=session_id, status__in=QUEUEABLE_STATUSES).update(
+        status=status, updated_at=timezone.now()
+    )
+    if claimed:
+        enqueue(JOBS[status], session_id)
+    return bool(claimed)
+
+
+def retry_failed(session: PathSession) -> bool:
+    """
+    Queue the failed job again: phase 2 if it was never built, else the analysis.
+    """
+    if session.status != PathStatus.FAILED:
+        return False
+    has_phase2 = session.questions.filter(phase=2).exists()
+    return queue_job(session.pk, PathStatus.ANALYZING if has_phase2 else PathStatus.PHASE2_PENDING)
+
+
+def requeue_if_stale(session: PathSession) -> bool:
+    """
+    Queue a pending job again if it has been pending too long (lost to a
+    restart). The conditional UPDATE lets only one concurrent poll do it.
+    """
+    if session.status not in JOBS:
+        return False
+    claimed = PathSession.objects.filter(
+        pk=session.pk, status=session.status, updated_at__lt=timezone.now() - JOB_STALE_AFTER
+    ).update(updated_at=timezone.now())
+    if claimed:
+        enqueue(JOBS[session.status], session.pk)
+    return bool(claimed)
@@ -1,3 +1,124 @@
-from django.test import TestCase
+import itertools
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from . import question_pools, services
+from .ai_service import PATH_LABELS
+from .models import PathAnswer, PathMode, PathQuestion, PathSession, PathStatus, QuestionPool
+
+RESULT = {"strengths": "تحليل", "weaknesses": "", "recommendation": "تدرّب"}
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+@mock.patch.object(services, "pick_subpath_within_major", return_value="محاسبة مالية")
+@mock.patch.object(services, "generate_phase2_questions_grad", side_effect=lambda path, n: [f"{path} {i}" for i in range(n)])
+class PhaseJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("user")
+        self.client.force_login(self.user)
+        self.session = PathSession.objects.create(
+            user=self.user, mode=PathMode.GRAD, major="محاسبة", status=PathStatus.RUNNING
+        )
+        PathQuestion.objects.bulk_create(
+            PathQuestion(session=self.session, order=i + 1, phase=1, text=f"س{i + 1}")
+            for i in range(services.PHASE1_COUNT)
+        )
+
+    def _status(self):
+        self.session.refresh_from_db()
+        return self.session.status
+
+    def _answer(self, step, execute=True):
+        url = reverse("career_path:question", args=[self.session.id, step])
+        with self.captureOnCommitCallbacks(execute=execute):
+            return self.client.post(url, {"answer": f"جواب {step}"})
+
+    def _poll(self):
+        return self.client.get(reverse("career_path:status", args=[self.session.id])).json()
+
+    def test_phase2_then_analysis(self, *mocks):
+        self._answer(services.PHASE1_COUNT)
+        self.assertEqual(self._status(), PathStatus.RUNNING)
+        self.assertEqual(self.session.suggested_path, "محاسبة مالية")
+        self.assertEqual(self.session.questions.filter(phase=2).count(), services.PHASE2_COUNT)
+        self.assertEqual(
+            self._poll()["next"], reverse("career_path:question", args=[self.session.id, services.PHASE1_COUNT + 1])
+        )
+
+        with mock.patch.object(services, "analyze_final_result", return_value=RESULT) as analyze:
+            response = self._answer(services.TOTAL)
+            self.assertRedirects(response, reverse("career_path:result", args=[self.session.id]), 302, 200)
+            self.assertEqual(self._status(), PathStatus.FINISHED)
+            self.assertEqual(self.session.recommendation, "تدرّب")
+            self.assertIn("س20: جواب 20", analyze.call_args.args[1])
+            self.assertEqual(self._poll()["next"], reverse("career_path:result", args=[self.session.id]))
+
+            # A finished session is neither edited nor analyzed again.
+            self._answer(services.TOTAL)
+            self.assertEqual(analyze.call_count, 1)
+        self.assertEqual(PathAnswer.objects.get(question__order=services.TOTAL).answer, f"جواب {services.TOTAL}")
+
+    def test_pending_status_and_single_claim(self, *mocks):
+        response = self._answer(services.PHASE1_COUNT, execute=False)
+        self.assertRedirects(
+            response, reverse("career_path:question", args=[self.session.id, services.PHASE1_COUNT + 1]), 302, 200
+        )
+        self.assertEqual(self._poll(), {"status": PathStatus.PHASE2_PENDING, "label": "تجهيز المرحلة الثانية", "next": None})
+        # Re-submitting, or queueing the other job, claims nothing.
+        self.assertFalse(services.queue_job(self.session.id, PathStatus.PHASE2_PENDING))
+        self.assertFalse(services.queue_job(self.session.id, PathStatus.ANALYZING))
+
+    def test_failure_then_retry(self, *mocks):
+        self._answer(services.PHASE1_COUNT)
+        with mock.patch.object(services, "analyze_final_result", side_effect=RuntimeError("provider down")), \
+                self.assertLogs("career_path.services", "ERROR"):
+            self._answer(services.TOTAL)
+        self.assertEqual(self._status(), PathStatus.FAILED)
+        self.assertEqual(self._poll()["next"], None)
+
+        with mock.patch.object(services, "analyze_final_result", return_value=RESULT), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("career_path:retry", args=[self.session.id]))
+        self.assertEqual(self._status(), PathStatus.FINISHED)
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class QuestionPoolTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        counter = itertools.count()
+        patcher = mock.patch.object(
+            question_pools, "_generate", side_effect=lambda phase, label, n: [f"{label} {next(counter)}" for _ in range(n)]
+        )
+        self.generate = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _draw(self, label):
+        with self.captureOnCommitCallbacks(execute=True):
+            return question_pools.draw_phase2(label, 10)
+
+    def test_miss_then_refill_then_hit(self):
+        label = PATH_LABELS[0]
+        self.assertEqual(len(self._draw(label)), 10)
+        pool = QuestionPool.objects.get(phase=2, label=label)
+        self.assertEqual(pool.misses, 1)
+        self.assertEqual(len(pool.questions), question_pools.POOL_SIZE)
+        calls = self.generate.call_count
+
+        self.assertTrue(set(self._draw(label)) <= set(pool.questions))
+        self.assertEqual(self.generate.call_count, calls)
+        self.assertEqual(QuestionPool.objects.get(pk=pool.pk).hits, 1)
+
+    def test_refill_lock_taken_by_the_job(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            question_pools.draw_phase1(10)
+            raise RuntimeError("request failed")
+        self.assertIsNone(cache.get(question_pools._refill_lock(1, "")))
+
+        cache.add(question_pools._refill_lock(1, ""), 1)
+        self.assertIsNone(question_pools.refill(1, ""))
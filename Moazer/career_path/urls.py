@@ -10,4 +10,6 @@ urlpatterns = [
     path("list/", views.list_view, name="list"),
     path("<int:session_id>/q/<int:step>/", views.question_view, name="question"),
     path("<int:session_id>/result/", views.result_view, name="result"),
+    path("<int:session_id>/status/", views.status_view, name="status"),
+    path("<int:session_id>/retry/", views.retry_view, name="retry"),
 ]
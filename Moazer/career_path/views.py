@@ -5,7 +5,9 @@ Flow overview:
 - landing_view: user chooses mode (School vs Grad).
 - start_school_view: phase-1 generation for School mode (broad domains).
 - start_grad_view: phase-1 generation for Grad mode (requires a university major).
-- question_view: single-question workflow; expands into phase-2; finalizes and stores analysis.
+- question_view: single-question workflow; queues phase-2 generation and the final analysis
+  (career_path.services) and shows a pending page while they run.
+- status_view: JSON status polled by the pending page.
 - list_view: shows authenticated user's historical sessions.
 - result_view: read-only details for a specific session (ownership enforced).
 
@@ -15,22 +17,21 @@ Wallet integration:
 """
 
 from django.contrib import messages
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.db import transaction
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 
 from .models import PathSession, PathQuestion, PathAnswer, PathStatus, PathMode
 from .ai_service import (
-    # SCHOOL mode
-    generate_phase1_questions_school,
-    pick_suggested_path_from_phase1,
-    generate_phase2_questions_school,
     # GRAD mode
     generate_phase1_questions_grad,
-    pick_subpath_within_major,
-    generate_phase2_questions_grad,
-    # Shared
-    analyze_final_result,
 )
+# SCHOOL mode questions come from pre-generated pools.
+from .question_pools import draw_phase1
+# Phase-2 generation and the final analysis run as background jobs.
+from .services import PHASE1_COUNT, TOTAL, queue_job, requeue_if_stale, retry_failed
 
 from subscriptions.services import (
     get_remaining_attempts,
@@ -38,10 +39,8 @@ from subscriptions.services import (
     PRODUCT_CAREER_PATH,
 )
 
-# Tunable knobs
-PHASE1_COUNT = 10
-PHASE2_COUNT = 10
-TOTAL = PHASE1_COUNT + PHASE2_COUNT
+# Sessions waiting on (or failed in) a background job.
+PENDING_STATUSES = (PathStatus.PHASE2_PENDING, PathStatus.ANALYZING, PathStatus.FAILED)
 
 
 # --- Helpers -----------------------------------------------------------------------
@@ -117,7 +116,7 @@ def start_school_view(request):
 
             # Generate first to avoid charging the user on upstream failure.
             try:
-                qs = generate_phase1_questions_school(PHASE1_COUNT)
+                qs = draw_phase1(PHASE1_COUNT)
             except Exception as e:
                 messages.error(request, f"OpenAI error: {e}")
                 return redirect("career_path:start_school")
@@ -141,7 +140,7 @@ def start_school_view(request):
 
         _ensure_session_key(request)
         try:
-            qs = generate_phase1_questions_school(PHASE1_COUNT)
+            qs = draw_phase1(PHASE1_COUNT)
         except Exception as e:
             messages.error(request, f"OpenAI error: {e}")
             return redirect("career_path:start_school")
@@ -230,17 +229,23 @@ def start_grad_view(request):
 
 # --- Question / Result -------------------------------------------------------------
 
-@transaction.atomic
 def question_view(request, session_id: int, step: int):
     """
     Single-question page:
     - Saves an answer on POST.
-    - At the end of phase 1, classifies and generates phase-2 questions.
-    - At the final step, runs the AI summary and marks the session FINISHED.
+    - At the end of phase 1, queues the classification + phase-2 generation.
+    - At the final step, queues the AI summary.
+    While a job runs (or after it failed) the pending page is shown instead;
+    it polls status_view and moves on by itself.
     """
     s = _get_owned_session_or_404(request, session_id)
+    if s.status in PENDING_STATUSES:
+        return _pending(request, s)
+    # Answers are frozen once analyzed.
+    if s.status == PathStatus.FINISHED and request.method == "POST":
+        return redirect("career_path:result", session_id=s.id)
 
-    # Load current question set; phase-2 might be appended later.
+    # Load current question set; phase-2 is appended by the background job.
     questions = list(s.questions.all())
     if not questions:
         messages.error(request, "لا توجد أسئلة في هذه الجلسة.")
@@ -253,73 +258,22 @@ def question_view(request, session_id: int, step: int):
     if request.method == "POST":
         # Upsert the answer for the current question
         text = (request.POST.get("answer") or "").strip()
-        ans, _ = PathAnswer.objects.get_or_create(session=s, question=q)
-        ans.answer = text
-        ans.save()
-
-        # End of phase 1 and phase 2 hasn't been created yet
-        if step == PHASE1_COUNT and total == PHASE1_COUNT:
-            # Collect phase-1 answers in a single blob for classification
-            phase1_answers = []
-            for i in range(1, PHASE1_COUNT + 1):
-                qq = next((x for x in questions if x.order == i), None)
-                if not qq:
-                    continue
-                aa = PathAnswer.objects.filter(session=s, question=qq).first()
-                phase1_answers.append(f"س{i}: {aa.answer if aa and aa.answer else ''}")
-            joined_phase1 = "\n".join(phase1_answers)
-
-            # Classify and generate phase-2 based on the mode
-            try:
-                if s.mode == PathMode.SCHOOL:
-                    suggested = pick_suggested_path_from_phase1(joined_phase1)
-                    qs2 = generate_phase2_questions_school(suggested, PHASE2_COUNT)
-                else:
-                    suggested = pick_subpath_within_major(s.major or "غير محدد", joined_phase1)
-                    qs2 = generate_phase2_questions_grad(suggested, PHASE2_COUNT)
-            except Exception as e:
-                messages.error(request, f"تعذّر توليد المرحلة الثانية: {e}")
-                return redirect("career_path:question", session_id=s.id, step=step)
-
-            # Persist the chosen (sub)path and append phase-2 questions
-            s.suggested_path = suggested
-            s.save(update_fields=["suggested_path"])
-
-            start_order = PHASE1_COUNT + 1
-            PathQuestion.objects.bulk_create(
-                [PathQuestion(session=s, order=start_order + i, phase=2, text=t) for i, t in enumerate(qs2)]
-            )
-            return redirect("career_path:question", session_id=s.id, step=step + 1)
-
-        # If there are more questions, move forward
-        questions = list(s.questions.all())
-        total = len(questions)
-        if step < total:
-            return redirect("career_path:question", session_id=s.id, step=step + 1)
-
-        # Final step: aggregate all answers and produce the final analysis
-        all_answers = []
-        for i in range(1, TOTAL + 1):
-            qq = next((x for x in questions if x.order == i), None)
-            if not qq:
-                continue
-            aa = PathAnswer.objects.filter(session=s, question=qq).first()
-            all_answers.append(f"س{i}: {aa.answer if aa and aa.answer else ''}")
-        joined = "\n".join(all_answers)
-
-        try:
-            result = analyze_final_result(s.suggested_path or "غير محدد", joined)
-        except Exception as e:
-            messages.error(request, f"تعذّر التحليل النهائي: {e}")
-            return redirect("career_path:question", session_id=s.id, step=step)
-
-        # Store final summary and close the session
-        s.strengths = result.get("strengths", "")
-        s.weaknesses = result.get("weaknesses", "")
-        s.recommendation = result.get("recommendation", "")
-        s.status = PathStatus.FINISHED
-        s.save(update_fields=["strengths", "weaknesses", "recommendation", "status"])
-
+        with transaction.atomic():
+            ans, _ = PathAnswer.objects.get_or_create(session=s, question=q)
+            ans.answer = text
+            ans.save()
+
+            # End of phase 1 and phase 2 hasn't been created yet
+            if step == PHASE1_COUNT and total == PHASE1_COUNT:
+                queue_job(s.id, PathStatus.PHASE2_PENDING)
+                return redirect("career_path:question", session_id=s.id, step=step + 1)
+
+            # If there are more questions, move forward
+            if step < total:
+                return redirect("career_path:question", session_id=s.id, step=step + 1)
+
+            # Final step: the analysis runs in the background
+            queue_job(s.id, PathStatus.ANALYZING)
         return redirect("career_path:result", session_id=s.id)
 
     # GET: prefill previous answer if user navigates back
@@ -334,6 +288,38 @@ def question_view(request, session_id: int, step: int):
     return render(request, "career_path/question.html", ctx)
 
 
+def _pending(request, s: PathSession):
+    # A job lost to a restart is queued again on the next visit.
+    requeue_if_stale(s)
+    return render(request, "career_path/pending.html", {"s": s})
+
+
+def status_view(request, session_id: int):
+    """
+    Polled by the pending page: current status and, once the job is done,
+    where to go next. One query.
+    """
+    s = _get_owned_session_or_404(request, session_id)
+    if s.status in PENDING_STATUSES:
+        requeue_if_stale(s)
+    next_url = None
+    if s.status == PathStatus.RUNNING:
+        next_url = reverse("career_path:question", args=[s.id, PHASE1_COUNT + 1])
+    elif s.status == PathStatus.FINISHED:
+        next_url = reverse("career_path:result", args=[s.id])
+    return JsonResponse({"status": s.status, "label": s.get_status_display(), "next": next_url})
+
+
+@require_POST
+def retry_view(request, session_id: int):
+    """
+    Queue the failed job again.
+    """
+    s = _get_owned_session_or_404(request, session_id)
+    retry_failed(s)
+    return redirect("career_path:question", session_id=s.id, step=1)
+
+
 def list_view(request):
     """
     Authenticated users: show their historical sessions + remaining attempts.
@@ -351,5 +337,7 @@ def result_view(request, session_id: int):
     Read-only session details with ownership enforcement (auth vs guest).
     """
     s = _get_owned_session_or_404(request, session_id)
+    if s.status in PENDING_STATUSES:
+        return _pending(request, s)
     answers = PathAnswer.objects.filter(session=s).select_related("question").order_by("question__order")
     return render(request, "career_path/result.html", {"s": s, "answers": answers})
@@ -0,0 +1,14 @@
+from django.utils.functional import SimpleLazyObject
+
+from .services import unread_total
+
+
+def unread_badge(request):
+    """
+    Expose `unread_total` to every template. Evaluated lazily, so pages that
+    don't render the badge pay nothing; otherwise it is one cached lookup.
+    """
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return {"unread_total": 0}
+    return {"unread_total": SimpleLazyObject(lambda: unread_total(user))}
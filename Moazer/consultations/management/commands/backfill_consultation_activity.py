@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+
+from consultations.models import ChatMessage, Consultation
+from consultations.services import message_preview
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Consultation.last_message_at / last_message_preview / message_count "
+        "from ChatMessage rows (after the migration, or to repair drift)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        latest = ChatMessage.objects.filter(consultation=OuterRef("pk")).order_by("-created_at", "-id")
+        rows = (
+            Consultation.objects
+            .annotate(
+                n_messages=Count("messages"),
+                last_at=Max("messages__created_at"),
+                last_content=Subquery(latest.values("content")[:1]),
+            )
+            .only("id", "updated_at")
+            .order_by("id")
+        )
+
+        batch, updated = [], 0
+        for c in rows.iterator(chunk_size=batch_size):
+            c.message_count = c.n_messages
+            c.last_message_at = c.last_at
+            c.last_message_preview = message_preview(c.last_content or "")
+            if c.last_at and c.last_at > c.updated_at:
+                c.updated_at = c.last_at
+            batch.append(c)
+            if len(batch) >= batch_size:
+                updated += self._flush(batch)
+        updated += self._flush(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled activity for {updated} consultations."))
+
+    @staticmethod
+    def _flush(batch) -> int:
+        if not batch:
+            return 0
+        with transaction.atomic():
+            Consultation.objects.bulk_update(
+                batch, ["message_count", "last_message_at", "last_message_preview", "updated_at"]
+            )
+        n = len(batch)
+        batch.clear()
+        return n
@@ -0,0 +1,116 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from consultations.models import Consultation, ConsultationStatus, ConsultationTypeChoices
+from consultations.services import INBOX_ORDERING, inbox_page
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the expert inbox: seed N consultations for one expert inside a "
+        "transaction, time keyset pages at several depths and filters (vs OFFSET), "
+        "then roll everything back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options["rows"], options["repeat"], random.Random(options["seed"]))
+                raise _Rollback
+        except _Rollback:
+            self.stdout.write("Seed data rolled back.")
+
+    def _run(self, rows: int, repeat: int, rng: random.Random):
+        expert = User.objects.create_user("bench-expert", password=None)
+        student = User.objects.create_user("bench-student", password=None)
+        statuses = [s for s, _ in ConsultationStatus.choices]
+        ctypes = [t for t, _ in ConsultationTypeChoices.choices]
+        now = timezone.now()
+
+        self.stdout.write(f"Seeding {rows} consultations...")
+        batch = []
+        for i in range(rows):
+            batch.append(Consultation(
+                student=student,
+                expert=expert,
+                title=f"bench {i}",
+                status=rng.choice(statuses),
+                type=rng.choice(ctypes),
+            ))
+            if len(batch) == 5000:
+                Consultation.objects.bulk_create(batch)
+                batch = []
+        Consultation.objects.bulk_create(batch)
+        # auto_now can't be overridden on insert; spread activity over a year.
+        ids = list(Consultation.objects.filter(expert=expert).values_list("pk", flat=True))
+        year = 365 * 24 * 3600
+        Consultation.objects.bulk_update(
+            [Consultation(pk=pk, updated_at=now - timedelta(seconds=rng.randint(0, year))) for pk in ids],
+            ["updated_at"],
+            batch_size=5000,
+        )
+
+        scenarios = [
+            ("no filter", {}),
+            ("status", {"status": ConsultationStatus.ACTIVE}),
+            ("type", {"ctype": ConsultationTypeChoices.CV_REVIEW}),
+            ("status+type", {"status": ConsultationStatus.PENDING, "ctype": ConsultationTypeChoices.GENERAL}),
+        ]
+        self.stdout.write(f"{'filter':<12} {'depth':>7} {'keyset ms':>10} {'offset ms':>10}")
+        for label, filters in scenarios:
+            for depth_pages in (0, 100, 1000):
+                cursor = self._cursor_at_depth(expert, filters, depth_pages)
+                if depth_pages and cursor is None:
+                    continue
+                keyset_ms = self._time(repeat, lambda: inbox_page(expert, True, cursor=cursor, **filters))
+                offset_ms = self._time(repeat, lambda: self._offset_page(expert, filters, depth_pages))
+                self.stdout.write(f"{label:<12} {depth_pages:>7} {keyset_ms:>10.2f} {offset_ms:>10.2f}")
+
+    @staticmethod
+    def _cursor_at_depth(expert, filters, pages: int):
+        """
+        Cursor for page number `pages`, obtained by walking from page 0 with a
+        large page size (the walk itself is not timed).
+        """
+        cursor = None
+        remaining = pages * 25
+        while remaining > 0:
+            step = min(remaining, 5000)
+            items, cursor = inbox_page(expert, True, cursor=cursor, limit=step, **filters)
+            if cursor is None:
+                return None
+            remaining -= step
+        return cursor
+
+    @staticmethod
+    def _offset_page(expert, filters, pages: int):
+        qs = Consultation.objects.filter(expert=expert).select_related("student")
+        if filters.get("status"):
+            qs = qs.filter(status=filters["status"])
+        if filters.get("ctype"):
+            qs = qs.filter(type=filters["ctype"])
+        start = pages * 25
+        return list(qs.order_by(*INBOX_ORDERING)[start:start + 25])
+
+    @staticmethod
+    def _time(repeat: int, fn) -> float:
+        fn()  # warm-up
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - started) * 1000 / repeat
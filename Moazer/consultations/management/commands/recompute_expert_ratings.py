@@ -0,0 +1,83 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import ExpertProfile
+from consultations.models import ConsultationRating
+from consultations.recommendations import mark_experts_dirty
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute ExpertProfile.rating_count / rating_total / rating_avg / ranking_score from "
+        "ConsultationRating rows (after the migration, or to repair drift)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Report drift without writing.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+
+        # Both streams are ordered by expert user id and merged, so memory stays
+        # bounded by one batch whatever the number of ratings.
+        profiles = (
+            ExpertProfile.objects
+            .only("id", "user_id", "rating_count", "rating_total", "rating_avg", "ranking_score")
+            .order_by("user_id")
+            .iterator(chunk_size=batch_size)
+        )
+        ratings = (
+            ConsultationRating.objects
+            .order_by("consultation__expert_id", "id")
+            .values_list("consultation__expert_id", "stars")
+            .iterator(chunk_size=batch_size)
+        )
+        pending = next(ratings, None)
+
+        batch, checked, drifted = [], 0, 0
+        for profile in profiles:
+            count = total = 0
+            while pending is not None and pending[0] <= profile.user_id:
+                if pending[0] == profile.user_id:
+                    count += 1
+                    total += pending[1]
+                pending = next(ratings, None)
+
+            avg = self._average(total, count)
+            score = ExpertProfile.ranking_score_for(total, count)
+            checked += 1
+            current = (profile.rating_count, profile.rating_total, profile.rating_avg)
+            if current != (count, total, avg) or abs(profile.ranking_score - score) > 1e-9:
+                drifted += 1
+                profile.rating_count, profile.rating_total, profile.rating_avg = count, total, avg
+                profile.ranking_score = score
+                batch.append(profile)
+                if len(batch) >= batch_size:
+                    self._flush(batch, dry_run)
+        self._flush(batch, dry_run)
+
+        verb = "would be fixed" if dry_run else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} experts, {drifted} {verb}."))
+
+    @staticmethod
+    def _average(total: int, count: int) -> Decimal:
+        # Same rounding as the SQL ROUND(total / count, 1) in apply_rating_delta.
+        if not count:
+            return Decimal("0.0")
+        return Decimal(total / count).quantize(Decimal("0.1"), rounding=ROUND_HALF_UP)
+
+    @staticmethod
+    def _flush(batch, dry_run: bool) -> None:
+        if batch and not dry_run:
+            with transaction.atomic():
+                ExpertProfile.objects.bulk_update(
+                    batch, ["rating_count", "rating_total", "rating_avg", "ranking_score"]
+                )
+                # Fixed ranking scores are recommendation priors.
+                profile_ids = [p.pk for p in batch]
+                transaction.on_commit(lambda: mark_experts_dirty(profile_ids))
+        batch.clear()
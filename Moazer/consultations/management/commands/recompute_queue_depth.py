@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from consultations.services import recompute_queue_depth
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute ExpertProfile.queue_depth from open consultations (after bulk "
+        "edits that bypassed save(), or to repair drift)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Report drift without writing.")
+
+    def handle(self, *args, **options):
+        drifted = recompute_queue_depth(dry_run=options["dry_run"])
+        verb = "would be fixed" if options["dry_run"] else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"{drifted} experts {verb}."))
@@ -0,0 +1,113 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import ConsultationType, ExpertProfile
+from consultations.models import Consultation, ConsultationStatus, ConsultationTypeChoices
+from consultations.services import OPEN_STATUSES, pick_expert, transition
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate skewed consultation demand against N experts inside a "
+        "transaction, once with students picking experts by popularity and once "
+        "with auto-assignment, print the resulting queue distributions, then "
+        "roll everything back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--experts", type=int, default=50)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--skew", type=float, default=1.2, help="Zipf exponent of expert popularity.")
+        parser.add_argument("--finish-rate", type=float, default=0.3,
+                            help="Probability that an open consultation finishes after each request.")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        for mode in ("manual", "auto"):
+            try:
+                with transaction.atomic():
+                    self._run(mode, options, random.Random(options["seed"]))
+                    raise _Rollback
+            except _Rollback:
+                pass
+        self.stdout.write("Seed data rolled back.")
+
+    def _run(self, mode: str, options, rng: random.Random):
+        n_experts = options["experts"]
+        ctypes = [value for value, _ in ConsultationTypeChoices.choices]
+        types = {
+            value: ConsultationType.objects.get_or_create(name=label)[0]
+            for value, label in ConsultationTypeChoices.choices
+        }
+
+        student = User.objects.create_user("sim-student", password=None)
+        experts = []
+        for i in range(n_experts):
+            user = User.objects.create_user(f"sim-expert-{i}", password=None)
+            profile = ExpertProfile.objects.create(user=user, is_approved=True, gender="male")
+            # Each expert offers two or three types.
+            profile.consultation_types.set([types[t] for t in rng.sample(ctypes, rng.randint(2, 3))])
+            experts.append(profile)
+
+        # Zipf-like popularity: expert k is chosen with weight 1 / k^skew.
+        weights = [1 / (k + 1) ** options["skew"] for k in range(n_experts)]
+        offered = {
+            t: [e for e in experts if types[t] in e.consultation_types.all()] for t in ctypes
+        }
+
+        open_ids = []
+        pick_ms = []
+        for _ in range(options["requests"]):
+            ctype = rng.choice(ctypes)
+            if mode == "manual":
+                candidates = offered[ctype] or experts
+                expert = rng.choices(candidates, weights=[weights[experts.index(e)] for e in candidates])[0]
+            else:
+                started = time.perf_counter()
+                expert = pick_expert(ctype)
+                pick_ms.append((time.perf_counter() - started) * 1000)
+            c = Consultation.objects.create(
+                student=student, expert=expert.user, title="sim", type=ctype, status=ConsultationStatus.PENDING
+            )
+            open_ids.append((c.id, expert.user_id))
+
+            # Experts work through their queues at random.
+            if open_ids and rng.random() < options["finish_rate"]:
+                cid, expert_user_id = open_ids.pop(rng.randrange(len(open_ids)))
+                transition(cid, "expert_end", expert_user_id)
+
+        depths = sorted(
+            ExpertProfile.objects.filter(pk__in=[e.pk for e in experts]).values_list("queue_depth", flat=True),
+            reverse=True,
+        )
+        # The maintained counters must agree with a real recount.
+        actual = Consultation.objects.filter(
+            expert__in=[e.user for e in experts], status__in=OPEN_STATUSES
+        ).count()
+        if actual != sum(depths):
+            self.stdout.write(self.style.ERROR(f"queue_depth drift: counters {sum(depths)} != actual {actual}"))
+        self._report(mode, depths, pick_ms)
+
+    def _report(self, mode: str, depths, pick_ms):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n{mode} assignment"))
+        self.stdout.write(
+            f"open={sum(depths)} max={depths[0]} p50={statistics.median(depths):.1f} "
+            f"stdev={statistics.pstdev(depths):.2f} idle experts={depths.count(0)}"
+        )
+        if pick_ms:
+            self.stdout.write(f"pick_expert: mean {statistics.mean(pick_ms):.2f} ms, max {max(pick_ms):.2f} ms")
+        # Queue depth histogram, deepest first.
+        top = max(depths[0], 1)
+        for depth in sorted(set(depths), reverse=True):
+            count = depths.count(depth)
+            bar = "#" * max(1, round(40 * depth / top))
+            self.stdout.write(f"{depth:>4} {bar} x{count}")
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0002_consultation_price_at_booking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['consultation', 'created_at', 'id'], name='chatmsg_thread_cursor_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0003_chatmessage_thread_cursor_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consultation',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='consultation',
+            name='last_message_preview',
+            field=models.CharField(blank=True, max_length=120),
+        ),
+        migrations.AddField(
+            model_name='consultation',
+            name='message_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0005_consultation_read_cursors'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(fields=['expert', '-updated_at', '-id'], name='cons_exp_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(fields=['expert', 'status', '-updated_at', '-id'], name='cons_exp_status_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(fields=['expert', 'type', '-updated_at', '-id'], name='cons_exp_type_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(fields=['expert', 'status', 'type', '-updated_at', '-id'], name='cons_exp_st_type_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(fields=['student', '-updated_at', '-id'], name='cons_stu_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(fields=['student', 'status', '-updated_at', '-id'], name='cons_stu_status_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(fields=['student', 'type', '-updated_at', '-id'], name='cons_stu_type_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(fields=['student', 'status', 'type', '-updated_at', '-id'], name='cons_stu_st_type_inbox_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0006_consultation_inbox_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(fields=['-updated_at', '-id'], name='cons_activity_idx'),
+        ),
+    ]
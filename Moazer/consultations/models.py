@@ -29,12 +29,50 @@ class Consultation(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     price_at_booking = models.DecimalField(max_digits=8, decimal_places=2, default=0) 
 
+    # Denormalized chat activity, maintained on every new ChatMessage
+    # (see services.record_message_activity) so the inbox needs no per-row subquery.
+    last_message_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    last_message_preview = models.CharField(max_length=120, blank=True)
+    message_count = models.PositiveIntegerField(default=0)
+
+    # Per-participant read cursors (last ChatMessage id seen) and unread counters,
+    # maintained in the same UPDATE as the activity columns above.
+    student_last_read_id = models.PositiveBigIntegerField(default=0)
+    expert_last_read_id = models.PositiveBigIntegerField(default=0)
+    student_unread_count = models.PositiveIntegerField(default=0)
+    expert_unread_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Inbox keyset pagination: (role, [status], [type], updated_at, id)
+            # for every filter combination of list_view.
+            models.Index(fields=["expert", "-updated_at", "-id"], name="cons_exp_inbox_idx"),
+            models.Index(fields=["expert", "status", "-updated_at", "-id"], name="cons_exp_status_inbox_idx"),
+            models.Index(fields=["expert", "type", "-updated_at", "-id"], name="cons_exp_type_inbox_idx"),
+            models.Index(fields=["expert", "status", "type", "-updated_at", "-id"], name="cons_exp_st_type_inbox_idx"),
+            models.Index(fields=["student", "-updated_at", "-id"], name="cons_stu_inbox_idx"),
+            models.Index(fields=["student", "status", "-updated_at", "-id"], name="cons_stu_status_inbox_idx"),
+            models.Index(fields=["student", "type", "-updated_at", "-id"], name="cons_stu_type_inbox_idx"),
+            models.Index(fields=["student", "status", "type", "-updated_at", "-id"], name="cons_stu_st_type_inbox_idx"),
+            # The same activity order over every consultation (no role filter).
+            models.Index(fields=["-updated_at", "-id"], name="cons_activity_idx"),
+            # Unread badge: only consultations with something unread are indexed.
+            models.Index(fields=["student"], condition=models.Q(student_unread_count__gt=0), name="cons_student_unread_idx"),
+            models.Index(fields=["expert"], condition=models.Q(expert_unread_count__gt=0), name="cons_expert_unread_idx"),
+        ]
+
 class ChatMessage(models.Model):
     consultation = models.ForeignKey(Consultation, on_delete=models.CASCADE, related_name="messages")
     sender = models.ForeignKey(User, on_delete=models.CASCADE)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of a thread: (created_at, id) cursor per consultation.
+            models.Index(fields=["consultation", "created_at", "id"], name="chatmsg_thread_cursor_idx"),
+        ]
+
 class Attachment(models.Model):
     consultation = models.ForeignKey(Consultation, on_delete=models.CASCADE, related_name="attachments")
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -0,0 +1,96 @@
+"""
+Push channel for consultation chat.
+
+The detail page opens a Server-Sent Events stream (see views.stream_view) that
+parks on an asyncio queue until a new ChatMessage is committed. Publishers run
+in ordinary sync worker threads (the post_save signal), so notifications are
+handed to the subscriber's event loop with call_soon_threadsafe.
+
+Notifications only carry the new message id; the stream reads the rows itself
+with one `id > last_seen` range query. A shared broker (Redis pub/sub, ...)
+can therefore replace the in-process one through settings.CHAT_BROKER without
+changing the payload.
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class InProcessBroker:
+    """
+    Fan-out of "consultation X has a new message" to the streams of this process.
+
+    Each subscriber queue holds at most one pending wake-up: bursts of messages
+    collapse into a single range query on the reading side.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)  # consultation_id -> {(loop, queue)}
+
+    def subscribe(self, consultation_id: int) -> asyncio.Queue:
+        """
+        Register a queue for the running event loop. Must be called from async code.
+        """
+        queue = asyncio.Queue(maxsize=1)
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers[consultation_id].add(entry)
+        return queue
+
+    def unsubscribe(self, consultation_id: int, queue: asyncio.Queue) -> None:
+        with self._lock:
+            entries = self._subscribers.get(consultation_id)
+            if not entries:
+                return
+            entries.difference_update({e for e in entries if e[1] is queue})
+            if not entries:
+                del self._subscribers[consultation_id]
+
+    def publish(self, consultation_id: int, message_id: int) -> None:
+        """
+        Wake every stream of this consultation. Safe to call from any thread.
+        """
+        with self._lock:
+            entries = list(self._subscribers.get(consultation_id, ()))
+        for loop, queue in entries:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, message_id)
+            except RuntimeError:
+                # Loop already closed (server shutting down); nothing to wake.
+                pass
+
+    def subscriber_count(self, consultation_id: int) -> int:
+        with self._lock:
+            return len(self._subscribers.get(consultation_id, ()))
+
+
+def _offer(queue: asyncio.Queue, message_id: int) -> None:
+    """
+    Put a wake-up on the queue unless one is already pending.
+    """
+    try:
+        queue.put_nowait(message_id)
+    except asyncio.QueueFull:
+        pass
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """
+    Return the process-wide broker (settings.CHAT_BROKER or the in-process one).
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, "CHAT_BROKER", "consultations.realtime.InProcessBroker")
+                _broker = import_string(path)()
+    return _broker
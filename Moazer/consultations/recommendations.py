@@ -0,0 +1,295 @@
+"""
+Recommended experts for a student.
+
+Each approved expert is described by a sparse feature row:
+  - term:<word>   words of their specializations and consultation-type names
+                  (normalized with main.text, so they meet career-path labels),
+  - ctype:<type>  consultation types they have served (log-scaled counts),
+  - stage:<stage> study stages of the students they have served.
+A student is described in the same space by their study stage, the types of
+their past consultations and the words of their latest career-path
+suggestion/major. The score is the cosine similarity between the two,
+computed as one vectorized sparse mat-vec over all experts, plus a small
+ranking_score prior so ties go to better-rated experts.
+
+The expert matrix lives in process memory. Signals and rating changes mark
+experts dirty in the shared cache (a sequence of small "dirty batches"); every
+process replays the batches it hasn't seen and rebuilds and repacks only those
+rows, falling back to a full rebuild if a batch was evicted. Student vectors are cached per user.
+
+NumPy is optional: without it recommendations degrade to the top-ranked experts.
+"""
+
+import math
+import threading
+import time
+from collections import Counter
+from typing import NamedTuple
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from accounts.directory import SORT_MODES, expert_cards
+from accounts.models import ExpertProfile, StudentProfile
+from main.text import search_terms, strip_article
+
+from .models import Consultation
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+DIRTY_SEQ_KEY = "consultations:reco-dirty-seq"
+DIRTY_BATCH_KEY = "consultations:reco-dirty:{seq}"
+STUDENT_KEY = "consultations:reco-student:{user_id}"
+
+DIRTY_BATCH_TIMEOUT = 60 * 60 * 24
+STUDENT_TIMEOUT = 60 * 30
+
+# Replaying more dirty batches than this costs more than a full rebuild.
+MAX_REPLAY = 200
+
+# Weight of the (normalized) Bayesian rating in the final score.
+PRIOR_WEIGHT = 0.05
+
+RECOMMENDATIONS_COUNT = 5
+
+
+def _terms(*texts) -> set[str]:
+    return {strip_article(word) for text in texts for word in search_terms(text)}
+
+
+# -------------------------------------------------------------------
+# Dirty tracking (shared cache)
+# -------------------------------------------------------------------
+
+def mark_experts_dirty(profile_ids) -> None:
+    """
+    Record that these experts' feature rows must be rebuilt in every process.
+    """
+    profile_ids = [pk for pk in profile_ids if pk]
+    if not profile_ids:
+        return
+    for _ in range(3):
+        cache.add(DIRTY_SEQ_KEY, 0, timeout=None)
+        try:
+            seq = cache.incr(DIRTY_SEQ_KEY)
+        except ValueError:
+            continue
+        # incr() isn't atomic on every backend: never overwrite a batch
+        # another writer got the same number for.
+        if cache.add(DIRTY_BATCH_KEY.format(seq=seq), profile_ids, timeout=DIRTY_BATCH_TIMEOUT):
+            return
+    # Counter evicted or contended: restart from a fresh base so every process rebuilds fully.
+    cache.set(DIRTY_SEQ_KEY, time.time_ns(), timeout=None)
+
+
+def forget_student(user_id: int) -> None:
+    cache.delete(STUDENT_KEY.format(user_id=user_id))
+
+
+# -------------------------------------------------------------------
+# Feature extraction
+# -------------------------------------------------------------------
+
+def expert_features(profile_ids=None) -> dict[int, Counter]:
+    """
+    {profile_id: Counter(feature -> weight)} for approved experts (all of them,
+    or only those in profile_ids). Four queries whatever the number of experts.
+    """
+    qs = ExpertProfile.objects.filter(is_approved=True).prefetch_related("specializations", "consultation_types")
+    if profile_ids is not None:
+        qs = qs.filter(pk__in=profile_ids)
+    profiles = {p.user_id: p for p in qs}
+    features = {}
+    for p in profiles.values():
+        names = [s.name for s in p.specializations.all()] + [t.name for t in p.consultation_types.all()]
+        features[p.pk] = Counter({f"term:{t}": 1.0 for t in _terms(*names)})
+
+    served = (
+        Consultation.objects.filter(expert_id__in=list(profiles))
+        .values("expert_id", "type", "student__studentprofile__study_stage")
+        .annotate(n=Count("id"))
+    )
+    for row in served:
+        row_features = features[profiles[row["expert_id"]].pk]
+        row_features[f"ctype:{row['type']}"] += row["n"]
+        if row["student__studentprofile__study_stage"]:
+            row_features[f"stage:{row['student__studentprofile__study_stage']}"] += row["n"]
+
+    for row_features in features.values():
+        for feature, weight in row_features.items():
+            if not feature.startswith("term:"):
+                row_features[feature] = math.log1p(weight)
+    return features
+
+
+def student_features(user) -> dict[str, float]:
+    """
+    Feature weights of a student, cached until their profile, consultations
+    or career-path result change.
+    """
+    key = STUDENT_KEY.format(user_id=user.pk)
+    features = cache.get(key)
+    if features is not None:
+        return features
+
+    features = Counter()
+    stage = StudentProfile.objects.filter(user=user).values_list("study_stage", flat=True).first()
+    if stage:
+        features[f"stage:{stage}"] = 1.0
+    for row in Consultation.objects.filter(student=user).values("type").annotate(n=Count("id")):
+        features[f"ctype:{row['type']}"] = math.log1p(row["n"])
+    path = (
+        user.path_sessions.exclude(suggested_path="")
+        .order_by("-created_at")
+        .values("suggested_path", "major")
+        .first()
+    )
+    if path:
+        for term in _terms(path["suggested_path"], path["major"]):
+            features[f"term:{term}"] = 1.0
+
+    features = dict(features)
+    cache.set(key, features, timeout=STUDENT_TIMEOUT)
+    return features
+
+
+# -------------------------------------------------------------------
+# In-memory index
+# -------------------------------------------------------------------
+
+class Snapshot(NamedTuple):
+    """
+    Immutable packed state read by ExpertIndex.top(): the row-normalized
+    expert × feature matrix in coordinate form plus a per-row prior.
+    """
+    ids: "np.ndarray"        # profile id of every row
+    row_of: "np.ndarray"     # row number of every stored weight
+    indices: "np.ndarray"    # column of every stored weight
+    data: "np.ndarray"       # normalized weights
+    prior: "np.ndarray"      # ranking_score scaled to [0, 1]
+    vocab: dict              # feature -> column
+
+
+class ExpertIndex:
+    """
+    Expert feature rows kept in sync with the dirty batches. sync() repacks
+    only the rows that changed and publishes a new Snapshot with a single
+    assignment, so top() never sees a half-built matrix.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seq = None
+        self._rows = {}        # profile_id -> Counter(feature -> weight)
+        self._priors = {}      # profile_id -> ranking_score
+        self._vocab = {}       # feature -> column; only grows
+        self._packed = {}      # profile_id -> (columns, normalized weights) arrays
+        self._snapshot = None
+
+    def _current_seq(self):
+        cache.add(DIRTY_SEQ_KEY, 0, timeout=None)
+        return cache.get(DIRTY_SEQ_KEY)
+
+    def sync(self) -> None:
+        """
+        Bring the matrix up to date: full build on first use or when batches
+        were lost, otherwise rebuild only the dirty rows.
+        """
+        with self._lock:
+            seq = self._current_seq()
+            if self._seq is not None and seq == self._seq:
+                return
+            dirty = None
+            if self._seq is not None and 0 < seq - self._seq <= MAX_REPLAY:
+                keys = [DIRTY_BATCH_KEY.format(seq=s) for s in range(self._seq + 1, seq + 1)]
+                batches = cache.get_many(keys)
+                if len(batches) == len(keys):
+                    dirty = {pk for batch in batches.values() for pk in batch}
+
+            if dirty is None:
+                self._rows = expert_features()
+                self._priors = dict(ExpertProfile.objects.filter(is_approved=True).values_list("pk", "ranking_score"))
+                self._packed = {}
+                changed = self._rows.keys()
+            else:
+                fresh = expert_features(dirty)
+                priors = dict(ExpertProfile.objects.filter(pk__in=dirty, is_approved=True).values_list("pk", "ranking_score"))
+                for pk in dirty:
+                    self._rows.pop(pk, None)
+                    self._priors.pop(pk, None)
+                    self._packed.pop(pk, None)
+                self._rows.update(fresh)
+                self._priors.update(priors)
+                changed = fresh.keys()
+            self._seq = seq
+            if np is not None:
+                self._pack(changed)
+
+    def _pack(self, changed) -> None:
+        for pk in changed:
+            row = self._rows[pk]
+            norm = math.sqrt(sum(w * w for w in row.values())) or 1.0
+            columns = [self._vocab.setdefault(feature, len(self._vocab)) for feature in row]
+            self._packed[pk] = (
+                np.asarray(columns, dtype=np.int64),
+                np.fromiter((w / norm for w in row.values()), dtype=np.float64, count=len(row)),
+            )
+
+        ids = np.fromiter(self._packed, dtype=np.int64, count=len(self._packed))
+        rows = list(self._packed.values())
+        lengths = np.fromiter((c.size for c, _ in rows), dtype=np.int64, count=len(rows))
+        prior = np.fromiter((self._priors.get(pk, 0.0) for pk in self._packed), dtype=np.float64, count=len(rows))
+        self._snapshot = Snapshot(
+            ids=ids,
+            row_of=np.repeat(np.arange(len(rows)), lengths),
+            indices=np.concatenate([c for c, _ in rows]) if rows else np.zeros(0, dtype=np.int64),
+            data=np.concatenate([d for _, d in rows]) if rows else np.zeros(0, dtype=np.float64),
+            prior=prior / prior.max() if prior.size and prior.max() > 0 else prior,
+            vocab=dict(self._vocab),
+        )
+
+    def top(self, features: dict[str, float], n: int) -> list[int]:
+        """
+        Ids of the n best-scoring experts for a student feature dict.
+        """
+        self.sync()
+        snap = self._snapshot
+        if np is None or snap is None or not snap.ids.size:
+            return []
+        query = np.zeros(len(snap.vocab), dtype=np.float64)
+        for feature, weight in features.items():
+            column = snap.vocab.get(feature)
+            if column is not None:
+                query[column] = weight
+        norm = np.linalg.norm(query)
+        if norm:
+            query /= norm
+
+        # Sparse mat-vec: every stored weight times the matching query weight,
+        # summed per row.
+        scores = np.bincount(snap.row_of, weights=snap.data * query[snap.indices], minlength=snap.ids.size)
+        scores += PRIOR_WEIGHT * snap.prior
+
+        n = min(n, snap.ids.size)
+        best = np.argpartition(-scores, n - 1)[:n]
+        best = best[np.argsort(-scores[best])]
+        return [int(snap.ids[i]) for i in best]
+
+
+_index = ExpertIndex()
+
+
+def recommend_experts(user, n: int = RECOMMENDATIONS_COUNT):
+    """
+    Up to n approved ExpertProfiles (cards prefetched) recommended for a
+    student, best first. Without NumPy, the top-ranked experts.
+    """
+    ids = _index.top(student_features(user), n) if np is not None else []
+    if not ids:
+        qs = ExpertProfile.objects.filter(is_approved=True)
+        return list(expert_cards(qs).order_by(*SORT_MODES["rating"])[:n])
+    by_id = {p.pk: p for p in expert_cards(ExpertProfile.objects.filter(pk__in=ids))}
+    return [by_id[pk] for pk in ids if pk in by_id]
@@ -0,0 +1,407 @@
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Case, Count, DecimalField, ExpressionWrapper, F, FloatField, OuterRef, PositiveBigIntegerField,
+    PositiveIntegerField, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Cast, Coalesce, Round
+from django.utils.text import Truncator
+
+from accounts.models import ExpertProfile
+from main.lookups import consultation_types
+from main.pagination import paginate_keyset
+from main.text import normalize_arabic
+
+from .models import (
+    Attachment, ChatMessage, Consultation, ConsultationRating, ConsultationStatus, ConsultationTypeChoices,
+)
+from .recommendations import mark_experts_dirty
+from .thread_cache import get_participants
+
+# Messages rendered on first load and per "load older" page.
+MESSAGES_PAGE_SIZE = 30
+
+# Characters of the latest message kept on Consultation.last_message_preview.
+PREVIEW_LENGTH = 120
+
+# Consultations per inbox page.
+INBOX_PAGE_SIZE = 25
+
+# Last activity first (updated_at is bumped on every message); id breaks ties.
+INBOX_ORDERING = ["-updated_at", "-id"]
+
+# Compare-and-set rounds of rate_consultation() before giving up.
+RATE_ATTEMPTS = 3
+
+UNREAD_TOTAL_KEY = "consultations:unread-total:{user_id}"
+UNREAD_TOTAL_TIMEOUT = 60 * 10
+
+# Newest first; backed by the (consultation, created_at, id) index.
+THREAD_ORDERING = ["-created_at", "-id"]
+
+# Statuses that occupy a slot in the expert's queue (ExpertProfile.queue_depth).
+OPEN_STATUSES = {ConsultationStatus.NEW, ConsultationStatus.PENDING, ConsultationStatus.ACTIVE}
+
+# Status transitions: name → (participant allowed to fire it, source statuses, target status).
+TRANSITIONS = {
+    "expert_accept": ("expert", {ConsultationStatus.PENDING}, ConsultationStatus.ACTIVE),
+    "expert_reject": ("expert", {ConsultationStatus.PENDING}, ConsultationStatus.CLOSED),
+    "expert_end": ("expert", {ConsultationStatus.ACTIVE, ConsultationStatus.PENDING}, ConsultationStatus.COMPLETED),
+    "student_end": ("student", {ConsultationStatus.ACTIVE}, ConsultationStatus.COMPLETED),
+}
+
+
+def load_thread(consultation, before: str | None = None, limit: int = MESSAGES_PAGE_SIZE,
+                with_attachments: bool = False) -> dict:
+    """
+    Load everything the chat templates need in a fixed number of queries,
+    whatever the thread length:
+      - 1 query for the message page, senders joined in (select_related),
+      - +1 query for the attachments when with_attachments=True.
+
+    `consultation` may be an instance or a primary key.
+
+    Returns a template context fragment:
+      - thread_messages: one page in display order (oldest → newest);
+        before=None gives the newest page.
+      - older_cursor: pass back as `before` for the previous page, None at the start.
+      - attachments: list (only when requested).
+    """
+    qs = ChatMessage.objects.filter(consultation=consultation).select_related("sender")
+    page, older_cursor = paginate_keyset(qs, THREAD_ORDERING, cursor=before, limit=limit)
+    page.reverse()
+
+    thread = {"thread_messages": page, "older_cursor": older_cursor}
+    if with_attachments:
+        thread["attachments"] = list(
+            Attachment.objects.filter(consultation=consultation).order_by("created_at", "id")
+        )
+    return thread
+
+
+def inbox_page(user, as_expert: bool, status: str | None = None, ctype: str | None = None,
+               cursor: str | None = None, limit: int = INBOX_PAGE_SIZE):
+    """
+    Return (consultations, next_cursor) for one page of a user's inbox.
+
+    Every filter combination (role × optional status × optional type) is
+    served by one of the composite (role, [status], [type], updated_at, id)
+    indexes, so the page cost is independent of inbox size and depth.
+    """
+    if as_expert:
+        qs = Consultation.objects.filter(expert=user).select_related("student")
+    else:
+        qs = Consultation.objects.filter(student=user).select_related("expert")
+    if status:
+        qs = qs.filter(status=status)
+    if ctype:
+        qs = qs.filter(type=ctype)
+    return paginate_keyset(qs, INBOX_ORDERING, cursor=cursor, limit=limit)
+
+
+def message_preview(content: str) -> str:
+    return Truncator(" ".join(content.split())).chars(PREVIEW_LENGTH)
+
+
+def record_message_activity(message) -> None:
+    """
+    Fold a new ChatMessage into its consultation with a single UPDATE:
+    - activity columns (updated_at is bumped too, so the inbox ordering
+      reflects chat activity),
+    - the recipient's unread counter,
+    - the sender's read cursor (you have read what you just wrote).
+    """
+    sender_id = message.sender_id
+    Consultation.objects.filter(pk=message.consultation_id).update(
+        last_message_at=message.created_at,
+        last_message_preview=message_preview(message.content),
+        message_count=F("message_count") + 1,
+        updated_at=message.created_at,
+        student_unread_count=Case(
+            When(student_id=sender_id, then=F("student_unread_count")),
+            default=F("student_unread_count") + 1,
+        ),
+        expert_unread_count=Case(
+            When(expert_id=sender_id, then=F("expert_unread_count")),
+            default=F("expert_unread_count") + 1,
+        ),
+        student_last_read_id=Case(
+            When(student_id=sender_id, then=Value(message.id)),
+            default=F("student_last_read_id"),
+            output_field=PositiveBigIntegerField(),
+        ),
+        expert_last_read_id=Case(
+            When(expert_id=sender_id, then=Value(message.id)),
+            default=F("expert_last_read_id"),
+            output_field=PositiveBigIntegerField(),
+        ),
+    )
+    participants = get_participants(message.consultation_id) or ()
+    cache.delete_many([UNREAD_TOTAL_KEY.format(user_id=uid) for uid in participants if uid and uid != sender_id])
+
+
+def retract_message_activity(message) -> None:
+    """
+    Undo record_message_activity() for a deleted ChatMessage: the columns are
+    re-read from the newest remaining message, and the message leaves the
+    recipient's unread counter if it was still unread. updated_at is left
+    alone: the deletion is activity too.
+    """
+    sender_id = message.sender_id
+    latest = (
+        ChatMessage.objects
+        .filter(consultation_id=message.consultation_id)
+        .order_by(*THREAD_ORDERING)
+        .only("created_at", "content")
+        .first()
+    )
+
+    def unread_without(side):
+        counter = f"{side}_unread_count"
+        return Case(
+            When(
+                Q(**{f"{side}_last_read_id__lt": message.id, f"{counter}__gt": 0}) & ~Q(**{f"{side}_id": sender_id}),
+                then=F(counter) - 1,
+            ),
+            default=F(counter),
+            output_field=PositiveIntegerField(),
+        )
+
+    Consultation.objects.filter(pk=message.consultation_id, message_count__gt=0).update(
+        last_message_at=latest.created_at if latest else None,
+        last_message_preview=message_preview(latest.content) if latest else "",
+        message_count=F("message_count") - 1,
+        student_unread_count=unread_without("student"),
+        expert_unread_count=unread_without("expert"),
+    )
+    participants = get_participants(message.consultation_id) or ()
+    cache.delete_many([UNREAD_TOTAL_KEY.format(user_id=uid) for uid in participants if uid and uid != sender_id])
+
+
+# -------------------------------------------------------------------
+# Status transitions
+# -------------------------------------------------------------------
+
+def can_transition(consultation, name: str, user_id: int) -> bool:
+    """
+    Whether `name` is currently offered to this user (for template flags only;
+    the authoritative check is the WHERE clause in transition()).
+    """
+    side, sources, _ = TRANSITIONS[name]
+    return getattr(consultation, f"{side}_id") == user_id and consultation.status in sources
+
+
+def transition(consultation_id: int, name: str, user_id: int) -> bool:
+    """
+    Apply a status transition with one conditional UPDATE:
+
+        UPDATE ... SET status = target
+        WHERE id = %s AND <side>_id = user AND status IN (sources)
+
+    The database arbitrates concurrent clicks (accept vs reject, end vs accept,
+    several workers): exactly one competing transition matches the row, the
+    others update nothing. Returns True if this call won.
+
+    Contention is handled by the database, not here: row locks on a server
+    database, and on SQLite (settings.DATABASES) transactions that take the
+    write lock at BEGIN and wait up to the busy timeout for it, so a losing
+    writer queues behind the winner instead of failing with "locked".
+    """
+    side, sources, target = TRANSITIONS[name]
+    with transaction.atomic():
+        won = Consultation.objects.filter(
+            pk=consultation_id,
+            status__in=sources,
+            **{f"{side}_id": user_id},
+        ).update(status=target)
+        if won and target not in OPEN_STATUSES:
+            # Only the winner releases the expert's queue slot.
+            ExpertProfile.objects.filter(
+                user_id=Subquery(Consultation.objects.filter(pk=consultation_id).values("expert_id")),
+                queue_depth__gt=0,
+            ).update(queue_depth=F("queue_depth") - 1)
+    return bool(won)
+
+
+# -------------------------------------------------------------------
+# Queue depth / auto-assignment
+# -------------------------------------------------------------------
+
+def adjust_queue_depth(expert_id: int | None, delta: int) -> None:
+    """
+    Move an expert's open-consultation counter by delta (never below zero).
+    """
+    if not expert_id:
+        return
+    qs = ExpertProfile.objects.filter(user_id=expert_id)
+    if delta < 0:
+        qs = qs.filter(queue_depth__gte=-delta)
+    qs.update(queue_depth=F("queue_depth") + delta)
+
+
+def recompute_queue_depth(expert_ids=None, dry_run: bool = False) -> int:
+    """
+    Reset queue_depth from a recount of open consultations for the drifted
+    experts (all of them, or those user ids). Returns how many were off.
+    """
+    open_count = (
+        Consultation.objects.filter(expert_id=OuterRef("user_id"), status__in=OPEN_STATUSES)
+        .order_by()
+        .values("expert_id")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    actual = Coalesce(Subquery(open_count), 0)
+    qs = ExpertProfile.objects.all() if expert_ids is None else ExpertProfile.objects.filter(user_id__in=expert_ids)
+    drifted = list(qs.annotate(actual=actual).exclude(queue_depth=F("actual")).values_list("pk", flat=True))
+    if drifted and not dry_run:
+        ExpertProfile.objects.filter(pk__in=drifted).update(queue_depth=actual)
+    return len(drifted)
+
+
+def consultation_type_ids(ctype: str) -> list[int]:
+    """
+    ConsultationType rows (what experts declare) matching a Consultation.type
+    choice (what students request), compared by normalized code or label.
+    """
+    if ctype not in ConsultationTypeChoices.values:
+        return []
+    wanted = {normalize_arabic(ctype), normalize_arabic(ConsultationTypeChoices(ctype).label)}
+    return [t.pk for t in consultation_types() if normalize_arabic(t.name) in wanted]
+
+
+def pick_expert(ctype: str, exclude_user_ids=()):
+    """
+    The approved expert offering `ctype` with the shortest open queue (ties:
+    better ranking, then oldest id), or None. Reads the maintained
+    queue_depth counters through the partial (queue_depth, ranking) index;
+    no per-expert COUNT(*).
+    """
+    type_ids = consultation_type_ids(ctype)
+    if not type_ids:
+        return None
+    return (
+        ExpertProfile.objects
+        .filter(is_approved=True, consultation_types__in=type_ids)
+        .exclude(user_id__in=exclude_user_ids)
+        .select_related("user")
+        .order_by("queue_depth", "-ranking_score", "id")
+        .distinct()
+        .first()
+    )
+
+
+# -------------------------------------------------------------------
+# Expert rating aggregates
+# -------------------------------------------------------------------
+
+def apply_rating_delta(expert_id: int, count_delta: int, stars_delta: int) -> None:
+    """
+    Fold a rating change into ExpertProfile with one UPDATE (no recount):
+    rating_count / rating_total move by the deltas and rating_avg is derived
+    from the new values in the same statement, so concurrent raters can't
+    lose each other's contribution. The directory ranking score is derived
+    the same way. The expert's recommendation row is refreshed after commit
+    (its prior is the ranking score).
+    """
+    if not (count_delta or stars_delta):
+        return
+    transaction.on_commit(
+        lambda: mark_experts_dirty(ExpertProfile.objects.filter(user_id=expert_id).values_list("pk", flat=True))
+    )
+    new_count = F("rating_count") + count_delta
+    new_total = F("rating_total") + stars_delta
+    ExpertProfile.objects.filter(user_id=expert_id).update(
+        rating_count=new_count,
+        rating_total=new_total,
+        rating_avg=Case(
+            When(rating_count__gt=-count_delta, then=Round(Cast(new_total, FloatField()) / new_count, 1)),
+            default=Value(0),
+            output_field=DecimalField(max_digits=3, decimal_places=1),
+        ),
+        ranking_score=ExpressionWrapper(
+            ExpertProfile.ranking_score_for(Cast(new_total, FloatField()), new_count),
+            output_field=FloatField(),
+        ),
+    )
+
+
+class RatingConflict(Exception):
+    """
+    The rating kept changing under rate_consultation(); the caller may retry.
+    """
+
+
+def rate_consultation(consultation, stars: int) -> ConsultationRating:
+    """
+    Create or change the consultation's rating and update the expert's
+    aggregates by the difference. The rating row is locked where the database
+    supports it; elsewhere (SQLite) a change is a compare-and-set on the old
+    stars, retried RATE_ATTEMPTS times before raising RatingConflict, so two
+    concurrent edits each apply their own delta once.
+    """
+    for _ in range(RATE_ATTEMPTS):
+        with transaction.atomic():
+            rating = ConsultationRating.objects.select_for_update().filter(consultation=consultation).first()
+            if rating is None:
+                try:
+                    with transaction.atomic():
+                        rating = ConsultationRating.objects.create(
+                            consultation=consultation, stars=stars, comment=""
+                        )
+                except IntegrityError:
+                    continue  # created concurrently: retry as a change
+                apply_rating_delta(consultation.expert_id, 1, stars)
+                return rating
+
+            old = rating.stars
+            if old == stars or ConsultationRating.objects.filter(pk=rating.pk, stars=old).update(stars=stars):
+                apply_rating_delta(consultation.expert_id, 0, stars - old)
+                rating.stars = stars
+                return rating
+    raise RatingConflict(f"Rating of consultation {consultation.pk} changed concurrently.")
+
+
+# -------------------------------------------------------------------
+# Read cursors / unread badge
+# -------------------------------------------------------------------
+
+def mark_read(consultation_id: int, side: str, user_id: int, last_message) -> bool:
+    """
+    Move the viewer's read cursor to last_message and clear their unread counter.
+
+    Callers invoke this once per delivered batch (page load, delta poll, stream
+    wake-up) and only when the batch contains something unread, so an idle or
+    caught-up viewer issues no writes. The UPDATE is skipped if a newer message
+    arrived meanwhile; it will be cleared by the next delivery instead.
+    """
+    updated = Consultation.objects.filter(
+        pk=consultation_id,
+        last_message_at__lte=last_message.created_at,
+        **{f"{side}_unread_count__gt": 0},
+    ).update(**{f"{side}_unread_count": 0, f"{side}_last_read_id": last_message.id})
+    if updated:
+        cache.delete(UNREAD_TOTAL_KEY.format(user_id=user_id))
+    return bool(updated)
+
+
+def unread_total(user) -> int:
+    """
+    Total unread messages across the user's consultations: one aggregate over
+    the partial unread indexes, cached until a message arrives or is read.
+    """
+    key = UNREAD_TOTAL_KEY.format(user_id=user.id)
+    total = cache.get(key)
+    if total is None:
+        total = Consultation.objects.filter(
+            Q(student=user, student_unread_count__gt=0) | Q(expert=user, expert_unread_count__gt=0)
+        ).aggregate(
+            total=Sum(
+                Case(
+                    When(student=user, then=F("student_unread_count")),
+                    default=F("expert_unread_count"),
+                )
+            )
+        )["total"] or 0
+        cache.set(key, total, timeout=UNREAD_TOTAL_TIMEOUT)
+    return total
@@ -0,0 +1,156 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from accounts.models import ConsultationType, ExpertProfile, Specialization, StudentProfile
+from career_path.models import PathSession
+
+from .models import Attachment, ChatMessage, Consultation, ConsultationRating
+from .realtime import get_broker
+from .recommendations import forget_student, mark_experts_dirty
+from .services import (
+    OPEN_STATUSES, adjust_queue_depth, apply_rating_delta, recompute_queue_depth, record_message_activity,
+    retract_message_activity,
+)
+from .thread_cache import bump_version, forget_participants
+
+
+@receiver(post_save, sender=ChatMessage)
+def publish_chat_message(sender, instance, created, **kwargs):
+    """
+    Notify open chat streams once the new message is visible to other connections.
+    """
+    if created:
+        consultation_id, message_id = instance.consultation_id, instance.id
+        transaction.on_commit(lambda: get_broker().publish(consultation_id, message_id))
+
+
+@receiver(post_save, sender=ChatMessage)
+def update_consultation_activity(sender, instance, created, **kwargs):
+    if created:
+        record_message_activity(instance)
+
+
+@receiver(post_delete, sender=ChatMessage)
+def retract_consultation_activity(sender, instance, origin=None, **kwargs):
+    # Nothing to keep consistent when the whole consultation is being deleted.
+    if isinstance(origin, Consultation) or getattr(origin, "model", None) is Consultation:
+        return
+    retract_message_activity(instance)
+
+
+@receiver(post_save, sender=ChatMessage)
+@receiver(post_delete, sender=ChatMessage)
+@receiver(post_save, sender=Attachment)
+@receiver(post_delete, sender=Attachment)
+def invalidate_thread_fragments(sender, instance, **kwargs):
+    """
+    Bump the thread version after commit, so a concurrent poll can't cache
+    pre-commit HTML under the new version.
+    """
+    consultation_id = instance.consultation_id
+    transaction.on_commit(lambda: bump_version(consultation_id))
+
+
+@receiver(post_save, sender=Consultation)
+@receiver(post_delete, sender=Consultation)
+def invalidate_participants(sender, instance, **kwargs):
+    forget_participants(instance.pk)
+
+
+# Queue slot held by a Consultation as loaded: the expert's user id while open.
+# Unknown when status or expert was deferred (.only()).
+_UNKNOWN_SLOT = object()
+
+
+def _queue_slot(values):
+    if "status" not in values or "expert_id" not in values:
+        return _UNKNOWN_SLOT
+    return values["expert_id"] if values["status"] in OPEN_STATUSES else None
+
+
+@receiver(post_init, sender=Consultation)
+def remember_queue_slot(sender, instance, **kwargs):
+    instance._queue_slot = _queue_slot(instance.__dict__)
+
+
+@receiver(post_save, sender=Consultation)
+def move_queue_slot(sender, instance, created, **kwargs):
+    """
+    Creation and save() edits (admin, shell) that open, close or reassign a
+    consultation move the slot; services.transition() updates without save()
+    and releases it itself.
+    """
+    old = None if created else instance._queue_slot
+    new = _queue_slot(instance.__dict__)
+    if old is _UNKNOWN_SLOT or new is _UNKNOWN_SLOT:
+        recompute_queue_depth([instance.expert_id])
+    elif old != new:
+        adjust_queue_depth(old, -1)
+        adjust_queue_depth(new, +1)
+    instance._queue_slot = new
+
+
+@receiver(post_delete, sender=Consultation)
+def release_queue_slot(sender, instance, **kwargs):
+    if instance.status in OPEN_STATUSES:
+        adjust_queue_depth(instance.expert_id, -1)
+
+
+@receiver(post_delete, sender=ConsultationRating)
+def withdraw_rating(sender, instance, **kwargs):
+    # Deleted directly or with its consultation (the CASCADE still has the expert id).
+    expert_id = Consultation.objects.filter(pk=instance.consultation_id).values_list("expert_id", flat=True).first()
+    if expert_id:
+        apply_rating_delta(expert_id, -1, -instance.stars)
+
+
+# -------------------------------------------------------------------
+# Recommendation index (consultations.recommendations)
+# -------------------------------------------------------------------
+
+def _mark_dirty_on_commit(profile_ids):
+    profile_ids = list(profile_ids)
+    if profile_ids:
+        transaction.on_commit(lambda: mark_experts_dirty(profile_ids))
+
+
+@receiver(post_save, sender=ExpertProfile)
+@receiver(post_delete, sender=ExpertProfile)
+def refresh_expert_recommendations(sender, instance, **kwargs):
+    _mark_dirty_on_commit([instance.pk])
+
+
+@receiver(m2m_changed, sender=ExpertProfile.specializations.through)
+@receiver(m2m_changed, sender=ExpertProfile.consultation_types.through)
+def refresh_expert_facets(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            _mark_dirty_on_commit([instance.pk])
+    elif action in ("post_add", "post_remove"):
+        _mark_dirty_on_commit(pk_set or ())
+    elif action == "pre_clear":
+        _mark_dirty_on_commit(instance.expertprofile_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Specialization)
+@receiver(post_save, sender=ConsultationType)
+def refresh_renamed_facet(sender, instance, created, **kwargs):
+    if not created:
+        _mark_dirty_on_commit(instance.expertprofile_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Consultation)
+def refresh_consultation_history(sender, instance, created, **kwargs):
+    # Only new consultations change served/booked type counts.
+    if created:
+        forget_student(instance.student_id)
+        if instance.expert_id:
+            _mark_dirty_on_commit(ExpertProfile.objects.filter(user_id=instance.expert_id).values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=StudentProfile)
+@receiver(post_save, sender=PathSession)
+def refresh_student_features(sender, instance, **kwargs):
+    if instance.user_id:
+        forget_student(instance.user_id)
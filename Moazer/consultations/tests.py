@@ -1,3 +1,548 @@
-from django.test import TestCase
+import asyncio
+import re
+import threading
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import ExpertProfile, Specialization
+
+from . import views
+from .models import Attachment, ChatMessage, Consultation, ConsultationRating, ConsultationStatus
+from .realtime import InProcessBroker, get_broker
+from .recommendations import ExpertIndex, _terms
+from .services import MESSAGES_PAGE_SIZE, inbox_page, mark_read, rate_consultation, transition, unread_total
+from .thread_cache import get_participants
+
+
+class ThreadQueryCountTests(TestCase):
+    """
+    Rendering a thread must cost the same number of queries for 2 or 25 messages.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user("student", password="pass", first_name="Sara")
+        self.expert = User.objects.create_user("expert", password="pass", first_name="Huda")
+        self.consultation = Consultation.objects.create(
+            student=self.student,
+            expert=self.expert,
+            title="CV review",
+            status=ConsultationStatus.ACTIVE,
+        )
+        # Warm the participants cache so every measured request sees the same state.
+        get_participants(self.consultation.id)
+        self.client.force_login(self.student)
+        # Likewise resolve the session-cached role (accounts.middleware.RoleMiddleware).
+        self.client.get(reverse("consultations:list_view"))
+
+    def _add_messages(self, n: int):
+        # Run on_commit hooks so the rendered-fragment cache is invalidated.
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(n):
+                ChatMessage.objects.create(
+                    consultation=self.consultation,
+                    sender=self.student if i % 2 else self.expert,
+                    content=f"message {i}",
+                )
+
+    def _add_attachments(self, n: int):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(n):
+                Attachment.objects.create(
+                    consultation=self.consultation,
+                    uploaded_by=self.student,
+                    file=f"attachments/file-{i}.pdf",
+                )
+
+    def _count_queries(self, url: str) -> int:
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_messages_partial_is_flat(self):
+        url = reverse("consultations:messages_partial", kwargs={"consultation_id": self.consultation.id})
+        self._add_messages(2)
+        small = self._count_queries(url)
+        self._add_messages(23)
+        self.assertEqual(self._count_queries(url), small)
+
+    def test_detail_is_flat(self):
+        url = reverse("consultations:detail_view", kwargs={"consultation_id": self.consultation.id})
+        self._add_messages(2)
+        self._add_attachments(1)
+        small = self._count_queries(url)
+        self._add_messages(23)
+        self._add_attachments(5)
+        self.assertEqual(self._count_queries(url), small)
+
+    def test_delta_is_flat(self):
+        url = reverse("consultations:messages_partial", kwargs={"consultation_id": self.consultation.id})
+        self._add_messages(2)
+        small = self._count_queries(f"{url}?after=0")
+        self._add_messages(23)
+        self.assertEqual(self._count_queries(f"{url}?after=0"), small)
+
+
+class MessagesPartialTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user("student", first_name="Sara")
+        self.expert = User.objects.create_user("expert", first_name="Huda")
+        self.consultation = Consultation.objects.create(
+            student=self.student, expert=self.expert, title="CV review", status=ConsultationStatus.ACTIVE
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ids = [
+                ChatMessage.objects.create(consultation=self.consultation, sender=self.expert, content=f"m{i}").id
+                for i in range(MESSAGES_PAGE_SIZE + 2)
+            ]
+        self.url = reverse("consultations:messages_partial", kwargs={"consultation_id": self.consultation.id})
+        self.client.force_login(self.student)
+
+    @staticmethod
+    def _ids(response):
+        return [int(i) for i in re.findall(r'data-message-id="(\d+)"', response.content.decode())]
+
+    def test_delta_returns_only_newer_messages(self):
+        response = self.client.get(self.url, {"after": self.ids[-3]})
+        self.assertEqual(self._ids(response), self.ids[-2:])
+        self.assertEqual(response["X-Last-Message-Id"], str(self.ids[-1]))
+
+        data = self.client.get(self.url, {"after": self.ids[-2], "format": "json"}).json()
+        self.assertEqual(data["last_id"], self.ids[-1])
+        self.assertEqual([m["content"] for m in data["messages"]], [f"m{MESSAGES_PAGE_SIZE + 1}"])
+
+    def test_delta_when_up_to_date(self):
+        response = self.client.get(self.url, {"after": self.ids[-1]})
+        self.assertEqual((response.status_code, response.content), (200, b""))
+        self.assertEqual(response["X-Last-Message-Id"], str(self.ids[-1]))
+
+        # Revalidation is answered from the thread version, without reading messages.
+        with CaptureQueriesContext(connection) as ctx:
+            again = self.client.get(self.url, {"after": self.ids[-1]}, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.assertFalse([q for q in ctx.captured_queries if "consultations_chatmessage" in q["sql"]])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            new = ChatMessage.objects.create(consultation=self.consultation, sender=self.expert, content="new")
+        fresh = self.client.get(self.url, {"after": self.ids[-1]}, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(self._ids(fresh), [new.id])
+
+    def test_history_pages_end_at_the_first_message(self):
+        newest = self.client.get(self.url)
+        self.assertEqual(self._ids(newest), self.ids[2:])
+        cursor = re.search(r'data-cursor="([^"]+)"', newest.content.decode()).group(1)
+
+        oldest = self.client.get(self.url, {"before": cursor})
+        self.assertEqual(self._ids(oldest), self.ids[:2])
+        self.assertNotContains(oldest, "data-older")
+
+
+class InboxPageTests(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user("student")
+        self.expert = User.objects.create_user("expert")
+        statuses = [ConsultationStatus.ACTIVE, ConsultationStatus.COMPLETED] * 3
+        self.consultations = [
+            Consultation.objects.create(student=self.student, expert=self.expert, title=f"c{i}", status=status)
+            for i, status in enumerate(statuses)
+        ]
+        # Oldest activity first, with a tie that only the id can break.
+        base = timezone.now() - timedelta(days=1)
+        for i, c in enumerate(self.consultations):
+            Consultation.objects.filter(pk=c.pk).update(updated_at=base + timedelta(minutes=min(i, 4)))
+        Consultation.objects.create(student=User.objects.create_user("other"), expert=self.expert, title="other")
+
+    def _walk(self, **filters):
+        seen, cursor = [], None
+        while True:
+            page, cursor = inbox_page(self.student, as_expert=False, cursor=cursor, limit=2, **filters)
+            seen.extend(c.title for c in page)
+            if cursor is None:
+                return seen
+
+    def test_pages_follow_latest_activity(self):
+        self.assertEqual(self._walk(), ["c5", "c4", "c3", "c2", "c1", "c0"])
+        self.assertEqual(self._walk(status=ConsultationStatus.COMPLETED), ["c5", "c3", "c1"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ChatMessage.objects.create(consultation=self.consultations[0], sender=self.expert, content="hi")
+        self.assertEqual(self._walk()[:2], ["c0", "c5"])
+
+    def test_each_side_sees_its_own_inbox(self):
+        page, cursor = inbox_page(self.expert, as_expert=True)
+        self.assertEqual((len(page), cursor), (7, None))
+        self.assertEqual(inbox_page(self.expert, as_expert=False), ([], None))
+
+
+class MessageActivityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user("student")
+        self.expert = User.objects.create_user("expert")
+        self.consultation = Consultation.objects.create(
+            student=self.student, expert=self.expert, title="CV review", status=ConsultationStatus.ACTIVE
+        )
+
+    def _send(self, sender, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ChatMessage.objects.create(consultation=self.consultation, sender=sender, content=content)
+
+    def _activity(self):
+        c = Consultation.objects.get(pk=self.consultation.pk)
+        return c.message_count, c.last_message_preview, c.last_message_at, c.student_unread_count
+
+    def test_new_message_is_unread_for_the_recipient_only(self):
+        self.assertEqual(unread_total(self.student), 0)
+        message = self._send(self.expert, "  hello\n  world ")
+        c = Consultation.objects.get(pk=self.consultation.pk)
+        self.assertEqual(self._activity(), (1, "hello world", message.created_at, 1))
+        self.assertEqual((c.updated_at, c.expert_unread_count, c.expert_last_read_id), (message.created_at, 0, message.id))
+
+        self.assertEqual(unread_total(self.student), 1)  # the cached 0 was dropped
+        with self.assertNumQueries(0):
+            unread_total(self.student)
+
+    def test_mark_read_moves_the_cursor_once(self):
+        self._send(self.expert, "first")
+        last = self._send(self.expert, "second")
+        self.assertEqual(unread_total(self.student), 2)
+
+        self.assertTrue(mark_read(self.consultation.id, "student", self.student.id, last))
+        c = Consultation.objects.get(pk=self.consultation.pk)
+        self.assertEqual((c.student_unread_count, c.student_last_read_id), (0, last.id))
+        self.assertEqual(unread_total(self.student), 0)
+        with self.assertNumQueries(1):
+            self.assertFalse(mark_read(self.consultation.id, "student", self.student.id, last))
+
+        # A message newer than the delivered batch keeps the counter.
+        Consultation.objects.filter(pk=self.consultation.pk).update(
+            student_unread_count=1, last_message_at=last.created_at + timedelta(seconds=1)
+        )
+        self.assertFalse(mark_read(self.consultation.id, "student", self.student.id, last))
+
+    def test_deleting_messages_rewinds_the_activity(self):
+        first = self._send(self.student, "first")
+        second = self._send(self.expert, "second")
+        third = self._send(self.expert, "third")
+        self.assertEqual(self._activity(), (3, "third", third.created_at, 2))
+
+        third.delete()
+        self.assertEqual(self._activity(), (2, "second", second.created_at, 1))
+        first.delete()  # the student's own message was never unread
+        self.assertEqual(self._activity(), (1, "second", second.created_at, 1))
+        second.delete()
+        self.assertEqual(self._activity(), (0, "", None, 0))
+
+    def test_consultation_delete_skips_the_rewind(self):
+        for i in range(3):
+            self._send(self.expert, str(i))
+        with CaptureQueriesContext(connection) as ctx:
+            self.consultation.delete()
+        self.assertFalse([q for q in ctx.captured_queries if q["sql"].startswith('UPDATE "consultations_consultation"')])
+
+
+class ChatStreamTests(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user("student", first_name="Sara")
+        self.expert = User.objects.create_user("expert", first_name="Huda")
+        self.consultation = Consultation.objects.create(
+            student=self.student, expert=self.expert, title="CV review", status=ConsultationStatus.ACTIVE
+        )
+        self.url = reverse("consultations:stream", kwargs={"consultation_id": self.consultation.id})
+
+    def _message(self, content):
+        return ChatMessage(consultation=self.consultation, sender=self.expert, content=content)
+
+    async def test_broker_wakes_the_stream(self):
+        await self.async_client.aforce_login(self.student)
+        response = await self.async_client.get(self.url)
+        stream = aiter(response.streaming_content)
+        next_event = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.05)  # let the stream subscribe
+
+        message = await sync_to_async(ChatMessage.objects.create)(
+            consultation=self.consultation, sender=self.expert, content="hello"
+        )
+        get_broker().publish(self.consultation.id, message.id)
+        event = (await asyncio.wait_for(next_event, 1)).decode()
+        self.assertTrue(event.startswith(f"id: {message.id}\nevent: message\n"))
+        self.assertIn("hello", event)
+        await stream.aclose()
+
+    async def test_heartbeat_rereads_messages_from_other_processes(self):
+        await self.async_client.aforce_login(self.student)
+        with mock.patch.object(views, "STREAM_HEARTBEAT_SECONDS", 0.01):
+            response = await self.async_client.get(f"{self.url}?after=0")
+            stream = aiter(response.streaming_content)
+            self.assertEqual(await anext(stream), b": keep-alive\n\n")
+            # Committed elsewhere: this process's broker never hears of it.
+            await sync_to_async(ChatMessage.objects.bulk_create)([self._message("from another worker")])
+            self.assertIn("from another worker", (await anext(stream)).decode())
+            await stream.aclose()
+
+    def test_outsider_and_wsgi(self):
+        self.client.force_login(User.objects.create_user("outsider"))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get(self.url).status_code, 204)
+
+
+class InProcessBrokerTests(SimpleTestCase):
+    async def test_burst_collapses_into_one_wakeup(self):
+        broker = InProcessBroker()
+        queue = broker.subscribe(7)
+        broker.publish(7, 1)
+        broker.publish(7, 2)
+        broker.publish(8, 3)
+        await asyncio.sleep(0)
+        self.assertEqual((queue.qsize(), queue.get_nowait()), (1, 1))
+
+        await asyncio.to_thread(broker.publish, 7, 4)
+        self.assertEqual(await asyncio.wait_for(queue.get(), 1), 4)
+
+        broker.unsubscribe(7, queue)
+        broker.unsubscribe(7, queue)
+        self.assertEqual(broker.subscriber_count(7), 0)
+
+
+class TransitionRaceTests(TransactionTestCase):
+    """
+    Parallel transitions on one consultation: exactly one may win and the
+    final status must be the winner's target.
+    """
+
+    WORKERS = 8
+
+    def setUp(self):
+        self.student = User.objects.create_user("student", password="pass")
+        self.expert = User.objects.create_user("expert", password="pass")
+        self.consultation = Consultation.objects.create(
+            student=self.student,
+            expert=self.expert,
+            title="Race",
+            status=ConsultationStatus.PENDING,
+        )
+
+    def _race(self, actions):
+        barrier = threading.Barrier(len(actions))
+        results = []
+        lock = threading.Lock()
+
+        def worker(action, user_id):
+            try:
+                barrier.wait()
+                won = transition(self.consultation.id, action, user_id)
+                with lock:
+                    results.append((action, won))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=a) for a in actions]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
+
+    def test_accept_reject_race(self):
+        actions = [
+            ("expert_accept" if i % 2 else "expert_reject", self.expert.id)
+            for i in range(self.WORKERS)
+        ]
+        results = self._race(actions)
+
+        winners = [action for action, won in results if won]
+        self.assertEqual(len(results), self.WORKERS)
+        self.assertEqual(len(winners), 1)
+
+        expected = ConsultationStatus.ACTIVE if winners[0] == "expert_accept" else ConsultationStatus.CLOSED
+        self.consultation.refresh_from_db()
+        self.assertEqual(self.consultation.status, expected)
+
+    def test_student_and_expert_end_race(self):
+        Consultation.objects.filter(pk=self.consultation.id).update(status=ConsultationStatus.ACTIVE)
+        actions = [
+            ("student_end", self.student.id) if i % 2 else ("expert_end", self.expert.id)
+            for i in range(self.WORKERS)
+        ]
+        results = self._race(actions)
+
+        self.assertEqual(sum(won for _, won in results), 1)
+        self.consultation.refresh_from_db()
+        self.assertEqual(self.consultation.status, ConsultationStatus.COMPLETED)
+
+    def test_duplicate_clicks_win_once(self):
+        results = self._race([("expert_accept", self.expert.id)] * self.WORKERS)
+        self.assertEqual(Counter(won for _, won in results), Counter({True: 1, False: self.WORKERS - 1}))
+
+    def test_wrong_participant_never_wins(self):
+        self.assertFalse(transition(self.consultation.id, "expert_accept", self.student.id))
+        self.consultation.refresh_from_db()
+        self.assertEqual(self.consultation.status, ConsultationStatus.PENDING)
+
+
+class RatingAggregateTests(TestCase):
+    """
+    Ratings are folded into ExpertProfile by deltas; the repair command
+    recomputes the same values from the rating rows.
+    """
+
+    def setUp(self):
+        self.student = User.objects.create_user("student")
+        self.expert = User.objects.create_user("expert")
+        self.profile = ExpertProfile.objects.create(user=self.expert, gender="female")
+
+    def _consultation(self):
+        return Consultation.objects.create(
+            student=self.student, expert=self.expert, title="CV", status=ConsultationStatus.COMPLETED
+        )
+
+    def _aggregates(self):
+        self.profile.refresh_from_db()
+        return self.profile.rating_count, self.profile.rating_total, self.profile.rating_avg
+
+    def test_create_and_change_apply_deltas(self):
+        first, second = self._consultation(), self._consultation()
+        rate_consultation(first, 5)
+        rate_consultation(second, 2)
+        self.assertEqual(self._aggregates(), (2, 7, Decimal("3.5")))
+
+        rate_consultation(first, 3)
+        self.assertEqual(self._aggregates(), (2, 5, Decimal("2.5")))
+        self.assertEqual(ConsultationRating.objects.get(consultation=first).stars, 3)
+
+        rate_consultation(first, 3)
+        self.assertEqual(self._aggregates(), (2, 5, Decimal("2.5")))
+
+    def test_recompute_repairs_drift(self):
+        rate_consultation(self._consultation(), 4)
+        rate_consultation(self._consultation(), 5)
+        expected = self._aggregates()
+        ExpertProfile.objects.filter(pk=self.profile.pk).update(rating_count=9, rating_total=1, rating_avg=0)
+
+        out = StringIO()
+        call_command("recompute_expert_ratings", "--dry-run", stdout=out)
+        self.assertIn("1 would be fixed", out.getvalue())
+        self.assertEqual(self._aggregates(), (9, 1, Decimal("0.0")))
+
+        call_command("recompute_expert_ratings", "--batch-size", "1", stdout=StringIO())
+        self.assertEqual(self._aggregates(), expected)
+        self.assertEqual(expected, (2, 9, Decimal("4.5")))
+
+
+class ExpertIndexTests(TestCase):
+    """
+    Dirty rows are repacked incrementally into the same matrix a full build gives.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user("student")
+        law, cv = Specialization.objects.create(name="القانون"), Specialization.objects.create(name="السيرة الذاتية")
+        self.experts = []
+        for i, spec in enumerate([law, cv, cv]):
+            user = User.objects.create_user(f"expert{i}")
+            profile = ExpertProfile.objects.create(user=user, gender="male", is_approved=True)
+            profile.specializations.add(spec)
+            self.experts.append(profile)
+
+    @staticmethod
+    def _query(text):
+        return {f"term:{term}": 1.0 for term in _terms(text)}
+
+    @staticmethod
+    def _matrix(index):
+        snap = index._snapshot
+        columns = {column: feature for feature, column in snap.vocab.items()}
+        rows = {}
+        for row, column, weight in zip(snap.row_of, snap.indices, snap.data):
+            rows.setdefault(int(snap.ids[row]), {})[columns[int(column)]] = round(float(weight), 9)
+        priors = dict(zip(snap.ids.tolist(), snap.prior.round(9).tolist()))
+        return rows, priors
+
+    def test_rating_marks_expert_dirty_and_repack_matches_full_build(self):
+        index = ExpertIndex()
+        self.assertEqual(len(index.top(self._query("القانون"), 3)), 3)
+        self.assertEqual(index.top(self._query("القانون"), 1), [self.experts[0].pk])
+
+        consultation = Consultation.objects.create(
+            student=self.student, expert=self.experts[2].user, title="CV", status=ConsultationStatus.COMPLETED
+        )
+        self.assertEqual(len(set(self._matrix(index)[1].values())), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            rate_consultation(consultation, 5)
+        index.sync()
+        priors = self._matrix(index)[1]
+        self.assertGreater(priors[self.experts[2].pk], priors[self.experts[1].pk])
+
+        fresh = ExpertIndex()
+        fresh.sync()
+        self.assertEqual(self._matrix(index), self._matrix(fresh))
+
+
+class QueueDepthTests(TestCase):
+    """
+    queue_depth follows save() edits; the repair command fixes bulk updates.
+    """
+
+    def setUp(self):
+        self.student = User.objects.create_user("student")
+        self.profiles = [
+            ExpertProfile.objects.create(user=User.objects.create_user(f"expert{i}"), gender="male")
+            for i in range(2)
+        ]
+
+    def _depths(self):
+        return [ExpertProfile.objects.get(pk=p.pk).queue_depth for p in self.profiles]
+
+    def test_save_edits_move_the_slot(self):
+        first, second = (p.user for p in self.profiles)
+        consultation = Consultation.objects.create(
+            student=self.student, expert=first, title="CV", status=ConsultationStatus.PENDING
+        )
+        self.assertEqual(self._depths(), [1, 0])
+
+        consultation.expert = second
+        consultation.save()
+        self.assertEqual(self._depths(), [0, 1])
+
+        consultation = Consultation.objects.get(pk=consultation.pk)
+        consultation.status = ConsultationStatus.CLOSED
+        consultation.save()
+        self.assertEqual(self._depths(), [0, 0])
+
+        deferred = Consultation.objects.only("id").get(pk=consultation.pk)
+        deferred.status = ConsultationStatus.ACTIVE
+        deferred.save(update_fields=["status"])
+        self.assertEqual(self._depths(), [0, 1])
+
+    def test_recompute_repairs_drift(self):
+        Consultation.objects.create(
+            student=self.student, expert=self.profiles[0].user, title="CV", status=ConsultationStatus.ACTIVE
+        )
+        Consultation.objects.update(status=ConsultationStatus.COMPLETED)
+        ExpertProfile.objects.filter(pk=self.profiles[1].pk).update(queue_depth=3)
+
+        out = StringIO()
+        call_command("recompute_queue_depth", "--dry-run", stdout=out)
+        self.assertIn("2 experts would be fixed", out.getvalue())
+        self.assertEqual(self._depths(), [1, 3])
+
+        call_command("recompute_queue_depth", stdout=StringIO())
+        self.assertEqual(self._depths(), [0, 0])
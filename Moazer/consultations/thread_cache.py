@@ -0,0 +1,80 @@
+"""
+Rendered-fragment cache for chat threads.
+
+Most polls of messages_partial_view return exactly the same HTML, so the newest
+page of a thread is cached per (consultation, viewer side). The key embeds a
+per-consultation version counter that signals bump whenever a ChatMessage or
+Attachment is saved or deleted: stale fragments are never read again and simply
+age out of the (bounded) cache configured in settings.CACHES, which all worker
+processes share.
+
+Participants are cached as well so an authorized poll on a warm cache runs no
+consultation queries at all.
+"""
+
+import time
+
+from django.core.cache import cache
+
+from .models import Consultation
+
+VERSION_KEY = "consultations:thread-version:{id}"
+FRAGMENT_KEY = "consultations:thread-html:{id}:{side}:{version}"
+PARTICIPANTS_KEY = "consultations:participants:{id}"
+
+# Fragments of idle threads expire on their own; the version bump handles freshness.
+FRAGMENT_TIMEOUT = 60 * 10
+PARTICIPANTS_TIMEOUT = 60 * 60
+
+
+def get_version(consultation_id: int) -> int:
+    """
+    Current thread version. A missing (evicted) counter restarts from a
+    time-based value so fragments cached under an old counter can't be reused.
+    """
+    key = VERSION_KEY.format(id=consultation_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(consultation_id: int) -> None:
+    key = VERSION_KEY.format(id=consultation_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def get_or_render_fragment(consultation_id: int, side: str, render) -> str:
+    """
+    Return the cached newest-page HTML for this viewer side, calling render()
+    (ORM + template) only on a miss.
+    """
+    key = FRAGMENT_KEY.format(id=consultation_id, side=side, version=get_version(consultation_id))
+    html = cache.get(key)
+    if html is None:
+        html = render()
+        cache.set(key, html, timeout=FRAGMENT_TIMEOUT)
+    return html
+
+
+def get_participants(consultation_id: int):
+    """
+    Return (student_id, expert_id) for a consultation, or None if it doesn't exist.
+    """
+    key = PARTICIPANTS_KEY.format(id=consultation_id)
+    participants = cache.get(key)
+    if participants is None:
+        row = Consultation.objects.filter(pk=consultation_id).values_list("student_id", "expert_id").first()
+        if row is None:
+            return None
+        participants = tuple(row)
+        cache.set(key, participants, timeout=PARTICIPANTS_TIMEOUT)
+    return participants
+
+
+def forget_participants(consultation_id: int) -> None:
+    cache.delete(PARTICIPANTS_KEY.format(id=consultation_id))
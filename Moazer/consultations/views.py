@@ -1,36 +1,35 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
 from django.template.loader import render_to_string
-from django.http import HttpResponse, HttpResponseForbidden
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from .models import (
     Consultation,
     ChatMessage,
     Attachment,
-    ConsultationRating,
     ConsultationStatus,
     ConsultationTypeChoices,
 )
 from django.contrib.auth import get_user_model
-from accounts.models import ExpertProfile, StudentProfile  
-
-def is_student(user) -> bool:
-    """
-    Check if user is a student via Group('Students') OR profile existence.
-    """
-    return (
-        user.groups.filter(name="Students").exists()
-        or StudentProfile.objects.filter(user=user).exists()
-    )
+from accounts.directory import SORT_MODES
+from accounts.models import ExpertProfile
+from .realtime import get_broker
+from .recommendations import recommend_experts
+from .services import (
+    INBOX_ORDERING, RatingConflict, can_transition, inbox_page, load_thread, mark_read, pick_expert, rate_consultation, transition,
+)
+from .thread_cache import get_or_render_fragment, get_participants, get_version
 
-def is_expert(user) -> bool:
-    """
-    Check if user is an expert via Group('Experts') OR profile existence.
-    """
-    return (
-        user.groups.filter(name="Experts").exists()
-        or ExpertProfile.objects.filter(user=user).exists()
-    )
+# Seconds between SSE keep-alive comments (and fallback re-reads) on an idle chat stream.
+STREAM_HEARTBEAT_SECONDS = 25
 
 # -------------------------------------------------------------------
 # List consultations for the current user.
@@ -44,50 +43,46 @@ def list_view(request):
     """
     List consultations filtered by actual role (student vs expert).
     """
-    if is_expert(request.user):
-        qs = Consultation.objects.filter(expert=request.user).order_by("-updated_at")
-        role_flag = True
-    else:
-        # default to student-view (إن لم يكن خبير)
-        qs = Consultation.objects.filter(student=request.user).order_by("-updated_at")
-        role_flag = False
-
-    # Filter based on status
+    role_flag = request.role.is_expert
     status = request.GET.get("status")
-    if status:
-        qs = qs.filter(status=status)
-
-    # Filter based on type
     ctype = request.GET.get("type")
-    if ctype:
-        qs = qs.filter(type=ctype)
-
-    qs = qs.order_by("-updated_at")
 
+    items, next_cursor = inbox_page(
+        request.user,
+        as_expert=role_flag,
+        status=status,
+        ctype=ctype,
+        cursor=request.GET.get("cursor"),
+    )
 
-    return render(request, "consultations/list.html", {"items": qs, "is_expert": role_flag, "status_choices": ConsultationStatus.choices, "ctype_choices": ConsultationTypeChoices.choices, "selected_status": status, "selected_type": ctype})
+    return render(request, "consultations/list.html", {"items": items, "next_cursor": next_cursor, "is_expert": role_flag, "status_choices": ConsultationStatus.choices, "ctype_choices": ConsultationTypeChoices.choices, "selected_status": status, "selected_type": ctype})
 
 # -------------------------------------------------------------------
 # Create a consultation for a specific expert (expert_id comes via URL).
 # - The expert is selected from the experts list page (outside this app).
+# - Without expert_id (auto-assign mode) the least busy approved expert
+#   offering the requested type is picked on submit.
 # - Supports multi-file attachments via input name="files" (multiple).
 # - On success, redirects to the consultation detail page.
 # -------------------------------------------------------------------
 @login_required
-def create_view(request, expert_id: int):
+def create_view(request, expert_id: int | None = None):
     """
-    Create a consultation for a specific expert (must be a student).
+    Create a consultation for a specific expert, or auto-assign one
+    (must be a student).
     """
     # Only students can create a consultation
-    if not is_student(request.user):
+    if not request.role.is_student:
         messages.error(request, "فقط الطالب يمكنه طلب استشارة.")
         return redirect("consultations:list_view")
 
     # Ensure expert_id belongs to a real expert (by profile/group)
-    expert_profile = ExpertProfile.objects.filter(user_id=expert_id).select_related("user").first()
-    if not expert_profile:
-        messages.error(request, "المستخدم المحدد ليس خبيرًا.")
-        return redirect("consultations:list_view")
+    expert_profile = None
+    if expert_id is not None:
+        expert_profile = ExpertProfile.objects.filter(user_id=expert_id).select_related("user").first()
+        if not expert_profile:
+            messages.error(request, "المستخدم المحدد ليس خبيرًا.")
+            return redirect("consultations:list_view")
 
     if request.method == "POST":
         title = request.POST.get("title", "").strip()
@@ -96,11 +91,17 @@ def create_view(request, expert_id: int):
 
         if not title or not ctype:
             messages.error(request, "الرجاء تعبئة الحقول المطلوبة.")
-            return redirect("consultations:create_view", expert_id=expert_id)
+            return redirect(request.path)
+
+        if expert_profile is None:
+            expert_profile = pick_expert(ctype, exclude_user_ids=[request.user.id])
+            if expert_profile is None:
+                messages.error(request, "لا يوجد خبير متاح لهذا النوع من الاستشارات حاليًا.")
+                return redirect(request.path)
 
         cons = Consultation.objects.create(
             student=request.user,
-            expert_id=expert_id,
+            expert_id=expert_profile.user_id,
             title=title,
             description=description,
             type=ctype,
@@ -114,7 +115,7 @@ def create_view(request, expert_id: int):
         messages.success(request, "تم إنشاء الاستشارة.")
         return redirect("consultations:detail_view", consultation_id=cons.id)
 
-    return render(request, "consultations/create.html", {"ctype_choices": ConsultationTypeChoices.choices})
+    return render(request, "consultations/create.html", {"ctype_choices": ConsultationTypeChoices.choices, "expert": expert_profile})
 
 # -------------------------------------------------------------------
 # Consultation detail + chat thread.
@@ -128,7 +129,7 @@ def create_view(request, expert_id: int):
 # -------------------------------------------------------------------
 @login_required
 def detail_view(request, consultation_id: int):
-    c = get_object_or_404(Consultation, pk=consultation_id)
+    c = get_object_or_404(Consultation.objects.select_related("student", "expert"), pk=consultation_id)
 
     # Only participants may view
     if c.student_id != request.user.id and c.expert_id != request.user.id:
@@ -139,9 +140,9 @@ def detail_view(request, consultation_id: int):
     user_is_student = (request.user.id == c.student_id)
 
     # Flags for template (avoid string-membership bugs in template)
-    allow_student_end = (user_is_student and c.status == ConsultationStatus.ACTIVE)
-    allow_expert_end = (user_is_expert and c.status in [ConsultationStatus.ACTIVE, ConsultationStatus.PENDING])
-    allow_expert_decide = (user_is_expert and c.status == ConsultationStatus.PENDING)
+    allow_student_end = can_transition(c, "student_end", request.user.id)
+    allow_expert_end = can_transition(c, "expert_end", request.user.id)
+    allow_expert_decide = can_transition(c, "expert_accept", request.user.id)
 
     if request.method == "POST":
         action = request.POST.get("action")
@@ -158,21 +159,20 @@ def detail_view(request, consultation_id: int):
                 return redirect("consultations:detail_view", consultation_id=c.id)
             return redirect("consultations:rate_view", consultation_id=c.id)
 
-        if action == "expert_accept" and allow_expert_decide:
-            c.status = ConsultationStatus.ACTIVE
-            c.save(update_fields=["status"])
+        if action in ("expert_accept", "expert_reject", "expert_end"):
+            # The UPDATE decides; a stale page or a concurrent click simply loses.
+            if not transition(c.id, action, request.user.id):
+                messages.error(request, "تغيّرت حالة الاستشارة، حدّث الصفحة.")
+            elif action == "expert_end":
+                messages.success(request, "تم إنهاء الاستشارة من طرف الخبير.")
             return redirect("consultations:detail_view", consultation_id=c.id)
 
-        if action == "expert_reject" and allow_expert_decide:
-            c.status = ConsultationStatus.CLOSED
-            c.save(update_fields=["status"])
-            return redirect("consultations:detail_view", consultation_id=c.id)
+    thread = load_thread(c, with_attachments=True)
 
-        if action == "expert_end" and allow_expert_end:
-            c.status = ConsultationStatus.COMPLETED
-            c.save(update_fields=["status"])
-            messages.success(request, "تم إنهاء الاستشارة من طرف الخبير.")
-            return redirect("consultations:detail_view", consultation_id=c.id)
+    # Opening the thread reads it; no write when nothing was unread.
+    side = "expert" if user_is_expert else "student"
+    if getattr(c, f"{side}_unread_count") and thread["thread_messages"]:
+        mark_read(c.id, side, request.user.id, thread["thread_messages"][-1])
 
     return render(
         request,
@@ -183,13 +183,14 @@ def detail_view(request, consultation_id: int):
             "allow_student_end": allow_student_end,
             "allow_expert_end": allow_expert_end,
             "allow_expert_decide": allow_expert_decide,
+            **thread,
         },
     )
 
 # -------------------------------------------------------------------
 # Rating page (stars only, no comment).
 # - Only the student can rate.
-# - On submit: upsert rating to 1..5 and mark consultation COMPLETED.
+# - On submit: mark consultation COMPLETED and upsert rating to 1..5.
 # - Uses minimal validation to prevent DB integrity errors.
 # -------------------------------------------------------------------
 @login_required
@@ -198,7 +199,8 @@ def rate_view(request, consultation_id: int):
     Star-only rating endpoint.
     - Only the student who owns the consultation can rate.
     - Accepts a POST with 'rating' ∈ {1..5}.
-    - Upserts ConsultationRating, then marks the consultation as COMPLETED.
+    - Marks the consultation COMPLETED (conditional UPDATE), then upserts
+      ConsultationRating in the same transaction.
     """
     consultation = get_object_or_404(Consultation, pk=consultation_id)
 
@@ -216,15 +218,22 @@ def rate_view(request, consultation_id: int):
 
         stars = int(val)
 
-        # Upsert rating; using defaults ensures 'stars' is never NULL on create
-        ConsultationRating.objects.update_or_create(
-            consultation=consultation,
-            defaults={"stars": stars, "comment": ""},  # comment intentionally empty
-        )
-
-        # Mark consultation as completed
-        consultation.status = ConsultationStatus.COMPLETED
-        consultation.save(update_fields=["status"])
+        try:
+            with transaction.atomic():
+                # ACTIVE → COMPLETED, unless it is already completed (re-rating, or
+                # the expert ended it first); anything else can't be rated.
+                if not transition(consultation.id, "student_end", request.user.id) and not (
+                    Consultation.objects.filter(pk=consultation.id, status=ConsultationStatus.COMPLETED).exists()
+                ):
+                    messages.error(request, "لا يمكن تقييم الاستشارة في حالتها الحالية.")
+                    return redirect("consultations:detail_view", consultation_id=consultation.id)
+
+                # Upsert rating and fold it into the expert's rating aggregates
+                rate_consultation(consultation, stars)
+        except RatingConflict:
+            # Rolled back, transition included: the student can simply resubmit.
+            messages.error(request, "تعذّر حفظ التقييم، حاول مرة أخرى.")
+            return redirect("consultations:rate_view", consultation_id=consultation.id)
 
         messages.success(request, "تم إنهاء الاستشارة وتسجيل التقييم.")
         return redirect("consultations:detail_view", consultation_id=consultation.id)
@@ -237,17 +246,195 @@ def rate_view(request, consultation_id: int):
 # Lightweight polling endpoint that returns only the chat messages HTML.
 # - Used by detail page to refresh the chat box via JS without full reload.
 # - Returns 403 if the current user is not a participant.
+# - Delta mode (?after=<last seen message id>): returns only newer
+#   messages as an HTML fragment (or compact JSON with ?format=json) and
+#   answers 304 when the client's ETag/Last-Modified is still current.
+# - History mode (?before=<cursor>): returns the previous page of the
+#   thread for the "load older" button.
 # -------------------------------------------------------------------
 @login_required
 def messages_partial_view(request, consultation_id: int):
-    c = get_object_or_404(Consultation, pk=consultation_id)
+    participants = get_participants(consultation_id)
+    if participants is None:
+        raise Http404("Consultation not found")
+    student_id, expert_id = participants
     # Authorization: only participants can poll the messages.
-    if c.student_id != request.user.id and c.expert_id != request.user.id:
+    if student_id != request.user.id and expert_id != request.user.id:
         return HttpResponseForbidden("Forbidden")
 
-    html = render_to_string("consultations/messages.html", {"c": c}, request=request)
+    side = "student" if request.user.id == student_id else "expert"
+
+    after = request.GET.get("after")
+    if after is not None:
+        return _messages_delta(request, consultation_id, side, int(after) if after.isdigit() else 0)
+
+    before = request.GET.get("before")
+    if before:
+        html = render_to_string(
+            "consultations/components/thread_page.html",
+            load_thread(consultation_id, before=before),
+            request=request,
+        )
+        return HttpResponse(html)
+
+    # Newest page: served from the fragment cache while the thread is unchanged.
+    html = get_or_render_fragment(
+        consultation_id,
+        side,
+        lambda: render_to_string("consultations/messages.html", load_thread(consultation_id), request=request),
+    )
     return HttpResponse(html)
 
+
+def _messages_delta(request, consultation_id: int, side: str, after_id: int):
+    """
+    One indexed range query (consultation_id, id > after_id); nothing is
+    rendered when the client is already up to date.
+
+    The ETag embeds the thread version (thread_cache), read before the query:
+    a client revalidating the same `after` answers 304 from the cache alone
+    until a message or attachment of the thread changes.
+    """
+    etag = quote_etag(f"{consultation_id}.{after_id}.{get_version(consultation_id)}")
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    new_messages = list(
+        ChatMessage.objects
+        .filter(consultation_id=consultation_id, id__gt=after_id)
+        .select_related("sender")
+        .order_by("id")
+    )
+    last_id = new_messages[-1].id if new_messages else after_id
+    last_modified = new_messages[-1].created_at if new_messages else None
+
+    # Clients that only send If-Modified-Since.
+    not_modified = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if not_modified is not None:
+        return not_modified
+
+    _mark_delivered(consultation_id, side, request.user.id, new_messages)
+
+    if request.GET.get("format") == "json":
+        response = JsonResponse({
+            "last_id": last_id,
+            "messages": [
+                {
+                    "id": m.id,
+                    "sender_id": m.sender_id,
+                    "sender": m.sender.first_name,
+                    "content": m.content,
+                    "created_at": m.created_at.isoformat(),
+                }
+                for m in new_messages
+            ],
+        })
+    else:
+        html = "".join(
+            render_to_string("consultations/components/message.html", {"m": m}, request=request)
+            for m in new_messages
+        )
+        response = HttpResponse(html)
+
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    response["X-Last-Message-Id"] = str(last_id)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _mark_delivered(consultation_id: int, side: str, user_id: int, delivered) -> None:
+    """
+    One read-cursor write per delivered batch, and only if the batch holds
+    messages from the other participant.
+    """
+    if any(m.sender_id != user_id for m in delivered):
+        mark_read(consultation_id, side, user_id, delivered[-1])
+
+
+# -------------------------------------------------------------------
+# Push channel (Server-Sent Events) for the chat box.
+# - Only the two participants may subscribe.
+# - An idle stream is a parked coroutine waiting on the broker; it
+#   touches the DB when a new message is committed, and once per
+#   heartbeat as a fallback for messages sent through other processes.
+# - Served under ASGI only; under WSGI it answers 204 so the page falls
+#   back to polling messages_partial_view.
+# -------------------------------------------------------------------
+def _new_message_events(request, consultation_id: int, side: str, after_id: int):
+    """
+    Render every message newer than after_id as one SSE event each.
+    Returns (events, new_after_id).
+    """
+    events = []
+    new_messages = list(
+        ChatMessage.objects
+        .filter(consultation_id=consultation_id, id__gt=after_id)
+        .select_related("sender")
+        .order_by("id")
+    )
+    for m in new_messages:
+        html = render_to_string("consultations/components/message.html", {"m": m}, request=request)
+        data = json.dumps({"id": m.id, "html": html}, ensure_ascii=False)
+        events.append(f"id: {m.id}\nevent: message\ndata: {data}\n\n")
+        after_id = m.id
+    _mark_delivered(consultation_id, side, request.user.id, new_messages)
+    return events, after_id
+
+
+@login_required
+async def stream_view(request, consultation_id: int):
+    user = await request.auser()
+    c = await Consultation.objects.filter(pk=consultation_id).only("student_id", "expert_id").afirst()
+    if c is None:
+        raise Http404("Consultation not found")
+    # Authorization: only participants can subscribe.
+    if c.student_id != user.id and c.expert_id != user.id:
+        return HttpResponseForbidden("Forbidden")
+
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    side = "student" if user.id == c.student_id else "expert"
+
+    # Resume point: EventSource sends Last-Event-ID on reconnect,
+    # the first connection passes the last rendered id as ?after=.
+    raw_after = request.headers.get("Last-Event-ID") or request.GET.get("after") or "0"
+    after_id = int(raw_after) if raw_after.isdigit() else 0
+    broker = get_broker()
+    load_events = sync_to_async(_new_message_events)
+
+    async def event_stream():
+        queue = broker.subscribe(consultation_id)
+        try:
+            # Catch anything committed between the page render and subscribe().
+            last_id = after_id
+            events, last_id = await load_events(request, consultation_id, side, last_id)
+            for event in events:
+                yield event
+            while True:
+                try:
+                    await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # No wake-up from this process's broker: still re-read, so
+                    # messages committed by other workers arrive within one beat.
+                    yield ": keep-alive\n\n"
+                events, last_id = await load_events(request, consultation_id, side, last_id)
+                for event in events:
+                    yield event
+        finally:
+            broker.unsubscribe(consultation_id, queue)
+
+    response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
 @login_required
 def overview_view(request):
     """
@@ -256,26 +443,28 @@ def overview_view(request):
       - قائمة خبراء مختصرة (5 عناصر)
     وتحت كل قسم زر "المزيد".
     """
-    user_is_expert = is_expert(request.user)
+    user_is_expert = request.role.is_expert
 
     if user_is_expert:
-        cons_qs = Consultation.objects.filter(expert=request.user)
+        cons_qs = Consultation.objects.filter(expert=request.user).select_related("student")
     else:
-        cons_qs = Consultation.objects.filter(student=request.user)
+        cons_qs = Consultation.objects.filter(student=request.user).select_related("expert")
 
-    cons_qs = cons_qs.order_by("-updated_at")[:5]
+    cons_qs = cons_qs.order_by(*INBOX_ORDERING)[:5]
 
     experts_qs = (
         ExpertProfile.objects
         .filter(is_approved=True)
         .select_related("user")
         .prefetch_related("specializations", "consultation_types")
-        .order_by("-rating_avg", "-rating_count", "user__id")[:5]
+        .order_by(*SORT_MODES["rating"])[:5]
     )
 
     context = {
         "is_expert": user_is_expert,
         "consultations_preview": cons_qs,
         "experts_preview": experts_qs,
+        # Served from the in-memory matching index (see recommendations.py).
+        "recommended_experts": recommend_experts(request.user) if request.role.is_student else [],
     }
     return render(request, "consultations/overview.html", context)
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""
+Platform-wide counters shown on the landing page.
+
+The counts are read from the cache only; a miss costs one grouped query.
+main.signals drops the cached value whenever group membership changes, so a
+warm landing page needs no database round trip at all.
+"""
+
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db.models import Count
+
+STUDENTS_GROUP = "Students"
+EXPERTS_GROUP = "Experts"
+
+COUNTS_KEY = "main:platform-counts"
+# Safety net only: invalidation is signal driven.
+COUNTS_TIMEOUT = 60 * 60
+
+
+def platform_counts() -> dict:
+    """
+    {"students": n, "experts": n}: members of the Students / Experts groups.
+    """
+    counts = cache.get(COUNTS_KEY)
+    if counts is None:
+        members = dict(
+            Group.objects.filter(name__in=[STUDENTS_GROUP, EXPERTS_GROUP])
+            .annotate(n=Count("user"))
+            .values_list("name", "n")
+        )
+        counts = {
+            "students": members.get(STUDENTS_GROUP, 0),
+            "experts": members.get(EXPERTS_GROUP, 0),
+        }
+        cache.set(COUNTS_KEY, counts, timeout=COUNTS_TIMEOUT)
+    return counts
+
+
+def invalidate_platform_counts() -> None:
+    cache.delete(COUNTS_KEY)
@@ -0,0 +1,180 @@
+"""
+Shared gateway for LLM calls (ai_interview, career_path).
+
+Every prompt goes through complete(), which adds what the SDK client alone
+doesn't give us:
+  - one client per process, so calls reuse its pooled keep-alive connections;
+  - a deadline per call covering all attempts (settings.LLM_TIMEOUT);
+  - retries of transient failures (connection errors, timeouts, 429, 5xx)
+    with full-jitter exponential backoff that never sleeps past the deadline;
+  - a circuit breaker: after LLM_BREAKER_THRESHOLD consecutive transient
+    failures calls fail fast for LLM_BREAKER_COOLDOWN seconds, then a single
+    probe decides whether to close it again;
+  - a concurrency limit (LLM_MAX_CONCURRENCY in-flight requests per process),
+    so a slow provider ties up a few threads, not every worker.
+
+The model comes from settings.LLM_MODEL. Failures the caller can't fix by
+waiting (bad request, auth) are raised as the SDK's own exceptions; budget,
+breaker and limiter failures as LLMUnavailable.
+"""
+
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import openai
+except ImportError:  # pragma: no cover - optional dependency
+    openai = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "LLM_MODEL": "gpt-4o-mini",
+    "LLM_TIMEOUT": 30,
+    "LLM_MAX_RETRIES": 2,
+    "LLM_MAX_CONCURRENCY": 4,
+    "LLM_BREAKER_THRESHOLD": 5,
+    "LLM_BREAKER_COOLDOWN": 30,
+}
+
+# Backoff before retry n is uniform in [0, min(CAP, BASE * 2**n)] seconds.
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+
+if openai is not None:
+    TRANSIENT_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+else:  # pragma: no cover
+    TRANSIENT_ERRORS = ()
+
+
+class LLMUnavailable(RuntimeError):
+    """
+    The provider is degraded or busy: out of time, circuit open, or no free slot.
+    """
+
+
+def _setting(name: str):
+    return getattr(settings, name, DEFAULTS[name])
+
+
+# -------------------------------------------------------------------
+# Circuit breaker
+# -------------------------------------------------------------------
+
+class CircuitBreaker:
+    """
+    Closed → open after `threshold` consecutive failures; open → half-open
+    after `cooldown` seconds, letting one probe call through; the probe's
+    outcome closes or re-opens it.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.threshold:
+                if not self._probing:
+                    logger.warning("LLM circuit opened after %d consecutive failures.", self._failures)
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+_lock = threading.Lock()
+_client = None
+_breaker = CircuitBreaker(_setting("LLM_BREAKER_THRESHOLD"), _setting("LLM_BREAKER_COOLDOWN"))
+_slots = threading.BoundedSemaphore(_setting("LLM_MAX_CONCURRENCY"))
+
+
+def get_client():
+    """
+    The process-wide OpenAI client. SDK retries are off: complete() owns them.
+    """
+    global _client
+    if openai is None:
+        raise ImproperlyConfigured("OpenAI SDK is not installed. Run: pip install --upgrade openai")
+    api_key = getattr(settings, "OPENAI_API_KEY", "")
+    if not api_key:
+        raise ImproperlyConfigured("OPENAI_API_KEY is missing. Set it and restart the server.")
+    with _lock:
+        if _client is None:
+            _client = openai.OpenAI(api_key=api_key, max_retries=0, timeout=_setting("LLM_TIMEOUT"))
+    return _client
+
+
+def complete(prompt: str, *, timeout: float | None = None, model: str | None = None) -> str:
+    """
+    Send one prompt (Responses API) and return the output text, within
+    `timeout` seconds in total (default settings.LLM_TIMEOUT).
+    """
+    client = get_client()
+    deadline = time.monotonic() + (timeout or _setting("LLM_TIMEOUT"))
+    attempts = _setting("LLM_MAX_RETRIES") + 1
+    last_error = None
+
+    for attempt in range(attempts):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        if not _slots.acquire(timeout=remaining):
+            raise LLMUnavailable("Too many concurrent LLM calls.") from last_error
+        try:
+            if not _breaker.allow():
+                raise LLMUnavailable("LLM provider is degraded (circuit open).") from last_error
+            try:
+                response = client.responses.create(
+                    model=model or _setting("LLM_MODEL"),
+                    input=prompt,
+                    timeout=deadline - time.monotonic(),
+                )
+            except TRANSIENT_ERRORS as exc:
+                _breaker.record_failure()
+                last_error = exc
+                logger.info("LLM attempt %d/%d failed: %s", attempt + 1, attempts, exc)
+            except openai.APIError:
+                # The provider answered; the request itself is at fault.
+                _breaker.record_success()
+                raise
+            except BaseException:
+                # Anything else (a bug, KeyboardInterrupt, ...) must not leave
+                # a half-open breaker waiting forever for its probe's outcome.
+                _breaker.record_failure()
+                raise
+            else:
+                _breaker.record_success()
+                return response.output_text
+        finally:
+            _slots.release()
+
+        delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+        if attempt + 1 == attempts or time.monotonic() + delay >= deadline:
+            break
+        time.sleep(delay)
+
+    raise LLMUnavailable("LLM call failed or timed out.") from last_error
@@ -0,0 +1,104 @@
+"""
+Process-local cache of small lookup tables.
+
+Specializations, consultation types and subscription plans are read on many
+pages but only change when an admin edits them. Each worker keeps the rows in
+memory, tagged with a version number stored in the shared Django cache;
+main.signals bumps a table's version on save/delete, and every worker notices
+on its next read and reloads that table. A read on a current table therefore
+costs one cache get and no database query.
+
+The versions live in the default cache, which all workers share
+(settings.CACHES). As a safety net against a lost bump, a worker also reloads
+a table once its copy is older than LOCAL_TTL.
+
+Tables are loaded lazily and warmed at startup by warm_lookups() (wsgi/asgi).
+"""
+
+import logging
+import threading
+import time
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+# name → (model label, ordering)
+LOOKUPS = {
+    "specializations": ("accounts.Specialization", ["id"]),
+    "consultation_types": ("accounts.ConsultationType", ["id"]),
+    "plans": ("subscriptions.Plan", ["price_sar", "id"]),
+}
+
+VERSION_KEY = "main:lookup-version:{name}"
+
+# Seconds a worker trusts its copy without a version change.
+LOCAL_TTL = 5 * 60
+
+_local = {}  # name → (version, loaded_at, rows)
+_lock = threading.Lock()
+
+
+def _version(name: str) -> int:
+    key = VERSION_KEY.format(name=name)
+    version = cache.get(key)
+    if version is None:
+        # Evicted or never set: a fresh time-based value invalidates every worker.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _is_current(entry, version: int) -> bool:
+    return entry is not None and entry[0] == version and time.monotonic() - entry[1] < LOCAL_TTL
+
+
+def get_lookup(name: str) -> tuple:
+    """
+    All rows of a lookup table as a tuple of model instances (treat as read-only).
+    """
+    version = _version(name)
+    entry = _local.get(name)
+    if _is_current(entry, version):
+        return entry[2]
+    with _lock:
+        entry = _local.get(name)
+        if not _is_current(entry, version):
+            label, ordering = LOOKUPS[name]
+            rows = tuple(apps.get_model(label).objects.order_by(*ordering))
+            entry = _local[name] = (version, time.monotonic(), rows)
+    return entry[2]
+
+
+def bump_lookup(name: str) -> None:
+    key = VERSION_KEY.format(name=name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def warm_lookups() -> None:
+    """
+    Load every table up front so the first requests don't pay for it.
+    Skipped quietly when the tables don't exist yet (before migrate).
+    """
+    for name in LOOKUPS:
+        try:
+            get_lookup(name)
+        except DatabaseError:
+            logger.info("Lookup %s not warmed: database not ready.", name)
+
+
+def specializations() -> tuple:
+    return get_lookup("specializations")
+
+
+def consultation_types() -> tuple:
+    return get_lookup("consultation_types")
+
+
+def plans() -> tuple:
+    return get_lookup("plans")
@@ -0,0 +1,102 @@
+"""
+Keyset (cursor) pagination shared by the chat thread, the consultation inbox
+and the experts directory.
+
+Instead of OFFSET (which scans every skipped row), a page is fetched with
+`WHERE (k1, k2, ...) < (v1, v2, ...)` on an indexed ordering, so the cost of a
+page does not depend on how deep the user scrolled.
+
+Cursors are opaque URL-safe tokens holding the ordering values of the last
+row of the previous page.
+"""
+
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    """
+    DjangoJSONEncoder truncates datetimes to milliseconds; cursors need the
+    exact stored value or rows sharing a millisecond would be skipped.
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values) -> str:
+    """
+    Serialize ordering values (datetimes, decimals, ints...) into a URL-safe token.
+    """
+    raw = json.dumps(list(values), cls=_CursorEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, model, ordering) -> list | None:
+    """
+    Parse a token produced by encode_cursor back into typed values using the
+    model fields named in `ordering`. Returns None for malformed tokens.
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != len(ordering):
+        return None
+    try:
+        return [
+            model._meta.get_field(field.lstrip("-")).to_python(value)
+            for field, value in zip(ordering, values)
+        ]
+    except ValidationError:
+        return None
+
+
+def keyset_filter(ordering, values) -> Q:
+    """
+    Build the "strictly after this row" condition for a lexicographic ordering,
+    e.g. ["-created_at", "-id"] -> created_at < v0 OR (created_at = v0 AND id < v1).
+    """
+    condition = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        clause = Q(**{f"{name}__{lookup}": values[i]})
+        for prev, value in zip(ordering[:i], values[:i]):
+            clause &= Q(**{prev.lstrip("-"): value})
+        condition |= clause
+    # Redundant bound on the leading field: lets the planner turn the OR into
+    # a single index range scan instead of filtering row by row.
+    first = ordering[0]
+    bound = "lte" if first.startswith("-") else "gte"
+    return Q(**{f"{first.lstrip('-')}__{bound}": values[0]}) & condition
+
+
+def paginate_keyset(qs, ordering, cursor: str | None = None, limit: int = 20):
+    """
+    Return (items, next_cursor) for one page of `qs` ordered by `ordering`.
+    The last field of `ordering` must be unique (normally the primary key).
+    next_cursor is None on the last page.
+    """
+    qs = qs.order_by(*ordering)
+    values = decode_cursor(cursor, qs.model, ordering)
+    if values is not None:
+        qs = qs.filter(keyset_filter(ordering, values))
+
+    items = list(qs[: limit + 1])
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    last = items[-1]
+    return items, encode_cursor(getattr(last, field.lstrip("-")) for field in ordering)
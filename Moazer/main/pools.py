@@ -0,0 +1,76 @@
+"""
+Shared plumbing of the pre-generated question pools
+(ai_interview.question_bank, career_path.question_pools).
+
+Both keep generated questions in a table row per pool, count hits and misses
+on it and top it up from a background job (main.tasks). The job holds a
+per-pool lock in the default cache so a pool is refilled once at a time:
+
+  - queue_refill() only checks the lock as a hint; the job takes it itself,
+    so a request that rolls back (and never starts the job) can't leave the
+    pool locked.
+  - The lock is taken with cache.add(), which is atomic on Redis but not on
+    the default FileBasedCache (has_key, then set): two processes racing on
+    one pool may both refill it. That only costs a duplicate model call, as
+    a refill merges its questions into the pool instead of replacing it.
+"""
+
+import hashlib
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .tasks import enqueue
+
+REFILL_LOCK_TIMEOUT = 60 * 10
+
+
+def lock_key(template: str, *parts) -> str:
+    """
+    Cache key of a pool's refill lock. Pool keys are free Arabic text; the
+    digest keeps cache keys short and free of spaces.
+    """
+    digest = hashlib.sha1(":".join(str(p) for p in parts).encode()).hexdigest()
+    return template.format(digest=digest)
+
+
+def dedupe(questions) -> list[str]:
+    return list(dict.fromkeys(q for q in questions if q))
+
+
+def record_miss(model, lookup: dict, defaults: dict, **touch) -> None:
+    """
+    Count a miss on the pool row matching `lookup`, creating it from
+    `defaults` on first use. `touch` holds extra columns to update.
+    """
+    if model.objects.filter(**lookup).update(misses=F("misses") + 1, **touch):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **defaults, misses=1)
+    except IntegrityError:
+        # Another session created it meanwhile.
+        model.objects.filter(**lookup).update(misses=F("misses") + 1, **touch)
+
+
+def queue_refill(key: str, job, *args) -> None:
+    """
+    Queue job(*args) after commit unless a refill of the pool is running.
+    """
+    if cache.get(key) is None:
+        enqueue(job, *args)
+
+
+@contextmanager
+def refill_lock(key: str, timeout: int = REFILL_LOCK_TIMEOUT):
+    """
+    Yield whether this job got the pool's refill lock; released on exit.
+    """
+    acquired = cache.add(key, 1, timeout=timeout)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            cache.delete(key)
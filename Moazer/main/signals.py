@@ -0,0 +1,37 @@
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .counters import invalidate_platform_counts
+from .lookups import LOOKUPS, bump_lookup
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def refresh_counts_on_membership(sender, action, **kwargs):
+    # Forward (user.groups.add) and reverse (group.user_set.add) alike.
+    if action in ("post_add", "post_remove", "post_clear"):
+        transaction.on_commit(invalidate_platform_counts)
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def refresh_counts_on_rows(sender, **kwargs):
+    """
+    Deleting a user (or group) drops membership rows without m2m_changed.
+    """
+    transaction.on_commit(invalidate_platform_counts)
+
+
+def _connect_lookup(name, label):
+    def refresh_lookup(sender, **kwargs):
+        transaction.on_commit(lambda: bump_lookup(name))
+
+    post_save.connect(refresh_lookup, sender=label, weak=False, dispatch_uid=f"lookup-save-{name}")
+    post_delete.connect(refresh_lookup, sender=label, weak=False, dispatch_uid=f"lookup-delete-{name}")
+
+
+# Admin edits to lookup tables (main.lookups) reload them in every worker.
+for _name, (_label, _ordering) in LOOKUPS.items():
+    _connect_lookup(_name, _label)
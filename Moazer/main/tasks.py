@@ -0,0 +1,63 @@
+"""
+In-process background jobs.
+
+Slow work (LLM round trips, ...) must not run inside a request, let alone
+inside its transaction. enqueue() hands a function to a small thread pool once
+the current transaction commits, so the job sees the rows the request wrote
+and a rolled-back request never starts it.
+
+No broker is involved: queued jobs live in the memory of the process that
+queued them. Callers therefore record progress in the database (a status
+column) so that work lost to a restart can be noticed and queued again.
+
+settings.BACKGROUND_TASKS_WORKERS sizes the pool (default 2) and
+settings.BACKGROUND_TASKS_EAGER runs jobs inline at commit (tests, debugging).
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "BACKGROUND_TASKS_WORKERS", 2),
+                thread_name_prefix="moazer-task",
+            )
+    return _executor
+
+
+def _run(func, args, kwargs, close_connections: bool) -> None:
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Background task %s failed.", func.__qualname__)
+    finally:
+        if close_connections:
+            # Connections are per thread; don't keep one open between jobs.
+            connections.close_all()
+
+
+def enqueue(func, *args, **kwargs) -> None:
+    """
+    Run func(*args, **kwargs) in the background after the current transaction
+    commits (immediately when there is none). Exceptions are logged, not raised.
+    """
+    def submit():
+        if getattr(settings, "BACKGROUND_TASKS_EAGER", False):
+            _run(func, args, kwargs, close_connections=False)
+        else:
+            _get_executor().submit(_run, func, args, kwargs, True)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,28 @@
+"""
+Test runner for `manage.py test`.
+
+Tests clear and fill the default cache freely. The configured backend is
+shared with running servers (a cache directory, Redis), so the suite swaps it
+for a private in-memory cache instead of wiping the live one.
+"""
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+TEST_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "moazer-tests",
+    }
+}
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._caches = override_settings(CACHES=TEST_CACHES)
+        self._caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._caches.disable()
+        super().teardown_test_environment(**kwargs)
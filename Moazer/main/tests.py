@@ -1,3 +1,236 @@
-from django.test import TestCase
+import datetime
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import openai
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import Specialization
+from consultations.models import ChatMessage, Consultation
+
+from . import counters, llm, lookups, pools
+from .text import normalize_arabic, search_terms, strip_article
+from .pagination import decode_cursor, encode_cursor, paginate_keyset
+
+
+class LookupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        lookups._local.clear()
+
+    def test_edit_reloads_table(self):
+        self.assertEqual(lookups.specializations(), ())
+        with self.assertNumQueries(0):
+            lookups.specializations()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            law = Specialization.objects.create(name="القانون")
+        self.assertEqual(lookups.specializations(), (law,))
+
+    def test_copy_expires_without_bump(self):
+        lookups.specializations()
+        law = Specialization.objects.create(name="القانون")  # no on_commit: the bump is lost
+        self.assertEqual(lookups.specializations(), ())
+        later = lookups.time.monotonic() + lookups.LOCAL_TTL
+        with mock.patch.object(lookups.time, "monotonic", return_value=later):
+            self.assertEqual(lookups.specializations(), (law,))
+
+
+def _connection_error():
+    return openai.APIConnectionError(request=mock.Mock())
+
+
+def _status_error(cls, status):
+    return cls("error", response=mock.Mock(status_code=status, headers={}), body=None)
+
+
+@override_settings(LLM_TIMEOUT=30, LLM_MAX_RETRIES=0)
+class PlatformCountsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.students = Group.objects.get_or_create(name=counters.STUDENTS_GROUP)[0]
+        self.experts = Group.objects.get_or_create(name=counters.EXPERTS_GROUP)[0]
+        self.user = User.objects.create_user("user")
+
+    def test_warm_landing_page_runs_no_queries(self):
+        self.client.get(reverse("main:home_view"))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("main:home_view"))
+        self.assertEqual((response.context["students_count"], response.context["experts_count"]), (0, 0))
+
+    def test_membership_changes_drop_the_cached_counts(self):
+        self.assertEqual(counters.platform_counts(), {"students": 0, "experts": 0})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.add(self.students, self.experts)
+        self.assertEqual(counters.platform_counts(), {"students": 1, "experts": 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.experts.user_set.clear()
+        self.assertEqual(counters.platform_counts(), {"students": 1, "experts": 0})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        with self.assertNumQueries(1):
+            self.assertEqual(counters.platform_counts(), {"students": 0, "experts": 0})
+
+
+class RefillLockTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_one_holder_and_released_on_error(self):
+        key = pools.lock_key("tests:refill:{digest}", 2, "هندسة وتقنية")
+        self.assertNotIn(" ", key)
+        with self.assertRaises(RuntimeError), pools.refill_lock(key) as acquired:
+            self.assertTrue(acquired)
+            with pools.refill_lock(key) as second:
+                self.assertFalse(second)
+            self.assertEqual(cache.get(key), 1)  # the loser must not release it
+            raise RuntimeError("model down")
+        self.assertIsNone(cache.get(key))
+
+
+class TextTests(SimpleTestCase):
+    def test_normalize_arabic(self):
+        self.assertEqual(normalize_arabic("أحمد إبراهيم آمنة"), "احمد ابراهيم امنه")
+        self.assertEqual(normalize_arabic("مُحَاسَبَة"), "محاسبه")
+        self.assertEqual(normalize_arabic("مصطفى شاطئ مؤتمر"), "مصطفي شاطي موتمر")
+        self.assertEqual(normalize_arabic("عـــلي ٢٠٢٥ CPA"), "علي 2025 cpa")
+        self.assertEqual(normalize_arabic(None), "")
+
+    def test_search_terms_and_article(self):
+        self.assertEqual(search_terms("المحاسبة، والمحاسبة؛ تسويق!"), ["المحاسبه", "والمحاسبه", "تسويق"])
+        self.assertEqual(strip_article("المحاسبه"), "محاسبه")
+        self.assertEqual(strip_article("والتسويق"), "تسويق")
+        self.assertEqual(strip_article("للطلاب"), "طلاب")
+        self.assertEqual(strip_article("الي"), "الي")  # too short to carry an article
+        self.assertEqual(strip_article("تسويق"), "تسويق")
+
+
+class KeysetPaginationTests(TestCase):
+    ORDERING = ["-created_at", "-id"]
+
+    def setUp(self):
+        user = User.objects.create_user("user")
+        consultation = Consultation.objects.create(student=user, title="CV review")
+        self.ids = [
+            ChatMessage.objects.create(consultation=consultation, sender=user, content=str(i)).id for i in range(5)
+        ]
+        self.qs = ChatMessage.objects.filter(consultation=consultation)
+
+    def _walk(self, limit):
+        seen, cursor = [], None
+        while True:
+            page, cursor = paginate_keyset(self.qs, self.ORDERING, cursor=cursor, limit=limit)
+            seen.extend(m.id for m in page)
+            if cursor is None:
+                return seen
+
+    def test_pages_cover_every_row_once_across_timestamp_ties(self):
+        self.qs.filter(id__in=self.ids[1:4]).update(created_at=datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC))
+        expected = list(self.qs.order_by(*self.ORDERING).values_list("id", flat=True))
+        self.assertEqual(self._walk(limit=2), expected)
+        self.assertEqual(self._walk(limit=5), expected)
+
+    def test_cursor_keeps_microseconds_and_rejects_garbage(self):
+        moment = datetime.datetime(2025, 1, 1, 12, 0, 0, 123456, tzinfo=datetime.UTC)
+        token = encode_cursor([moment, 7])
+        self.assertEqual(decode_cursor(token, ChatMessage, self.ORDERING), [moment, 7])
+        for garbage in ["", "%%%", encode_cursor([1]), encode_cursor(["not a date", 7])]:
+            self.assertIsNone(decode_cursor(garbage, ChatMessage, self.ORDERING))
+        # A bad cursor falls back to the first page.
+        page, _ = paginate_keyset(self.qs, self.ORDERING, cursor="%%%", limit=2)
+        self.assertEqual([m.id for m in page], self.ids[:-3:-1])
+
+
+class LLMGatewayTests(SimpleTestCase):
+    """
+    complete() against a stubbed client and clock: retries, deadline,
+    circuit breaker, and pass-through of the provider's 4xx errors.
+    """
+
+    def setUp(self):
+        self.now = 1000.0
+        self.sleeps = []
+        self.create = mock.Mock(return_value=SimpleNamespace(output_text="ok"))
+        clock = SimpleNamespace(monotonic=lambda: self.now, sleep=self._sleep)
+        for patcher in (
+            mock.patch.object(llm, "time", clock),
+            mock.patch.object(llm, "_breaker", llm.CircuitBreaker(threshold=2, cooldown=30)),
+            mock.patch.object(llm, "get_client", return_value=SimpleNamespace(responses=SimpleNamespace(create=self.create))),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def _fail_twice(self):
+        self.create.side_effect = _connection_error()
+        for _ in range(2):
+            with self.assertRaises(llm.LLMUnavailable), self.assertLogs("main.llm", "INFO"):
+                llm.complete("prompt")
+
+    @override_settings(LLM_MAX_RETRIES=2)
+    def test_transient_error_retried(self):
+        self.create.side_effect = [_connection_error(), _status_error(openai.InternalServerError, 500),
+                                   SimpleNamespace(output_text="ok")]
+        with self.assertLogs("main.llm", "INFO"), mock.patch.object(llm, "_breaker", llm.CircuitBreaker(5, 30)):
+            self.assertEqual(llm.complete("prompt"), "ok")
+        self.assertEqual(self.create.call_count, 3)
+        self.assertEqual(len(self.sleeps), 2)
+
+    @override_settings(LLM_MAX_RETRIES=50)
+    def test_deadline_covers_all_attempts(self):
+        self.create.side_effect = _connection_error()
+        start = self.now
+        with self.assertRaisesMessage(llm.LLMUnavailable, "timed out"), self.assertLogs("main.llm", "INFO"), \
+                mock.patch.object(llm, "_breaker", llm.CircuitBreaker(100, 30)):
+            llm.complete("prompt", timeout=5)
+        self.assertLess(self.now - start, 5)
+        self.assertLess(self.create.call_count, 51)
+        self.assertTrue(all(0 < call.kwargs["timeout"] <= 5 for call in self.create.call_args_list))
+
+    def test_bad_request_passes_through(self):
+        self.create.side_effect = _status_error(openai.BadRequestError, 400)
+        for _ in range(3):
+            with self.assertRaises(openai.BadRequestError):
+                llm.complete("prompt")
+        # Not retried, and the provider answered: the breaker stays closed.
+        self.assertEqual(self.create.call_count, 3)
+        self.assertTrue(llm._breaker.allow())
+
+    def test_breaker_opens_then_probe_closes(self):
+        self._fail_twice()
+        with self.assertRaisesMessage(llm.LLMUnavailable, "circuit open"):
+            llm.complete("prompt")
+        self.assertEqual(self.create.call_count, 2)
+
+        self.now += 31
+        self.create.side_effect = None
+        self.assertEqual(llm.complete("prompt"), "ok")
+        self.assertEqual(llm.complete("prompt"), "ok")
+
+    def test_failed_probe_reopens(self):
+        self._fail_twice()
+        self.now += 31
+        with self.assertRaises(llm.LLMUnavailable), self.assertLogs("main.llm", "INFO"):
+            llm.complete("prompt")
+        self.create.side_effect = None
+        with self.assertRaisesMessage(llm.LLMUnavailable, "circuit open"):
+            llm.complete("prompt")
+
+    def test_unexpected_error_ends_the_probe(self):
+        self._fail_twice()
+        self.now += 31
+        self.create.side_effect = KeyError("bug")
+        with self.assertRaises(KeyError):
+            llm.complete("prompt")
+
+        self.now += 31
+        self.create.side_effect = None
+        self.assertEqual(llm.complete("prompt"), "ok")
@@ -0,0 +1,62 @@
+"""
+Arabic text normalization shared by search indexing and querying.
+
+Both sides of a search must be folded the same way, otherwise "أحمد" typed
+by a student never matches "احمد" stored in a profile. The folding is
+deliberately lossy: it only has to be consistent.
+"""
+
+import re
+import unicodedata
+
+# Tashkeel (fathatan .. sukun), superscript alef and tatweel.
+_DIACRITICS = re.compile("[\u064B-\u0652\u0670\u0640]")
+
+_LETTER_MAP = str.maketrans({
+    "أ": "ا",
+    "إ": "ا",
+    "آ": "ا",
+    "ٱ": "ا",
+    "ة": "ه",
+    "ى": "ي",
+    "ؤ": "و",
+    "ئ": "ي",
+    # Arabic-Indic digits → ASCII
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+})
+
+_WORD = re.compile(r"\w+")
+
+# The definite article, alone or behind a one-letter conjunction/preposition
+# (wa-, bi-, ka-, fa-, li-), longest first.
+_ARTICLE_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال")
+
+
+def normalize_arabic(text: str | None) -> str:
+    """
+    Fold text for matching: NFKC, strip tashkeel/tatweel, unify alef/hamza
+    variants, taa marbuta → haa, alef maqsura → yaa, casefold Latin.
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", text)
+    text = _DIACRITICS.sub("", text)
+    return text.translate(_LETTER_MAP).casefold()
+
+
+def search_terms(text: str | None) -> list[str]:
+    """
+    Normalized words of `text`, in order, without duplicates.
+    """
+    return list(dict.fromkeys(_WORD.findall(normalize_arabic(text))))
+
+
+def strip_article(word: str) -> str:
+    """
+    Drop a leading (conjunction +) article from a normalized word, so that
+    "والتسويق" and "تسويق" share a search term. Short words are left alone.
+    """
+    for prefix in _ARTICLE_PREFIXES:
+        if word.startswith(prefix) and len(word) - len(prefix) >= 3:
+            return word[len(prefix):]
+    return word
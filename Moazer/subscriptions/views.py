@@ -1,6 +1,7 @@
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
+from main.lookups import plans
 from .models import Plan
 from .services import grant_plan
 
@@ -10,8 +11,8 @@ def plans_view(request):
     Show available plans. For now, clicking "subscribe" will grant attempts directly.
     Later you swap the button to go to a checkout page and call grant_plan after success.
     """
-    plans = Plan.objects.order_by("price_sar")
-    return render(request, "subscriptions/plans.html", {"plans": plans})
+    # In-process lookup cache (main.lookups), ordered by price.
+    return render(request, "subscriptions/plans.html", {"plans": plans()})
 
 @login_required
 def subscribe_view(request, plan_id: int):